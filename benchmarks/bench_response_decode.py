@@ -0,0 +1,79 @@
+"""
+微基准：AsyncHTTPTransport.post 的响应解码路径。
+
+对比「response.json() + ApiResponse[dict].model_validate」（旧路径）与
+「codec.json_loads + parse_envelope」（当前路径），负载为一条典型的 /Msg/SendTxt 返回
+与一批 20 条消息的 /Msg/Sync 返回。
+
+用法::
+
+    python benchmarks/bench_response_decode.py [次数]
+"""
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lwapi.codec import CODEC_NAME, json_loads, parse_envelope  # noqa: E402
+from lwapi.models.base import ApiResponse  # noqa: E402
+
+
+def _add_msg(i: int) -> dict:
+    return {
+        "msgId": 1000 + i,
+        "fromUserName": {"string": "wxid_sender"},
+        "toUserName": {"string": "wxid_bot"},
+        "msgType": 1,
+        "content": {"string": f"第 {i} 条测试消息，" * 4},
+        "status": 3,
+        "imgStatus": 1,
+        "imgBuf": {"iLen": 0},
+        "createTime": 1_700_000_000 + i,
+        "msgSource": "<msgsource><signature>v1_abc</signature></msgsource>",
+        "newMsgId": 7_000_000_000_000_000_000 + i,
+        "msgSeq": 800_000 + i,
+    }
+
+
+PAYLOADS = {
+    "SendTxt": json.dumps(
+        {"code": 200, "message": "", "data": {"count": 1, "list": [{"ret": 0, "newMsgId": 1}]}},
+        ensure_ascii=False,
+    ).encode("utf-8"),
+    "Sync x20": json.dumps(
+        {"code": 200, "message": "", "data": {"addMsgs": [_add_msg(i) for i in range(20)]}},
+        ensure_ascii=False,
+    ).encode("utf-8"),
+}
+
+
+def legacy_path(body: bytes) -> object:
+    raw = json.loads(body)
+    return ApiResponse[dict].model_validate(raw).data
+
+
+def fast_path(body: bytes) -> object:
+    return parse_envelope(json_loads(body), dict)[2]
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"codec={CODEC_NAME} number={number}")
+    for name, body in PAYLOADS.items():
+        assert legacy_path(body) == fast_path(body)
+        old = min(timeit.repeat(lambda: legacy_path(body), number=number, repeat=3))
+        new = min(timeit.repeat(lambda: fast_path(body), number=number, repeat=3))
+        print(
+            f"{name:<10} {len(body):>6} B  "
+            f"legacy {old / number * 1e6:8.2f} us  "
+            f"fast {new / number * 1e6:8.2f} us  "
+            f"x{old / new:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+吞吐基准：OtherClient.download_img_full 并发分段下载。
+
+本地启动一个模拟 /api/Other/DownloadImg 的 aiohttp 服务（每段固定附加延迟，
+返回 Base64 段数据，可按比例注入失败），对比不同并发数下下载同一文件的耗时与 MB/s，
+并校验写入文件的内容。
+
+用法::
+
+    python benchmarks/bench_sectioned_download.py [文件MB] [每段延迟ms] [失败率]
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lwapi import LwApiClient  # noqa: E402
+
+
+def _make_app(blob: bytes, latency: float, fail_rate: float) -> web.Application:
+    async def download_img(request: web.Request) -> web.Response:
+        body = await request.json()
+        sec = body["section"]
+        start, n = int(sec["startPos"]), int(sec["dataLen"])
+        await asyncio.sleep(latency)
+        if fail_rate and random.random() < fail_rate:
+            return web.Response(status=503, text="busy")
+        chunk = blob[start : start + n]
+        data = {"totalLen": len(blob), "startPos": start, "data": {"iLen": len(chunk), "buffer": base64.b64encode(chunk).decode()}}
+        return web.json_response({"code": 200, "message": "", "data": data})
+
+    app = web.Application(client_max_size=1024 * 1024)
+    app.router.add_post("/api/Other/DownloadImg", download_img)
+    return app
+
+
+async def main() -> None:
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    fail_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    blob = os.urandom(int(size_mb * 1024 * 1024))
+    digest = hashlib.sha256(blob).hexdigest()
+
+    runner = web.AppRunner(_make_app(blob, latency, fail_rate), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    print(f"文件 {size_mb:g} MB，每段延迟 {latency * 1000:.0f} ms，失败率 {fail_rate:.0%}")
+    async with LwApiClient(f"http://127.0.0.1:{port}") as client:
+        client.set_wxid("wxid_bench")
+        with tempfile.TemporaryDirectory() as tmp:
+            for concurrency in (1, 4, 8, 16):
+                dest = Path(tmp) / f"c{concurrency}.bin"
+                t0 = time.perf_counter()
+                await client.other.download_img_full(
+                    "wxid_peer", 1, len(blob), dest, concurrency=concurrency, retries=5
+                )
+                elapsed = time.perf_counter() - t0
+                ok = hashlib.sha256(dest.read_bytes()).hexdigest() == digest
+                print(
+                    f"并发 {concurrency:>2}  {elapsed:6.2f}s  {size_mb / elapsed:7.2f} MB/s  "
+                    f"校验 {'通过' if ok else '失败'}"
+                )
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
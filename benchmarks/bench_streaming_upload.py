@@ -0,0 +1,117 @@
+"""
+内存基准：MsgClient.send_video_message 整串 Base64 与流式请求体的峰值内存对比。
+
+本地启动一个模拟 /api/Msg/SendVideo 的 aiohttp 服务（按块读取请求体并计算摘要，不整块缓存），
+分别以「读文件 -> 整串 Base64 -> 发送」与「直接传文件路径（lwapi.streaming 按块编码）」发送同一视频，
+用 tracemalloc 统计每种方式的 Python 内存峰值与耗时，并校验服务端收到的内容。
+
+用法::
+
+    python benchmarks/bench_streaming_upload.py [视频MB]
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import gc
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lwapi import LwApiClient  # noqa: E402
+
+_MARK = b'"base64":"'
+
+
+def _make_app(digests: List[str]) -> web.Application:
+    async def send_video(request: web.Request) -> web.Response:
+        # 只对 base64 字段的内容求摘要：按块扫描，避免整块读入
+        digest = hashlib.sha256()
+        tail, inside, done = b"", False, False
+        async for chunk in request.content.iter_chunked(256 * 1024):
+            if done:
+                continue
+            data = tail + chunk
+            if not inside:
+                pos = data.find(_MARK)
+                if pos < 0:
+                    tail = data[-len(_MARK) :]
+                    continue
+                data, inside = data[pos + len(_MARK) :], True
+            end = data.find(b'"')
+            if end >= 0:
+                digest.update(data[:end])
+                done = True
+            else:
+                digest.update(data)
+            tail = b""
+        digests.append(digest.hexdigest())
+        return web.json_response({"code": 200, "message": "", "data": {"msgId": 1}})
+
+    app = web.Application(client_max_size=0)
+    app.router.add_post("/api/Msg/SendVideo", send_video)
+    return app
+
+
+async def _measure(label: str, send: Callable[[], Awaitable[Any]]) -> None:
+    gc.collect()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    t0 = time.perf_counter()
+    await send()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    print(f"{label:<14} 峰值 {(peak - base) / 1024 / 1024:8.1f} MB  耗时 {elapsed:6.2f}s")
+
+
+async def main() -> None:
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    digests: List[str] = []
+
+    runner = web.AppRunner(_make_app(digests), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = Path(tmp) / "video.mp4"
+        video.write_bytes(os.urandom(int(size_mb * 1024 * 1024)))
+        cover = base64.b64encode(os.urandom(16 * 1024)).decode()
+        expected = hashlib.sha256(base64.b64encode(video.read_bytes())).hexdigest()
+
+        print(f"视频 {size_mb:g} MB（Base64 后 {size_mb * 4 / 3:.1f} MB）")
+        async with LwApiClient(f"http://127.0.0.1:{port}") as client:
+            client.set_wxid("wxid_bench")
+            # 预热连接，避免把建连开销算进第一种方式
+            await client.msg.send_video_message("wxid_peer", 1, b"warmup", cover)
+            digests.clear()
+            tracemalloc.start()
+
+            async def _whole() -> None:
+                b64 = base64.b64encode(video.read_bytes()).decode()
+                await client.msg.send_video_message("wxid_peer", 10, b64, cover)
+
+            async def _streamed() -> None:
+                await client.msg.send_video_message("wxid_peer", 10, video, cover)
+
+            await _measure("整串 Base64", _whole)
+            await _measure("流式（路径）", _streamed)
+            tracemalloc.stop()
+
+        ok = digests == [expected, expected]
+        print(f"服务端校验 {'通过' if ok else '失败'}")
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
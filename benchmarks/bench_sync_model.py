@@ -0,0 +1,81 @@
+"""
+微基准：同步消息的 pydantic 模型与紧凑结构（lwapi.models.msg_compact）。
+
+对比从已解码的 /Msg/Sync data 构造消息对象的耗时，以及每条 AddMsg 常驻内存
+（tracemalloc 统计，一次保留 N 条消息）。
+
+用法::
+
+    python benchmarks/bench_sync_model.py [次数] [内存统计消息条数]
+"""
+from __future__ import annotations
+
+import gc
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lwapi.codec import json_loads  # noqa: E402
+from lwapi.models.msg import SyncMessageResponse  # noqa: E402
+from lwapi.models.msg_compact import parse_sync_compact  # noqa: E402
+
+from bench_response_decode import _add_msg  # noqa: E402
+
+try:
+    import orjson as _json
+
+    def _dumps(obj: object) -> bytes:
+        return _json.dumps(obj)
+except ImportError:
+    import json as _json
+
+    def _dumps(obj: object) -> bytes:
+        return _json.dumps(obj).encode("utf-8")
+
+
+PARSERS = {
+    "pydantic": SyncMessageResponse.model_validate,
+    "compact": parse_sync_compact,
+}
+
+
+def _bytes_per_msg(parse, body: bytes, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    kept = []
+    base = tracemalloc.get_traced_memory()[0]
+    for _ in range(count // 20):
+        resp = parse(json_loads(body))
+        # 模拟插件读取常用字段
+        for m in resp.addMsgs:
+            _ = (m.content.string, m.fromUserName.string, m.msgType)
+        kept.append(resp)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return used / (len(kept) * 20)
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    mem_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    body = _dumps({"addMsgs": [_add_msg(i) for i in range(20)]})
+    a = PARSERS["pydantic"](json_loads(body))
+    b = PARSERS["compact"](json_loads(body))
+    assert a.model_dump() == b.model_dump()
+
+    print(f"Sync x20 {len(body)} B  number={number}  mem_count={mem_count}")
+    results = {}
+    for name, parse in PARSERS.items():
+        t = min(timeit.repeat(lambda: parse(json_loads(body)), number=number, repeat=3))
+        mem = _bytes_per_msg(parse, body, mem_count)
+        results[name] = (t, mem)
+        print(f"{name:<9} {t / number * 1e6:8.2f} us/批  {mem:8.0f} B/条")
+    (t0, m0), (t1, m1) = results["pydantic"], results["compact"]
+    print(f"compact: 解析 x{t0 / t1:.1f}，内存 {m1 / m0:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+微基准：WebSocket 同步帧 JSON 与 protobuf 两种编码。
+
+对比同一条 AddMsg 在线上的字节数，以及 ``MsgClient._parse_sync_payload``
+从原始帧解析为 SyncMessageResponse 的耗时（json：JSON 解码 + pydantic 校验；
+protobuf：proto/addmsg.proto 解码 + 直接映射为 SDK 对象）。
+
+用法::
+
+    python benchmarks/bench_ws_protobuf.py [次数]
+"""
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lwapi.apis.msg import MsgClient  # noqa: E402
+from lwapi.codec import CODEC_NAME  # noqa: E402
+from lwapi.models.msg import AddMsg  # noqa: E402
+from lwapi.proto.addmsg_codec import encode_add_msg  # noqa: E402
+
+
+def _add_msg(content: str, *, group: bool = False) -> dict:
+    return {
+        "msgId": 123456,
+        "fromUserName": {"string": "12345678@chatroom" if group else "wxid_sender"},
+        "toUserName": {"string": "wxid_bot"},
+        "msgType": 1,
+        "content": {"string": f"wxid_sender:\n{content}" if group else content},
+        "status": 3,
+        "imgStatus": 1,
+        "imgBuf": {"iLen": 0},
+        "createTime": 1_700_000_000,
+        "msgSource": "<msgsource><signature>v1_abc</signature><silence>0</silence></msgsource>",
+        "pushContent": "发送者 : 你好",
+        "newMsgId": 7_000_000_000_000_000_001,
+        "msgSeq": 800_001,
+    }
+
+
+SAMPLES = {
+    "私聊短文本": _add_msg("你好"),
+    "群聊长文本": _add_msg("这是一条比较长的群聊消息。" * 20, group=True),
+}
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    # 只用到帧解析，不需要 transport
+    json_client = MsgClient(None)  # type: ignore[arg-type]
+    pb_client = MsgClient(None)  # type: ignore[arg-type]
+    pb_client._ws_encoding = "protobuf"
+
+    print(f"codec={CODEC_NAME} number={number}")
+    for name, sample in SAMPLES.items():
+        json_frame = json.dumps({"addMsgs": [sample]}, ensure_ascii=False)
+        pb_frame = encode_add_msg(AddMsg.model_validate(sample))
+        a = json_client._parse_sync_payload(json_frame).addMsgs[0]
+        b = pb_client._parse_sync_payload(pb_frame).addMsgs[0]
+        assert a.model_dump() == b.model_dump()
+
+        json_bytes = len(json_frame.encode("utf-8"))
+        t_json = min(timeit.repeat(lambda: json_client._parse_sync_payload(json_frame), number=number, repeat=3))
+        t_pb = min(timeit.repeat(lambda: pb_client._parse_sync_payload(pb_frame), number=number, repeat=3))
+        print(
+            f"{name}  json {json_bytes:>5} B {t_json / number * 1e6:7.2f} us  "
+            f"protobuf {len(pb_frame):>5} B {t_pb / number * 1e6:7.2f} us  "
+            f"体积 {len(pb_frame) / json_bytes:.0%}  x{t_json / t_pb:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,11 @@
 lwapi SDK 对外统一入口。
 """
 
+from .bulk import BulkResult
 from .client import LwApiClient
-from .config import ClientConfig
-from .exceptions import ApiError, HttpError, LoginError, LwApiError
+from .config import ClientConfig, HttpPoolConfig, OutboxConfig
+from .exceptions import ApiError, HttpError, LoginError, LwApiError, SendQueueClosed
+from .outbox import SendReceipt, SendWaitMeter, measure_send_wait, send_priority
 from .models.msg_requests import (
     MsgRequestBody,
     RevokeMsgParam,
@@ -18,11 +20,19 @@ from .models.msg_requests import (
 
 __all__ = [
     "LwApiClient",
+    "BulkResult",
     "ClientConfig",
+    "HttpPoolConfig",
+    "OutboxConfig",
+    "SendReceipt",
+    "SendWaitMeter",
+    "measure_send_wait",
+    "send_priority",
     "LwApiError",
     "HttpError",
     "ApiError",
     "LoginError",
+    "SendQueueClosed",
     "MsgRequestBody",
     "SendNewMsgParam",
     "SendImageMsgParam",
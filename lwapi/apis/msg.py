@@ -7,21 +7,41 @@ if TYPE_CHECKING:
     from ..client import LwApiClient
 
 import aiohttp
-import base64
 import asyncio
 import httpx
-import json
 from loguru import logger
-from typing import Callable, Awaitable, Optional, Any
+from pathlib import Path
+from typing import Callable, Awaitable, Optional, Any, Tuple, Union
 
 # 导入根客户端类型（前向声明也可以，但这里直接导入更清晰）
+from ..bulk import BulkResult, Targets, run_bulk
+from ..codec import json_loads
+from ..config import OutboxConfig
+from ..cursor import SyncCursorStore
+from ..dedup import SeenMessageSet
+from ..dispatch import DispatchQueue, OverflowPolicy
 from ..exceptions import HttpError, is_wrapped_request_timeout
-from ..sync_utils import SyncMode, build_msg_ws_url, normalize_sync_mode
-from ..transport import AsyncHTTPTransport
+from ..fanout import CdnDescriptorCache, MediaFanout, content_key, default_cdn_cache
+from ..media import MediaFetcher, default_media_fetcher
+from ..outbox import OutboundScheduler, SendPriority, SendReceipt, send_priority
+from ..pacing import PollPacer
+from ..recorder import SyncRecorder
+from ..streaming import MediaSource, media_body
+from ..proto.addmsg_codec import DecodeError, decode_add_msg_dict
+from ..sync_utils import (
+    SyncMode,
+    WsEncoding,
+    build_msg_ws_url,
+    normalize_sync_mode,
+    normalize_ws_encoding,
+)
+from ..transport import LANE_SYNC, AsyncHTTPTransport
 from ..models.base import ApiResponse
 from ..models.msg import SyncMessageResponse
+from ..models.msg_compact import parse_sync_compact
 from ..models.msg_requests import (
     MsgForwardXmlParam,
+    MsgSyncParam,
     RevokeMsgParam,
     SendAppMsgParam,
     SendEmojiParam,
@@ -36,13 +56,29 @@ from ..models.msg_requests import (
     ShareVideoXmlParam,
 )
 
-MessageHandler = Callable[["LwApiClient", SyncMessageResponse], Awaitable[None]]
+# 处理器可返回 asyncio.Future（如插件链交给会话通道异步执行）：同步断点在其完成后才推进
+MessageHandler = Callable[["LwApiClient", SyncMessageResponse], Awaitable[Any]]
 WsExhaustedCallback = Callable[[], Awaitable[None]]
+WsConnection = Tuple[aiohttp.ClientSession, aiohttp.ClientWebSocketResponse]
 
 # 心跳与底层读超时：网络半开时 async for 可能一直阻塞，需靠 sock_read + 心跳触发重连
 _WS_HEARTBEAT_SEC = 30
 _WS_SOCK_READ_TIMEOUT_SEC = 90
 _WS_MAX_RECONNECT_ATTEMPTS = 3
+# hybrid：降级为 HTTP 长轮询期间探测 WebSocket 恢复的间隔
+_WS_PROBE_INTERVAL_SEC = 30.0
+# 重连后补拉一次 /Msg/Sync 的超时（服务端无新消息时可能挂起长轮询，不宜久等）
+_GAP_FILL_TIMEOUT_SEC = 30.0
+# JSON 帧开头可能出现的空白字节
+_JSON_WHITESPACE = frozenset(b" \t\r\n")
+
+
+def _is_json_frame(raw: bytes) -> bool:
+    """首个非空白字节是否为 { 或 [（逐字节查看，不复制整帧）。"""
+    for byte in raw:
+        if byte not in _JSON_WHITESPACE:
+            return byte in (0x7B, 0x5B)
+    return False
 
 
 class MsgClient:
@@ -55,66 +91,213 @@ class MsgClient:
         self._task: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
         self._handler: Optional[MessageHandler] = None
-        self.interval = 1.0  # 轮询间隔（秒）
+        self.interval = 1.0  # 空批后的基础轮询间隔（秒）；有消息时立即再拉
+        self.max_interval = 5.0  # 连续空批时退避的上限（秒）
+        self._pacer = PollPacer(self.interval, self.max_interval)
         self._sync_mode: SyncMode = "websocket"
+        # protobuf：WebSocket 二进制帧为单条 protobuf AddMsg（proto/addmsg.proto），线上体积更小
+        self._ws_encoding: WsEncoding = "json"
+        # 收消息热路径改用紧凑结构（lwapi.models.msg_compact），省去 pydantic 校验与冗余对象
+        self._compact = False
         self._ws_session: Optional[aiohttp.ClientSession] = None
+        # 当前实际承载同步的通道：websocket / poll（hybrid 模式下会切换）
+        self._active_sync: SyncMode = "websocket"
+        self._ws_connected_before = False
+        self._gap_task: Optional[asyncio.Task] = None
         self._on_ws_exhausted: Optional[WsExhaustedCallback] = None
+        # WebSocket 收包 → 有界队列 → 消费协程，读 socket 不等待插件处理
+        self._queue: Optional[DispatchQueue] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        # 按 newMsgId 去重，重连 / 切换同步方式时重复推送的消息不会再进处理器
+        self._seen: Optional[SeenMessageSet] = None
+        self._seen_path: Optional[Path] = None
+        # 同步断点：keyBuf / msgSeq / newMsgId，后台批量落盘；重启后首个 /Msg/Sync 携带 keyBuf 续传
+        self._cursor: Optional[SyncCursorStore] = None
+        self._cursor_task: Optional[asyncio.Task] = None
+        self._resume_key: Optional[str] = None
+        # 可选：录制原始同步数据，供 src.replay 离线回放压测
+        self._recorder: Optional[SyncRecorder] = None
+        # 可选：发送队列（限速 / 优先级 / 合并短文本），见 enable_outbox
+        self._outbox: Optional[OutboundScheduler] = None
+        # 按 URL 发送媒体时使用的下载器；None 时用进程级默认实例（lwapi.media）
+        self.media_fetcher: Optional[MediaFetcher] = None
+        # 媒体群发的 CDN 描述缓存；None 时用进程级默认实例（lwapi.fanout）
+        self.cdn_cache: Optional[CdnDescriptorCache] = None
 
-    async def _sync_once(self) -> SyncMessageResponse:
-        """单次同步消息（服务端长轮询，超时需明显长于普通接口）。"""
-        data = await self.t.post("/Msg/Sync", timeout=180.0)
+    async def _sync_once(self, timeout: Optional[float] = None) -> SyncMessageResponse:
+        """
+        单次同步消息（服务端长轮询，走 sync 通道的独立连接池与超时）。
+
+        启动时从断点恢复的首次同步携带 keyBuf；其中已处理过的消息由 _dispatch_sync 按去重记录跳过。
+        """
+        key_buf = self._resume_key
+        payload = MsgSyncParam(key_buf=key_buf).to_api() if key_buf else None
+        data = await self.t.post("/Msg/Sync", json=payload, timeout=timeout, lane=LANE_SYNC)
+        if self._recorder is not None:
+            self._recorder.record("sync", data)
+        resp = self._sync_model(data)
+        if key_buf and self._resume_key == key_buf:
+            self._resume_key = None
+        return resp
+
+    def _sync_model(self, data: Any) -> SyncMessageResponse:
+        """同步数据 → 消息对象；启用 compact 时构造紧凑结构，不合法时回退 pydantic 以给出详细错误。"""
+        if self._compact:
+            try:
+                return parse_sync_compact(data)  # type: ignore[return-value]
+            except ValueError:
+                pass
         return SyncMessageResponse.model_validate(data)
 
-    async def sync_messages(self, *, timeout: float = 180.0) -> SyncMessageResponse:
+    async def sync_messages(self, *, timeout: Optional[float] = None) -> SyncMessageResponse:
         """
         主动拉取一次消息同步（长轮询）。
 
         与内部轮询使用同一接口；一般无需单独调用，除非自建轮询逻辑。
+        timeout 默认取 ClientConfig.sync_timeout（180s）。
         """
-        data = await self.t.post("/Msg/Sync", timeout=timeout)
+        data = await self.t.post("/Msg/Sync", timeout=timeout, lane=LANE_SYNC)
         return SyncMessageResponse.model_validate(data)
 
+    async def _poll_step(self) -> None:
+        """长轮询一次并分发，再按 PollPacer 给出的间隔等待；网络与服务端异常在此吞掉并退避。"""
+        pacer = self._pacer
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            resp = await self._sync_once()
+            elapsed = loop.time() - started
+            batch = len(resp.addMsgs or ())
+
+            await self._deliver(resp)
+            delay = pacer.after_batch(batch, elapsed)
+
+        except httpx.TimeoutException:
+            delay = pacer.after_timeout()
+        except HttpError as e:
+            if is_wrapped_request_timeout(e):
+                delay = pacer.after_timeout()
+            else:
+                logger.warning(f"消息轮询异常: {e}")
+                delay = pacer.after_error()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"消息轮询异常: {e}")
+            delay = pacer.after_error()
+        # 连续有消息时 delay 为 0，仍让出一次事件循环
+        await asyncio.sleep(delay)
+
     async def _polling_loop(self):
         logger.success("微信消息长轮询已启动")
 
         while not self._stop_event.is_set():
             try:
-                resp = await self._sync_once()
-
-                if resp.addMsgs:
-                    # 统一向回调注入 client，处理器里可以直接调发消息等接口。
-                    if self._handler and self.client:
-                        try:
-                            await self._handler(self.client, resp)
-                        except Exception:
-                            logger.exception("消息处理函数异常")
-                    elif not self.client:
-                        logger.error("MsgClient.client 未注入！无法调用消息处理器")
-
-                await asyncio.sleep(self.interval)
-
-            except httpx.TimeoutException:
-                await asyncio.sleep(self.interval)
-            except HttpError as e:
-                if is_wrapped_request_timeout(e):
-                    await asyncio.sleep(self.interval)
-                    continue
-                logger.warning(f"消息轮询异常: {e}")
-                await asyncio.sleep(2)
+                await self._poll_step()
             except asyncio.CancelledError:
                 break
-            except Exception as e:
-                logger.error(f"消息轮询异常: {e}")
-                await asyncio.sleep(2)
 
         logger.info("消息轮询已停止")
 
+    async def _gap_fill(self, wxid: str) -> None:
+        """WebSocket 重连后补拉一次 /Msg/Sync，取回断线期间的消息（重复的由去重过滤）。"""
+        try:
+            resp = await self._sync_once(timeout=_GAP_FILL_TIMEOUT_SEC)
+        except asyncio.CancelledError:
+            raise
+        except httpx.TimeoutException:
+            logger.debug(f"重连补拉无新消息 (wxid={wxid})")
+            return
+        except HttpError as e:
+            if not is_wrapped_request_timeout(e):
+                logger.warning(f"重连补拉消息失败: {e} (wxid={wxid})")
+            return
+        except Exception as e:
+            logger.warning(f"重连补拉消息失败: {e} (wxid={wxid})")
+            return
+        if resp.addMsgs:
+            logger.info(f"重连补拉到 {len(resp.addMsgs)} 条消息 (wxid={wxid})")
+        await self._deliver(resp)
+
+    async def _open_ws(self, ws_url: str) -> WsConnection:
+        """建立一条消息 WebSocket（连接失败时关闭 session 并抛出原异常）。"""
+        timeout = aiohttp.ClientTimeout(sock_read=_WS_SOCK_READ_TIMEOUT_SEC)
+        session = aiohttp.ClientSession(timeout=timeout)
+        try:
+            ws = await session.ws_connect(
+                ws_url,
+                heartbeat=_WS_HEARTBEAT_SEC,
+                receive_timeout=None,
+            )
+        except BaseException:
+            await session.close()
+            raise
+        return session, ws
+
+    async def _probe_ws(self, ws_url: str) -> Optional[WsConnection]:
+        """探测 WebSocket 是否恢复；成功时返回已建立的连接，直接交给 _ws_loop 使用。"""
+        try:
+            return await self._open_ws(ws_url)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return None
+
+    async def _hybrid_loop(self, wxid: str) -> None:
+        """优先 WebSocket；重连耗尽后降级为 HTTP 长轮询，并在后台探测 WebSocket 恢复后切回。"""
+        ws_url = build_msg_ws_url(self.t._config.base_url, wxid, encoding=self._ws_encoding)
+        handover: Optional[WsConnection] = None
+        while not self._stop_event.is_set():
+            self._active_sync = "websocket"
+            await self._ws_loop(wxid, fallback=True, handover=handover)
+            handover = None
+            if self._stop_event.is_set():
+                break
+
+            self._active_sync = "poll"
+            logger.warning(
+                f"WebSocket 不可用，已切换为 HTTP 长轮询，每 {_WS_PROBE_INTERVAL_SEC:.0f}s 探测恢复 (wxid={wxid})"
+            )
+            loop = asyncio.get_running_loop()
+            next_probe = loop.time() + _WS_PROBE_INTERVAL_SEC
+            try:
+                while not self._stop_event.is_set():
+                    if loop.time() >= next_probe:
+                        handover = await self._probe_ws(ws_url)
+                        if handover is not None:
+                            logger.success(f"WebSocket 已恢复，切回 WebSocket 同步 (wxid={wxid})")
+                            # 切回后补拉一次，覆盖最后一次长轮询到 WS 建连之间的空档
+                            self._ws_connected_before = True
+                            break
+                        next_probe = loop.time() + _WS_PROBE_INTERVAL_SEC
+                    await self._poll_step()
+            except asyncio.CancelledError:
+                break
+
+        if handover is not None:
+            await handover[1].close()
+            await handover[0].close()
+        logger.info("消息同步（hybrid）已停止")
+
     def _parse_sync_payload(self, raw: str | bytes | dict) -> Optional[SyncMessageResponse]:
-        """解析 WebSocket 推送的同步消息体（兼容裸 data 与 ApiResponse 包装）。"""
+        """解析 WebSocket 推送的同步消息体（兼容裸 data、ApiResponse 包装与 protobuf AddMsg）。"""
+        if self._recorder is not None:
+            self._recorder.record("ws", raw)
+        if (
+            isinstance(raw, bytes)
+            and self._ws_encoding == "protobuf"
+            and not _is_json_frame(raw)
+        ):
+            try:
+                return self._sync_model({"addMsgs": [decode_add_msg_dict(raw)]})
+            except (DecodeError, ValueError) as e:
+                # ValueError 含 pydantic ValidationError：字段齐全但取值不合法的 AddMsg
+                logger.warning(f"WebSocket protobuf 消息解析失败: {e}")
+                return None
         if isinstance(raw, (str, bytes)):
             try:
-                payload = json.loads(raw)
-            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                payload = json_loads(raw)
+            except ValueError as e:
                 logger.warning(f"WebSocket 消息非 JSON: {e}")
                 return None
         elif isinstance(raw, dict):
@@ -127,9 +310,9 @@ class MsgClient:
 
         try:
             if "addMsgs" in payload or "modContacts" in payload:
-                return SyncMessageResponse.model_validate(payload)
+                return self._sync_model(payload)
             if payload.get("code") == 200 and isinstance(payload.get("data"), dict):
-                return SyncMessageResponse.model_validate(payload["data"])
+                return self._sync_model(payload["data"])
             api_resp = ApiResponse[SyncMessageResponse].model_validate(payload)
             if api_resp.data is not None:
                 return api_resp.data
@@ -138,20 +321,96 @@ class MsgClient:
         return None
 
     async def _dispatch_sync(self, resp: SyncMessageResponse) -> None:
+        if resp.addMsgs and self._seen is not None:
+            fresh = self._seen.filter_new(resp.addMsgs)
+            if len(fresh) != len(resp.addMsgs):
+                logger.debug(f"跳过重复消息 {len(resp.addMsgs) - len(fresh)} 条")
+                resp.addMsgs = fresh
+        cursor = self._cursor
+        # 空批 / 全部重复的批次也登记，keyBuf 按到达顺序推进
+        ticket = cursor.begin(resp.keyBuf, resp.addMsgs or ()) if cursor is not None else None
         if not resp.addMsgs:
+            if ticket is not None:
+                cursor.complete(ticket)
             return
+        pending = None
+        # 统一向回调注入 client，处理器里可以直接调发消息等接口。
         if self._handler and self.client:
             try:
-                await self._handler(self.client, resp)
+                result = await self._handler(self.client, resp)
+                if asyncio.isfuture(result):
+                    pending = result
+            except asyncio.CancelledError:
+                if ticket is not None:
+                    cursor.drop(ticket)
+                raise
             except Exception:
                 logger.exception("消息处理函数异常")
         elif not self.client:
             logger.error("MsgClient.client 未注入！无法调用消息处理器")
+        if ticket is None:
+            return
+        if pending is None:
+            cursor.complete(ticket)
+        else:
+            # 处理器只是把消息交给了异步执行的通道：等真正处理完再推进断点；被取消则放弃该批
+            pending.add_done_callback(
+                lambda f: cursor.drop(ticket) if f.cancelled() else cursor.complete(ticket)
+            )
+
+    async def _deliver(self, resp: SyncMessageResponse) -> None:
+        """
+        分发长轮询 / 补拉得到的结果。
+
+        启用分发队列时入队，由 _consume_loop 与 WebSocket 推送按到达顺序串行处理，
+        避免补拉与推送并发进入处理器、造成同会话消息乱序；纯长轮询模式直接分发。
+        """
+        if self._queue is not None:
+            await self._queue.put_item(resp)
+        else:
+            await self._dispatch_sync(resp)
+
+    async def _consume_loop(self, queue: DispatchQueue) -> None:
+        """从分发队列取帧（或已解析的补拉结果）、解析并回调处理器（与 WebSocket 读协程解耦）。"""
+        while True:
+            raw = await queue.get()
+            try:
+                resp = self._parse_sync_payload(raw) if isinstance(raw, (str, bytes)) else raw
+                if resp:
+                    await self._dispatch_sync(resp)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 单帧出错不能让消费协程退出，否则队列再无人消费、消息全部积压
+                logger.exception("分发同步消息异常，已跳过该帧")
+
+    def dispatch_stats(self) -> Optional[dict]:
+        """WebSocket 分发队列的深度与计数快照；未启用队列时返回 None。"""
+        return self._queue.stats() if self._queue else None
+
+    def poll_stats(self) -> dict:
+        """长轮询的实际频率（polls_per_min）、空批数与批大小统计（websocket 模式下基本为 0）。"""
+        return self._pacer.stats()
+
+    def dedup_stats(self) -> Optional[dict]:
+        """消息去重的容量与命中率；未启用去重时返回 None。"""
+        return self._seen.stats() if self._seen else None
+
+    async def _ws_loop(
+        self,
+        wxid: str,
+        *,
+        fallback: bool = False,
+        handover: Optional[WsConnection] = None,
+    ) -> None:
+        """
+        按 wxid 维持独立 WebSocket 长连接接收同步消息。
 
-    async def _ws_loop(self, wxid: str) -> None:
-        """按 wxid 维持独立 WebSocket 长连接接收同步消息。"""
+        连续重连失败达上限时：fallback=True 直接返回（由 hybrid 降级为长轮询），
+        否则调用 on_ws_exhausted 并停止。handover 为 hybrid 探测时已建立的连接，首轮直接使用。
+        """
         base_url = self.t._config.base_url
-        ws_url = build_msg_ws_url(base_url, wxid)
+        ws_url = build_msg_ws_url(base_url, wxid, encoding=self._ws_encoding)
         logger.success(f"微信消息 WebSocket 已启动: {ws_url}")
 
         reconnect_delay = 2.0
@@ -159,17 +418,21 @@ class MsgClient:
         while not self._stop_event.is_set():
             session: Optional[aiohttp.ClientSession] = None
             try:
-                timeout = aiohttp.ClientTimeout(sock_read=_WS_SOCK_READ_TIMEOUT_SEC)
-                session = aiohttp.ClientSession(timeout=timeout)
+                if handover is not None:
+                    session, ws = handover
+                    handover = None
+                else:
+                    session, ws = await self._open_ws(ws_url)
                 self._ws_session = session
-                async with session.ws_connect(
-                    ws_url,
-                    heartbeat=_WS_HEARTBEAT_SEC,
-                    receive_timeout=None,
-                ) as ws:
+                async with ws:
                     reconnect_delay = 2.0
                     reconnect_failures = 0
                     logger.info(f"WebSocket 已连接 (wxid={wxid})")
+                    if self._ws_connected_before or self._resume_key:
+                        # 断线（或进程重启）期间的消息不会经 WebSocket 补发，后台补拉一次，不阻塞读取
+                        if self._gap_task is None or self._gap_task.done():
+                            self._gap_task = asyncio.create_task(self._gap_fill(wxid))
+                    self._ws_connected_before = True
                     while not self._stop_event.is_set():
                         try:
                             msg = await ws.receive()
@@ -182,14 +445,9 @@ class MsgClient:
                             logger.warning(f"WebSocket 读取异常: {e}，将重连 (wxid={wxid})")
                             break
 
-                        if msg.type == aiohttp.WSMsgType.TEXT:
-                            resp = self._parse_sync_payload(msg.data)
-                            if resp:
-                                await self._dispatch_sync(resp)
-                        elif msg.type == aiohttp.WSMsgType.BINARY:
-                            resp = self._parse_sync_payload(msg.data)
-                            if resp:
-                                await self._dispatch_sync(resp)
+                        if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                            if self._queue is not None:
+                                await self._queue.put(msg.data)
                         elif msg.type == aiohttp.WSMsgType.CLOSE:
                             code = msg.data
                             extra = f", code={code}" if code is not None else ""
@@ -220,6 +478,8 @@ class MsgClient:
                 break
 
             reconnect_failures += 1
+            if reconnect_failures >= _WS_MAX_RECONNECT_ATTEMPTS and fallback:
+                return
             if reconnect_failures >= _WS_MAX_RECONNECT_ATTEMPTS:
                 logger.error(
                     f"WebSocket 已连续重连失败 {reconnect_failures} 次，停止重连 (wxid={wxid})"
@@ -248,15 +508,34 @@ class MsgClient:
         mode: str | SyncMode = "poll",
         wxid: Optional[str] = None,
         on_ws_exhausted: Optional[WsExhaustedCallback] = None,
+        queue_size: int = 256,
+        queue_overflow: OverflowPolicy = "block",
+        dedup_size: int = 4096,
+        dedup_path: Optional[Union[str, Path]] = None,
+        cursor_path: Optional[Union[str, Path]] = None,
+        record_path: Optional[Union[str, Path]] = None,
+        ws_encoding: str | WsEncoding = "json",
+        compact: bool = False,
     ):
         """
         启动消息监听，回调会收到完整的 LwApiClient 实例。
 
         Args:
             handler: 消息处理回调
-            mode: poll（HTTP 长轮询）或 websocket（每 wxid 一条 WS）
+            mode: poll（HTTP 长轮询）、websocket（每 wxid 一条 WS），或 hybrid
+                （WS 重连耗尽后自动降级为长轮询，后台探测恢复后切回，不会调用 on_ws_exhausted）
             wxid: WebSocket 模式必填；未传时使用 client.wxid
             on_ws_exhausted: WebSocket 连续重连失败达上限时调用（非手动 stop）
+            queue_size: WebSocket 收包与处理之间的分发队列容量
+            queue_overflow: 队列满时的策略：block / drop_oldest / spill（见 lwapi.dispatch）
+            dedup_size: 按 newMsgId 去重时记住的最近消息数，0 关闭去重
+            dedup_path: 去重记录的持久化文件；传入后启动时加载、停止时保存
+            cursor_path: 同步断点文件（见 lwapi.cursor）；传入后从断点续传，运行中批量落盘
+            record_path: 录制原始同步数据到该 .ndjson.gz 文件（见 lwapi.recorder），用于离线回放
+            ws_encoding: WebSocket 推送编码：json，或 protobuf（握手时协商，
+                二进制帧按 proto/addmsg.proto 解码；服务端仍推 JSON 时自动兼容）
+            compact: 回调收到紧凑结构（见 lwapi.models.msg_compact）而非 pydantic 模型，
+                ``msg.content.string`` 等属性访问不变，解析更快、占用内存更少
         """
         if self._task and not self._task.done():
             logger.warning("消息监听已启动，请勿重复启动")
@@ -268,24 +547,75 @@ class MsgClient:
 
         try:
             sync_mode = normalize_sync_mode(mode)
+            ws_encoding = normalize_ws_encoding(ws_encoding)
         except ValueError as e:
             logger.error(str(e))
             return
 
         effective_wxid = (wxid or self.client.wxid or "").strip()
-        if sync_mode == "websocket" and not effective_wxid:
+        if sync_mode in ("websocket", "hybrid") and not effective_wxid:
             logger.error("WebSocket 同步需要 wxid，请先登录或传入 wxid")
             return
 
         self._handler = handler
         self._sync_mode = sync_mode
+        self._ws_encoding = ws_encoding
+        self._compact = compact
         self._on_ws_exhausted = on_ws_exhausted
         self._stop_event.clear()
+        self._ws_connected_before = False
+        self._active_sync = "poll" if sync_mode == "poll" else "websocket"
+        self._pacer = PollPacer(self.interval, self.max_interval)
+        # 上次以 websocket / hybrid 运行留下的分发队列已关闭、无人消费；
+        # 不清掉的话以 poll 重启后 _deliver 会把消息送进旧队列而丢失
+        self._queue = None
+        self._consumer_task = None
+
+        self._seen_path = Path(dedup_path) if dedup_path else None
+        if dedup_size > 0:
+            self._seen = SeenMessageSet(dedup_size)
+            if self._seen_path is not None:
+                self._seen.load(self._seen_path)
+        else:
+            self._seen = None
 
-        if sync_mode == "websocket":
-            self._task = asyncio.create_task(self._ws_loop(effective_wxid))
-            logger.success(f"消息 WebSocket 启动成功 (wxid={effective_wxid})")
+        self._resume_key = None
+        if cursor_path:
+            self._cursor = SyncCursorStore(Path(cursor_path))
+            saved = self._cursor.load()
+            if saved is not None and saved.key_buf:
+                self._resume_key = saved.key_buf
+                logger.info(f"从同步断点续传 (msgSeq={saved.msg_seq}, newMsgId={saved.new_msg_id})")
         else:
+            self._cursor = None
+
+        if record_path:
+            try:
+                self._recorder = SyncRecorder(record_path, wxid=effective_wxid, ws_encoding=ws_encoding)
+                logger.info(f"正在录制同步数据: {record_path}")
+            except OSError as e:
+                logger.warning(f"无法录制同步数据 {record_path}: {e}")
+                self._recorder = None
+        else:
+            self._recorder = None
+
+        if sync_mode in ("websocket", "hybrid"):
+            try:
+                self._queue = DispatchQueue(queue_size, queue_overflow)
+            except ValueError as e:
+                logger.error(str(e))
+                return
+            self._consumer_task = asyncio.create_task(self._consume_loop(self._queue))
+            if self._cursor is not None:
+                self._cursor_task = asyncio.create_task(self._cursor.flush_loop())
+            if sync_mode == "hybrid":
+                self._task = asyncio.create_task(self._hybrid_loop(effective_wxid))
+            else:
+                self._task = asyncio.create_task(self._ws_loop(effective_wxid))
+            logger.success(f"消息 WebSocket 启动成功 (wxid={effective_wxid}, mode={sync_mode})")
+        else:
+            if self._cursor is not None:
+                self._cursor_task = asyncio.create_task(self._cursor.flush_loop())
             self._task = asyncio.create_task(self._polling_loop())
             logger.success("消息长轮询启动成功")
 
@@ -293,6 +623,11 @@ class MsgClient:
     def sync_mode(self) -> SyncMode:
         return self._sync_mode
 
+    @property
+    def active_sync(self) -> SyncMode:
+        """当前实际承载同步的通道：websocket 或 poll（hybrid 降级期间为 poll）。"""
+        return self._active_sync
+
     # ==================== 停止监听 ====================
     def stop(self):
         """停止消息监听（轮询或 WebSocket）"""
@@ -300,24 +635,116 @@ class MsgClient:
         self._stop_event.set()
         if self._task:
             self._task.cancel()
+        if self._consumer_task:
+            self._consumer_task.cancel()
+        if self._gap_task:
+            self._gap_task.cancel()
+        if self._cursor_task:
+            self._cursor_task.cancel()
 
     async def wait_stop(self):
         """等待监听任务彻底结束（优雅退出时使用）"""
-        if self._task:
+        for task in (self._task, self._consumer_task, self._gap_task, self._cursor_task):
+            if task:
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._consumer_task = None
+        self._gap_task = None
+        self._cursor_task = None
+        if self._cursor is not None:
+            await self._cursor.flush()
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+        if self._queue is not None:
+            self._queue.close()
+            self._queue = None
+        if self._seen is not None and self._seen_path is not None:
+            # 尚未处理完的消息不记为已见：断点未越过它们，重启后会重新拉取并处理
+            pending = self._cursor.pending_keys() if self._cursor is not None else ()
+            keys = self._seen.snapshot(pending)
             try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+                await asyncio.to_thread(self._seen.save, self._seen_path, keys)
+            except OSError as e:
+                logger.warning(f"保存消息去重记录失败 {self._seen_path}: {e}")
         if self._ws_session and not self._ws_session.closed:
             await self._ws_session.close()
             self._ws_session = None
             
             
+    # ==================== 发送队列 ====================
+    def enable_outbox(self, config: Optional[OutboxConfig] = None) -> OutboundScheduler:
+        """
+        开启发送队列（见 lwapi.outbox）：之后各 send_* / share_* 接口按接收者与账号限速、
+        按优先级排队发出，调用方仍 await 得到原始返回。重复调用返回已有队列。
+        """
+        if self._outbox is None:
+            self._outbox = OutboundScheduler(
+                self._post_direct,
+                config,
+                text_path="/Msg/SendTxt",
+                text_payload=self._text_payload,
+            )
+        return self._outbox
+
+    async def close_outbox(self) -> None:
+        """关闭发送队列（等待在途请求；仍在排队的消息以 LwApiError 失败）。"""
+        outbox, self._outbox = self._outbox, None
+        if outbox is not None:
+            await outbox.aclose()
+
+    def outbox_stats(self) -> Optional[dict[str, Any]]:
+        """发送队列深度、吞吐与排队等待时间；未开启时为 None。"""
+        return self._outbox.stats() if self._outbox is not None else None
+
+    async def _post_direct(self, path: str, payload: Any, timeout: Optional[float]) -> Any:
+        return await self.t.post(path, json=payload, timeout=timeout)
+
+    @staticmethod
+    def _text_payload(to_wxid: str, content: str, at: Optional[str]) -> dict:
+        return SendNewMsgParam(to_wxid=to_wxid, content=content, at=at).to_api()
+
+    async def _post_send(
+        self,
+        to_wxid: str,
+        path: str,
+        payload: Any,
+        *,
+        timeout: Optional[float] = None,
+        priority: Optional[SendPriority] = None,
+    ) -> Any:
+        """发送类接口统一出口：开启发送队列时排队限速，否则直接请求。"""
+        if self._outbox is None:
+            return await self._post_direct(path, payload, timeout)
+        return await self._outbox.submit(to_wxid, path, payload, timeout=timeout, priority=priority)
+
+    def queue_text_message(
+        self,
+        to_wxid: str,
+        content: str,
+        at: Optional[str] = None,
+        *,
+        priority: Optional[SendPriority] = None,
+    ) -> SendReceipt:
+        """
+        文本消息入队并立即返回回执（``await receipt`` 得到原始返回）；需先 enable_outbox。
+
+        与 send_text_message 相比不等待发出，适合一次提交多条后统一等待。
+        """
+        if self._outbox is None:
+            raise RuntimeError("发送队列未开启，请先调用 enable_outbox()")
+        at_clean = at.strip() if at and at.strip() else None
+        return self._outbox.submit_text(to_wxid, content, at_clean, priority=priority)
+
     async def send_text_message(
         self,
         to_wxid: str,
         content: str,
         at: Optional[str] = None,
+        *,
+        priority: Optional[SendPriority] = None,
     ) -> dict:
         """
         发送文本消息（支持单聊、群聊、@成员）。
@@ -330,11 +757,15 @@ class MsgClient:
             content: 消息内容
             at: 群聊时要@的人，多个用英文逗号分隔（如：wxid_abc,wxid_def）
                 如果不需要@，传 None 或空字符串
+            priority: 开启发送队列时的优先级（interactive / normal / bulk），
+                默认取 ``lwapi.outbox.send_priority`` 上下文，否则为 normal
 
         Returns:
             dict: 原始返回结果，包含 code, data, message
         """
         at_clean = at.strip() if at and at.strip() else None
+        if self._outbox is not None:
+            return await self._outbox.submit_text(to_wxid, content, at_clean, priority=priority)
         payload = SendNewMsgParam(
             to_wxid=to_wxid,
             content=content,
@@ -346,6 +777,122 @@ class MsgClient:
         # 统一返回原始结构，便于你判断成功失败
         return data
 
+    async def send_many(
+        self,
+        targets: Targets[str],
+        content: Union[str, Callable[[str], str]],
+        *,
+        at: Optional[str] = None,
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        checkpoint: Optional[Union[str, Path]] = None,
+        priority: SendPriority = "bulk",
+    ) -> BulkResult:
+        """
+        向多个接收者发送文本（群发），见 lwapi.bulk。
+
+        Args:
+            targets: 接收者 wxid 的可迭代对象或异步迭代器（流式读取，不必一次性展开）
+            content: 文本，或按接收者生成文本的函数
+            concurrency: 同时进行的发送数
+            rate: 本次群发的总速率上限（条/秒），None 不限；开启发送队列时另受其限速
+            checkpoint: 断点文件；中断后用同一文件重跑会跳过已完成的接收者
+            priority: 发送队列优先级，默认 bulk（不抢占插件的交互回复）
+
+        Returns:
+            BulkResult：ok / failed / retryable 三类结果与耗时
+        """
+
+        async def _send_one(to_wxid: str) -> Any:
+            text = content(to_wxid) if callable(content) else content
+            return await self.send_text_message(to_wxid, text, at, priority=priority)
+
+        with send_priority(priority):
+            return await run_bulk(
+                targets, _send_one, concurrency=concurrency, rate=rate, checkpoint=checkpoint
+            )
+
+    async def _fan_out(
+        self,
+        targets: Targets[str],
+        fanout: MediaFanout,
+        *,
+        concurrency: int,
+        rate: Optional[float],
+        checkpoint: Optional[Union[str, Path]],
+        priority: SendPriority,
+    ) -> BulkResult:
+        with send_priority(priority):
+            result = await run_bulk(
+                targets, fanout, concurrency=concurrency, rate=rate, checkpoint=checkpoint
+            )
+        logger.info(f"媒体群发（{fanout.kind}）：上传 {fanout.uploads} 次，CDN 转发 {fanout.forwards} 次")
+        return result
+
+    async def send_image_many(
+        self,
+        targets: Targets[str],
+        *,
+        image_b64: Optional[str] = None,
+        image_url: Optional[str] = None,
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        checkpoint: Optional[Union[str, Path]] = None,
+        priority: SendPriority = "bulk",
+        timeout: Optional[float] = None,
+    ) -> BulkResult:
+        """
+        同一张图片发给多个会话：只上传一次，其余按 CDN 消息 XML 转发（见 lwapi.fanout）。
+
+        image_b64 与 image_url 二选一；其余参数同 :meth:`send_many`。
+        """
+        if image_b64 is None:
+            if not image_url:
+                raise ValueError("image_b64 与 image_url 需提供其一")
+            fetcher = self.media_fetcher or default_media_fetcher()
+            image_b64 = await fetcher.fetch_base64(image_url)
+        b64 = image_b64
+        fanout = MediaFanout(
+            wxid=self.client.wxid if self.client else "",
+            kind="image",
+            digest=content_key(b64),
+            upload=lambda to: self.upload_image_base64(to, b64, timeout=timeout),
+            forward=lambda to, xml: self.send_cdn_image(to, xml, timeout=timeout),
+            cache=self.cdn_cache or default_cdn_cache(),
+        )
+        return await self._fan_out(
+            targets, fanout, concurrency=concurrency, rate=rate, checkpoint=checkpoint, priority=priority
+        )
+
+    async def send_video_many(
+        self,
+        targets: Targets[str],
+        *,
+        video_b64: str,
+        image_base64: str,
+        play_length: int,
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        checkpoint: Optional[Union[str, Path]] = None,
+        priority: SendPriority = "bulk",
+        timeout: Optional[float] = None,
+    ) -> BulkResult:
+        """同一段视频发给多个会话：只上传一次，其余按 CDN 消息 XML 转发；参数同 send_video_message / send_many。"""
+        fanout = MediaFanout(
+            wxid=self.client.wxid if self.client else "",
+            kind="video",
+            digest=content_key(video_b64),
+            upload=lambda to: self.send_video_message(
+                to, play_length, video_b64, image_base64, timeout=timeout
+            ),
+            forward=lambda to, xml: self.send_cdn_video(to, xml, timeout=timeout),
+            cache=self.cdn_cache or default_cdn_cache(),
+            play_length=play_length,
+        )
+        return await self._fan_out(
+            targets, fanout, concurrency=concurrency, rate=rate, checkpoint=checkpoint, priority=priority
+        )
+
     async def revoke_message(
         self,
         *,
@@ -373,9 +920,10 @@ class MsgClient:
         self, to_wxid: str, xml: str, msg_type: int, *, timeout: Optional[float] = None
     ) -> Any:
         """发送小程序消息。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/SendApp",
-            json=SendAppMsgParam(to_wxid=to_wxid, xml=xml, msg_type=msg_type).to_api(),
+            SendAppMsgParam(to_wxid=to_wxid, xml=xml, msg_type=msg_type).to_api(),
             timeout=timeout,
         )
 
@@ -383,9 +931,10 @@ class MsgClient:
         self, to_wxid: str, content_xml: str, *, timeout: Optional[float] = None
     ) -> Any:
         """转发 CDN 文件消息（content 为消息 XML）。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/SendCDNFile",
-            json=MsgForwardXmlParam(to_wxid=to_wxid, content=content_xml).to_api(),
+            MsgForwardXmlParam(to_wxid=to_wxid, content=content_xml).to_api(),
             timeout=timeout,
         )
 
@@ -393,9 +942,10 @@ class MsgClient:
         self, to_wxid: str, content_xml: str, *, timeout: Optional[float] = None
     ) -> Any:
         """转发 CDN 图片消息。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/SendCDNImg",
-            json=MsgForwardXmlParam(to_wxid=to_wxid, content=content_xml).to_api(),
+            MsgForwardXmlParam(to_wxid=to_wxid, content=content_xml).to_api(),
             timeout=timeout,
         )
 
@@ -403,9 +953,10 @@ class MsgClient:
         self, to_wxid: str, content_xml: str, *, timeout: Optional[float] = None
     ) -> Any:
         """转发 CDN 视频消息。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/SendCDNVideo",
-            json=MsgForwardXmlParam(to_wxid=to_wxid, content=content_xml).to_api(),
+            MsgForwardXmlParam(to_wxid=to_wxid, content=content_xml).to_api(),
             timeout=timeout,
         )
 
@@ -413,9 +964,10 @@ class MsgClient:
         self, to_wxid: str, total_len: int, md5: str, *, timeout: Optional[float] = None
     ) -> Any:
         """发送表情消息。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/SendEmoji",
-            json=SendEmojiParam(to_wxid=to_wxid, total_len=total_len, md5=md5).to_api(),
+            SendEmojiParam(to_wxid=to_wxid, total_len=total_len, md5=md5).to_api(),
             timeout=timeout,
         )
 
@@ -432,9 +984,10 @@ class MsgClient:
         timeout: Optional[float] = None,
     ) -> Any:
         """发送引用消息。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/SendQuote",
-            json=SendQuoteMsgParam(
+            SendQuoteMsgParam(
                 to_wxid=to_wxid,
                 fromusr=fromusr,
                 displayname=displayname,
@@ -450,43 +1003,55 @@ class MsgClient:
         self,
         to_wxid: str,
         play_length: int,
-        video_b64: str,
-        image_base64: str,
+        video_b64: MediaSource,
+        image_base64: MediaSource,
         *,
         timeout: Optional[float] = None,
     ) -> Any:
-        """发送视频消息（视频与封面均为 Base64）。"""
-        return await self.t.post(
+        """
+        发送视频消息。
+
+        视频与封面可传 Base64 字符串，也可传文件路径、bytes 或二进制流；
+        后者按块编码流式发送，不在内存中生成完整的 Base64（见 lwapi.streaming）。
+        """
+        return await self._post_send(
+            to_wxid,
             "/Msg/SendVideo",
-            json=SendVideoMsgParam(
+            media_body(
+                SendVideoMsgParam,
+                {"video_b64": video_b64, "image_base64": image_base64},
                 to_wxid=to_wxid,
                 play_length=play_length,
-                video_b64=video_b64,
-                image_base64=image_base64,
-            ).to_api(),
+            ),
             timeout=timeout,
         )
 
     async def send_voice_message(
         self,
         to_wxid: str,
-        voice_b64: str,
+        voice_b64: MediaSource,
         voice_type: int,
         voice_time_ms: int,
         wxid: Optional[str] = None,
         *,
         timeout: Optional[float] = None,
     ) -> Any:
-        """发送语音消息（voice_type：AMR=0, MP3=2 等；voice_time_ms 为毫秒）。"""
-        return await self.t.post(
+        """
+        发送语音消息（voice_type：AMR=0, MP3=2 等；voice_time_ms 为毫秒）。
+
+        voice_b64 可传 Base64 字符串、文件路径、bytes 或二进制流，同 send_video_message。
+        """
+        return await self._post_send(
+            to_wxid,
             "/Msg/SendVoice",
-            json=SendVoiceMessageParam(
+            media_body(
+                SendVoiceMessageParam,
+                {"voice_b64": voice_b64},
                 to_wxid=to_wxid,
-                voice_b64=voice_b64,
                 voice_type=voice_type,
                 voice_time=voice_time_ms,
                 wxid=wxid,
-            ).to_api(),
+            ),
             timeout=timeout,
         )
 
@@ -500,9 +1065,10 @@ class MsgClient:
         timeout: Optional[float] = None,
     ) -> Any:
         """分享名片。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/ShareCard",
-            json=ShareCardParam(
+            ShareCardParam(
                 to_wxid=to_wxid,
                 card_wx_id=card_wx_id,
                 card_nick_name=card_nick_name,
@@ -522,9 +1088,10 @@ class MsgClient:
         timeout: Optional[float] = None,
     ) -> Any:
         """发送分享链接消息。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/ShareLink",
-            json=SendShareLinkMsgParam(
+            SendShareLinkMsgParam(
                 to_wxid=to_wxid, title=title, desc=desc, url=url, thumb_url=thumb_url
             ).to_api(),
             timeout=timeout,
@@ -543,9 +1110,10 @@ class MsgClient:
         timeout: Optional[float] = None,
     ) -> Any:
         """分享地理位置。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/ShareLocation",
-            json=ShareLocationParam(
+            ShareLocationParam(
                 to_wxid=to_wxid,
                 x=x,
                 y=y,
@@ -561,19 +1129,25 @@ class MsgClient:
         self, to_wxid: str, xml: str, *, timeout: Optional[float] = None
     ) -> Any:
         """分享视频（XML 消息体）。"""
-        return await self.t.post(
+        return await self._post_send(
+            to_wxid,
             "/Msg/ShareVideo",
-            json=ShareVideoXmlParam(to_wxid=to_wxid, xml=xml).to_api(),
+            ShareVideoXmlParam(to_wxid=to_wxid, xml=xml).to_api(),
             timeout=timeout,
         )
 
     async def upload_image_base64(
-        self, to_wxid: str, image_b64: str, *, timeout: Optional[float] = None
+        self, to_wxid: str, image_b64: MediaSource, *, timeout: Optional[float] = None
     ) -> Any:
-        """发送图片消息（直接传 Base64，不经 URL 下载）。"""
-        return await self.t.post(
+        """
+        发送图片消息（不经 URL 下载）。
+
+        image_b64 可传 Base64 字符串、文件路径、bytes 或二进制流，同 send_video_message。
+        """
+        return await self._post_send(
+            to_wxid,
             "/Msg/UploadImg",
-            json=SendImageMsgParam(to_wxid=to_wxid, image_b64=image_b64).to_api(),
+            media_body(SendImageMsgParam, {"image_b64": image_b64}, to_wxid=to_wxid),
             timeout=timeout,
         )
     
@@ -587,6 +1161,10 @@ class MsgClient:
         """
         发送图片消息（支持传入图片 URL，自动下载并转 Base64）
 
+        下载经进程级 :class:`~lwapi.media.MediaFetcher`（共享会话、磁盘缓存、同 URL 并发只下载一次），
+        同一张图群发到多个会话时只下载、编码一次；群发前可用
+        ``default_media_fetcher().prefetch(urls)`` 预取。
+
         Args:
             to_wxid: 接收者 wxid（个人）或群ID（群聊，如 xxx@chatroom）
             image_url: 图片的直链 URL（支持 jpg/png/gif/webp 等常见格式）
@@ -597,24 +1175,12 @@ class MsgClient:
                   成功时 data 中通常有 msg_id 等信息
 
         Raises:
-            ValueError: 下载失败或图片过大
-            aiohttp.ClientError: 网络异常
+            ValueError: 下载失败或图片过大（微信单张图片建议 ≤ 5MB）
         """
-        # Step 1: 下载图片并转为 Base64
+        fetcher = self.media_fetcher or default_media_fetcher()
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
-                async with session.get(image_url) as resp:
-                    if resp.status != 200:
-                        raise ValueError(f"图片下载失败，HTTP {resp.status}: {image_url}")
-                    
-                    image_bytes = await resp.read()
-                    
-                    # 可选：限制大小（微信单张图片建议 ≤ 10MB）
-                    if len(image_bytes) > 5 * 1024 * 1024:
-                        raise ValueError(f"图片过大（{len(image_bytes)/1024/1024:.2f}MB），微信限制建议 ≤ 5MB")
-                    
-                    base64_str = base64.b64encode(image_bytes).decode('utf-8')
-        except Exception as e:
-            raise ValueError(f"图片下载或编码失败: {str(e)}") from e
+            base64_str = await fetcher.fetch_base64(image_url, timeout=float(timeout))
+        except ValueError as e:
+            raise ValueError(f"图片下载或编码失败: {e}") from e
 
-        return await self.upload_image_base64(to_wxid, base64_str, timeout=float(timeout))
\ No newline at end of file
+        return await self.upload_image_base64(to_wxid, base64_str, timeout=float(timeout))
@@ -3,8 +3,10 @@
 
 from __future__ import annotations
 
-from typing import Any, Optional
+from pathlib import Path
+from typing import Any, Optional, Union
 
+from ..download import DEFAULT_SECTION_SIZE, download_sections
 from ..models.other_requests import (
     MiscCdnDownloadImageParam,
     MiscDownloadAppAttachParam,
@@ -106,6 +108,86 @@ class OtherClient:
             timeout=timeout,
         )
 
+    # ==================== 整体下载（并发分段） ====================
+    async def download_img_full(
+        self,
+        to_wxid: str,
+        msg_id: int,
+        data_len: int,
+        dest: Optional[Union[str, Path]] = None,
+        compress_type: int = 0,
+        *,
+        section_size: int = DEFAULT_SECTION_SIZE,
+        concurrency: int = 4,
+        retries: int = 3,
+        timeout: Optional[float] = None,
+    ) -> Union[Path, bytearray]:
+        """
+        按 data_len 并发分段下载整张高清图（见 lwapi.download）。
+
+        dest 为文件路径时直接写入预分配文件并返回路径，否则返回 bytearray；失败抛 DownloadError。
+        """
+        return await download_sections(
+            lambda start, n: self.download_img(
+                to_wxid, msg_id, data_len, start, n, compress_type, timeout=timeout
+            ),
+            data_len,
+            dest,
+            section_size=section_size,
+            concurrency=concurrency,
+            retries=retries,
+        )
+
+    async def download_video_full(
+        self,
+        to_wxid: str,
+        msg_id: int,
+        data_len: int,
+        dest: Optional[Union[str, Path]] = None,
+        compress_type: int = 0,
+        *,
+        section_size: int = DEFAULT_SECTION_SIZE,
+        concurrency: int = 4,
+        retries: int = 3,
+        timeout: Optional[float] = None,
+    ) -> Union[Path, bytearray]:
+        """并发分段下载整段视频；参数与返回同 :meth:`download_img_full`。"""
+        return await download_sections(
+            lambda start, n: self.download_video(
+                to_wxid, msg_id, data_len, start, n, compress_type, timeout=timeout
+            ),
+            data_len,
+            dest,
+            section_size=section_size,
+            concurrency=concurrency,
+            retries=retries,
+        )
+
+    async def download_file_full(
+        self,
+        app_id: str,
+        attach_id: str,
+        user_name: str,
+        data_len: int,
+        dest: Optional[Union[str, Path]] = None,
+        *,
+        section_size: int = DEFAULT_SECTION_SIZE,
+        concurrency: int = 4,
+        retries: int = 3,
+        timeout: Optional[float] = None,
+    ) -> Union[Path, bytearray]:
+        """并发分段下载整个文件附件；参数与返回同 :meth:`download_img_full`。"""
+        return await download_sections(
+            lambda start, n: self.download_file(
+                app_id, attach_id, user_name, data_len, start, n, timeout=timeout
+            ),
+            data_len,
+            dest,
+            section_size=section_size,
+            concurrency=concurrency,
+            retries=retries,
+        )
+
     async def download_voice(
         self,
         bufid: str,
@@ -0,0 +1,258 @@
+# lwapi/bulk.py
+"""
+批量发送：从（异步）可迭代对象流式取目标，限并发、限速发送，汇总结果，可断点续发。
+
+- 目标不会一次性全部展开到内存，数千上万个接收者也只占用并发数个协程；
+- 结果分三类：ok、failed（业务错误，重试无意义）、retryable（超时、网络错误、
+  HTTP 429/5xx、发送队列关闭，稍后可重试）；
+- 账号登录失效（LoginError）时立即停止，不再逐个尝试剩余目标（见 BulkResult.aborted）；
+- 断点文件为追加写入的 JSON 行，记录已完成（ok / failed）的目标；
+  中断后用同一文件重跑会跳过这些目标，只发送剩余与 retryable 的部分。
+
+单账号见 ``MsgClient.send_many``，跨账号见 ``src.runtime.client_registry.send_many_online``。
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    TypeVar,
+    Union,
+)
+
+from loguru import logger
+
+from .exceptions import HttpError, LoginError, SendQueueClosed
+from .outbox import TokenBucket
+
+T = TypeVar("T")
+Targets = Union[Iterable[T], AsyncIterable[T]]
+
+# 断点文件每记录多少条刷一次盘
+_CHECKPOINT_FLUSH_EVERY = 50
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    超时 / 网络错误、HTTP 429 与 5xx、发送队列关闭视为可重试；
+    业务错误（ApiError）、登录失效（LoginError）等其它 LwApiError 不重试。
+    """
+    if isinstance(exc, HttpError):
+        return exc.status_code in (0, 429) or exc.status_code >= 500
+    return isinstance(exc, (SendQueueClosed, asyncio.TimeoutError, ConnectionError))
+
+
+@dataclass
+class BulkResult:
+    """批量发送汇总；failed / retryable 为 目标 -> 错误描述。"""
+
+    ok: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    retryable: Dict[str, str] = field(default_factory=dict)
+    skipped: int = 0  # 断点文件中已完成而跳过的目标数
+    elapsed: float = 0.0
+    aborted: Optional[str] = None  # 因登录失效提前停止时的原因；剩余目标未发送
+
+    @property
+    def total(self) -> int:
+        return len(self.ok) + len(self.failed) + len(self.retryable)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "ok": len(self.ok),
+            "failed": len(self.failed),
+            "retryable": len(self.retryable),
+            "skipped": self.skipped,
+            "aborted": self.aborted,
+            "elapsed": round(self.elapsed, 3),
+            "per_sec": round(self.total / self.elapsed, 2) if self.elapsed > 0 else 0.0,
+        }
+
+
+class BulkCheckpoint:
+    """批量发送断点：追加写入 ``{"key": ..., "status": "ok" | "failed"}`` 行。"""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._done: Set[str] = set()
+        self._fp: Optional[IO[str]] = None
+        self._unflushed = 0
+        try:
+            with self.path.open("r", encoding="utf-8") as fp:
+                for line in fp:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # 中断时可能写了半行
+                    if isinstance(rec, dict) and rec.get("key") is not None:
+                        self._done.add(str(rec["key"]))
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def is_done(self, key: str) -> bool:
+        return key in self._done
+
+    def mark(self, key: str, status: str) -> None:
+        if self._fp is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fp = self.path.open("a", encoding="utf-8")
+        self._done.add(key)
+        self._fp.write(json.dumps({"key": key, "status": status, "t": time.time()}, ensure_ascii=False))
+        self._fp.write("\n")
+        self._unflushed += 1
+        if self._unflushed >= _CHECKPOINT_FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._fp is not None:
+            self._fp.flush()
+            self._unflushed = 0
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+class RateLimiter:
+    """多个协程共用的令牌桶（条/秒）；rate 为 None 或 <= 0 时不限速。"""
+
+    def __init__(self, rate: Optional[float], burst: int = 1) -> None:
+        self._bucket = TokenBucket(rate or 0.0, burst, time.monotonic()) if rate and rate > 0 else None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self._bucket is None:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                delay = self._bucket.delay(now)
+                if delay <= 0:
+                    self._bucket.consume(now)
+                    return
+                await asyncio.sleep(delay)
+
+
+async def _aiter(targets: Targets[T]) -> AsyncIterator[T]:
+    if hasattr(targets, "__aiter__"):
+        async for t in targets:  # type: ignore[union-attr]
+            yield t
+    else:
+        for t in targets:  # type: ignore[union-attr]
+            yield t
+
+
+class _Job(Generic[T]):
+    def __init__(
+        self,
+        targets: Targets[T],
+        send_one: Callable[[T], Awaitable[Any]],
+        key: Callable[[T], str],
+        limiter: RateLimiter,
+        checkpoint: Optional[BulkCheckpoint],
+    ) -> None:
+        self._it = _aiter(targets)
+        self._it_lock = asyncio.Lock()
+        self._send_one = send_one
+        self._key = key
+        self._limiter = limiter
+        self._checkpoint = checkpoint
+        self.result = BulkResult()
+
+    async def _next(self) -> tuple[bool, Optional[T]]:
+        async with self._it_lock:
+            try:
+                return True, await self._it.__anext__()
+            except StopAsyncIteration:
+                return False, None
+
+    async def worker(self) -> None:
+        res = self.result
+        while True:
+            if res.aborted is not None:
+                return
+            has_next, target = await self._next()
+            if not has_next:
+                return
+            k = self._key(target)  # type: ignore[arg-type]
+            if self._checkpoint is not None and self._checkpoint.is_done(k):
+                res.skipped += 1
+                continue
+            await self._limiter.acquire()
+            try:
+                await self._send_one(target)  # type: ignore[arg-type]
+            except asyncio.CancelledError:
+                raise
+            except LoginError as e:
+                # 登录失效时其余目标也必然失败：停止整个任务；不写断点，重新登录后重跑会再发
+                res.failed[k] = str(e)
+                if res.aborted is None:
+                    res.aborted = str(e)
+                    logger.warning(f"批量发送因登录失效停止: {e}")
+            except Exception as e:
+                if is_retryable(e):
+                    res.retryable[k] = str(e)
+                else:
+                    res.failed[k] = str(e)
+                    if self._checkpoint is not None:
+                        self._checkpoint.mark(k, "failed")
+            else:
+                res.ok.append(k)
+                if self._checkpoint is not None:
+                    self._checkpoint.mark(k, "ok")
+
+
+async def run_bulk(
+    targets: Targets[T],
+    send_one: Callable[[T], Awaitable[Any]],
+    *,
+    key: Callable[[T], str] = str,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    burst: int = 1,
+    checkpoint: Optional[Union[str, Path]] = None,
+) -> BulkResult:
+    """
+    对每个目标调用 send_one，最多 concurrency 个同时进行，整体不超过 rate 条/秒。
+
+    key 把目标映射为结果与断点中使用的字符串（默认 str）。任务被取消时断点仍会落盘，
+    用同一 checkpoint 重跑即从中断处继续。
+    """
+    cp = BulkCheckpoint(checkpoint) if checkpoint else None
+    if cp is not None and len(cp):
+        logger.info(f"批量发送从断点继续：已完成 {len(cp)} 个目标 ({cp.path})")
+    job = _Job(targets, send_one, key, RateLimiter(rate, burst), cp)
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*(job.worker() for _ in range(max(1, int(concurrency)))))
+    finally:
+        job.result.elapsed = time.monotonic() - started
+        if cp is not None:
+            cp.close()
+    summary = job.result.summary()
+    logger.info(
+        f"批量发送完成：成功 {summary['ok']}，失败 {summary['failed']}，可重试 {summary['retryable']}，"
+        f"跳过 {summary['skipped']}，{summary['per_sec']} 条/秒"
+        + (f"（登录失效提前停止: {job.result.aborted}）" if job.result.aborted else "")
+    )
+    return job.result
@@ -1,5 +1,7 @@
 # lwapi/client.py
-from .config import ClientConfig
+from typing import Optional
+
+from .config import ClientConfig, HttpPoolConfig, OutboxConfig
 from .transport import AsyncHTTPTransport
 from .apis.favor import FavorClient
 from .apis.finder import FinderClient
@@ -26,9 +28,34 @@ class LwApiClient:
     - ``favor`` / ``friend`` / ``group`` 等：其它业务域的同类封装。
     """
 
-    def __init__(self, base_url: str, timeout: float = 30.0):
-        """初始化 SDK 客户端。timeout 为普通接口默认超时；消息 Sync 等在各自调用处单独放宽。"""
-        self.config = ClientConfig(base_url=base_url, timeout=timeout)
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 30.0,
+        *,
+        pool: Optional[HttpPoolConfig] = None,
+        shared_pool: bool = False,
+        sync_pool: Optional[HttpPoolConfig] = None,
+        sync_timeout: float = 180.0,
+        outbox: Optional[OutboxConfig] = None,
+    ):
+        """
+        初始化 SDK 客户端。timeout 为普通接口默认超时；消息 Sync 等在各自调用处单独放宽。
+
+        pool 为连接池参数；shared_pool=True 时同参数的客户端复用进程级连接池
+        （多账号部署可显著减少连接数与握手），关闭客户端不会关闭共享池。
+        sync_pool / sync_timeout 为长轮询（/Msg/Sync）专用通道的连接池与超时，
+        与发消息等普通接口互不抢占连接。
+        outbox 非空时开启发送队列（按接收者 / 账号限速、优先级与短文本合并，见 lwapi.outbox）。
+        """
+        self.config = ClientConfig(
+            base_url=base_url,
+            timeout=timeout,
+            pool=pool or HttpPoolConfig(),
+            shared_pool=shared_pool,
+            sync_pool=sync_pool or HttpPoolConfig(),
+            sync_timeout=sync_timeout,
+        )
         self.transport = AsyncHTTPTransport(config=self.config)
         
         t = self.transport
@@ -49,6 +76,8 @@ class LwApiClient:
 
         # 反向注入 client，便于消息回调里拿到完整 SDK 能力。
         self.msg.client = self
+        if outbox is not None:
+            self.msg.enable_outbox(outbox)
         # 用于控制整个客户端生命周期，防止重复关闭。
         self._closed = False
 
@@ -70,6 +99,8 @@ class LwApiClient:
             self.msg.stop()
         if hasattr(self.msg, "wait_stop"):
             await self.msg.wait_stop()
+        # 等待在途发送结束，再关闭连接池
+        await self.msg.close_outbox()
 
         # 停止环境维持后台任务并等待结束，避免关闭连接池后仍有请求。
         if hasattr(self.login, "join_background_tasks"):
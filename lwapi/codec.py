@@ -0,0 +1,100 @@
+# lwapi/codec.py
+"""
+响应体 JSON 解码与外层结构校验（transport 热路径）。
+
+- 解码：优先 orjson，其次 msgspec，均未安装时回退标准库 json；
+- 校验：每个 response_model 只构造一次 ``ApiResponse[...]`` 并缓存；
+  默认的 ``dict`` 模型不走 pydantic，只检查 code / message。
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .models.base import ApiResponse
+
+JsonLoads = Callable[[Any], Any]
+
+
+def _select_loads() -> Tuple[str, JsonLoads]:
+    try:
+        import orjson
+
+        return "orjson", orjson.loads
+    except ImportError:
+        pass
+    try:
+        import msgspec
+
+        decoder = msgspec.json.Decoder()
+
+        def _msgspec_loads(data: Any) -> Any:
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            try:
+                return decoder.decode(data)
+            except msgspec.DecodeError as e:
+                # 与 json / orjson 一致，对外统一抛 ValueError
+                raise ValueError(str(e)) from e
+
+        return "msgspec", _msgspec_loads
+    except ImportError:
+        pass
+    return "json", json.loads
+
+
+CODEC_NAME, _loads = _select_loads()
+
+
+def json_loads(data: bytes | str) -> Any:
+    """解码 JSON；非法输入统一抛 ValueError（含 UnicodeDecodeError）。"""
+    return _loads(data)
+
+
+_validators: Dict[Any, Any] = {}
+
+
+def _validator_for(response_model: Any) -> Any:
+    """按 response_model 缓存参数化后的 ApiResponse，避免每次请求重复构造泛型类。"""
+    validator = _validators.get(response_model)
+    if validator is None:
+        validator = ApiResponse[response_model]
+        _validators[response_model] = validator
+    return validator
+
+
+def _parse_code(raw: Any) -> int:
+    if isinstance(raw, bool):
+        raise ValueError(f"invalid code: {raw!r}")
+    if isinstance(raw, int):
+        return raw
+    if isinstance(raw, str):
+        return int(raw.strip())
+    if isinstance(raw, float) and raw.is_integer():
+        return int(raw)
+    raise ValueError(f"invalid code: {raw!r}")
+
+
+def parse_envelope(raw_json: Any, response_model: Any = dict) -> Tuple[int, str, Optional[Any]]:
+    """
+    拆解 LwApi 外层结构，返回 (code, message, data)。
+
+    结构不合法时抛出 ValueError（dict 快速路径）或 pydantic ValidationError（其它模型）。
+    """
+    if response_model is dict:
+        if not isinstance(raw_json, dict):
+            raise ValueError(f"expected object, got {type(raw_json).__name__}")
+        if "code" not in raw_json:
+            raise ValueError("missing field: code")
+        code = _parse_code(raw_json["code"])
+        message = raw_json.get("message")
+        if message is not None and not isinstance(message, str):
+            raise ValueError(f"invalid message: {message!r}")
+        data = raw_json.get("data")
+        # 与 ApiResponse[dict] 一致：data 只能是对象或 null
+        if data is not None and not isinstance(data, dict):
+            raise ValueError(f"invalid data: expected object, got {type(data).__name__}")
+        return code, message or "", data
+
+    api_resp = _validator_for(response_model).model_validate(raw_json)
+    return api_resp.code, api_resp.message, api_resp.data
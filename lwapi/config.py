@@ -1,12 +1,47 @@
 # config.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    """
+    HTTP 连接池参数（对应 httpx.Limits）。
+
+    默认值与 httpx 一致；frozen 便于作为进程级共享池的键。
+    """
+    max_connections: Optional[int] = 100            # 最大并发连接数（None 不限）
+    max_keepalive_connections: Optional[int] = 20   # 最大空闲保活连接数
+    keepalive_expiry: Optional[float] = 5.0         # 空闲连接保活时长（秒）
+    http2: bool = False                             # 是否启用 HTTP/2（需安装 h2）
+
+
+@dataclass(frozen=True)
+class OutboxConfig:
+    """
+    发送队列参数（见 lwapi.outbox）。
+
+    速率单位为「条/秒」，<= 0 表示不限；burst 为令牌桶容量（允许的瞬时突发条数）。
+    """
+    peer_rate: float = 1.0          # 同一接收者（私聊对象 / 群）的平均发送速率
+    peer_burst: int = 3
+    account_rate: float = 5.0       # 整个账号的平均发送速率
+    account_burst: int = 10
+    coalesce: bool = False          # 合并仍在排队的、发往同一接收者的连续短文本（默认关闭）
+    coalesce_max_chars: int = 500   # 合并后文本的最大长度
+    max_inflight: int = 4           # 同时进行中的发送请求数（同一接收者始终串行）
+
+
 @dataclass
 class ClientConfig:
     base_url: str                   # 基础 URL
     timeout: float = 15.0           # 请求超时
     x_wxid: Optional[str] = None    # 登录后 wxid（动态更新）
+    pool: HttpPoolConfig = field(default_factory=HttpPoolConfig)  # 普通接口连接池参数
+    shared_pool: bool = False       # True 时同参数的客户端复用进程级连接池
+    # 长轮询（/Msg/Sync）走独立连接池，避免长时间占用连接导致发消息排队
+    sync_pool: HttpPoolConfig = field(default_factory=HttpPoolConfig)
+    sync_timeout: float = 180.0     # 长轮询超时（需明显长于普通接口）
 
     def api_url(self, path: str) -> str:
         """根据接口路径和基础 URL 拼接出完整的 API URL"""
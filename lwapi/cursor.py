@@ -0,0 +1,169 @@
+# lwapi/cursor.py
+"""
+消息同步断点（按 wxid 一个 JSON 文件）。
+
+记录已处理完的同步批次返回的 keyBuf，以及其中的最大 msgSeq、最后的 newMsgId。
+每批分发时登记（begin），处理器真正处理完成后确认（complete）；断点只按到达顺序
+推进到「之前所有批次都已确认」的位置，处理器仍在排队的批次不会被提前记为已处理。
+被取消、不会再处理的批次用 drop 放弃：断点越过它继续推进，不会因此永久停住。
+
+热路径只更新内存；后台按间隔批量落盘（先写临时文件再替换），停止时再写一次。
+进程重启或重新登录后，首个 /Msg/Sync 携带 keyBuf 从断点继续；断点之后已处理过的消息
+由持久化的去重记录（lwapi.dedup）识别并跳过。
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from .dedup import message_key
+
+
+@dataclass
+class SyncCursor:
+    """单账号同步断点。"""
+
+    key_buf: Optional[str] = None
+    msg_seq: Optional[int] = None
+    new_msg_id: Optional[int] = None
+    updated_at: float = 0.0
+
+
+@dataclass
+class CursorTicket:
+    """一批已分发、待确认的同步结果（begin 返回，complete 确认）。"""
+
+    key_buf: Optional[str]
+    msg_seq: Optional[int]
+    new_msg_id: Optional[int]
+    keys: List[int] = field(default_factory=list)
+    done: bool = False
+    dropped: bool = False
+
+
+def _key_buf_text(key_buf: Any) -> Optional[str]:
+    """SDK 中 keyBuf.buffer 为 bytes（服务端下发的 base64 文本按 UTF-8 存放）；统一还原为字符串。"""
+    raw = getattr(key_buf, "buffer", None) if key_buf is not None else None
+    if not raw:
+        return None
+    if isinstance(raw, str):
+        return raw
+    try:
+        return raw.decode("ascii")
+    except UnicodeDecodeError:
+        return base64.b64encode(raw).decode("ascii")
+
+
+class SyncCursorStore:
+    """同步断点的内存副本与批量落盘。"""
+
+    def __init__(self, path: Path, *, flush_interval: float = 5.0) -> None:
+        self.path = path
+        self.flush_interval = max(0.5, float(flush_interval))
+        self.cursor = SyncCursor()
+        self._dirty = False
+        # 按到达顺序排列的未确认批次；队首确认后才推进断点
+        self._tickets: Deque[CursorTicket] = deque()
+
+    def load(self) -> Optional[SyncCursor]:
+        """读取断点；文件不存在或损坏时返回 None。"""
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取同步断点失败 {self.path}: {e}")
+            return None
+        if not isinstance(raw, dict):
+            return None
+        fields = SyncCursor.__dataclass_fields__
+        self.cursor = SyncCursor(**{k: v for k, v in raw.items() if k in fields})
+        return self.cursor
+
+    def begin(self, key_buf: Any, msgs: Iterable[Any]) -> CursorTicket:
+        """登记一批即将交给处理器的消息与本次返回的 keyBuf；处理完成后调用 complete。"""
+        ticket = CursorTicket(_key_buf_text(key_buf), None, None)
+        for m in msgs:
+            seq = m.msgSeq
+            if seq is not None and (ticket.msg_seq is None or seq > ticket.msg_seq):
+                ticket.msg_seq = int(seq)
+            if m.newMsgId:
+                ticket.new_msg_id = int(m.newMsgId)
+            key = message_key(m)
+            if key is not None:
+                ticket.keys.append(key)
+        self._tickets.append(ticket)
+        return ticket
+
+    def complete(self, ticket: CursorTicket) -> None:
+        """确认一批已处理完；按登记顺序把已连续确认的批次并入断点（仅更新内存）。"""
+        ticket.done = True
+        while self._tickets and self._tickets[0].done:
+            self._apply(self._tickets.popleft())
+
+    def drop(self, ticket: CursorTicket) -> None:
+        """放弃一批（处理被取消）：不并入断点，但不再阻挡之后批次的推进。"""
+        if ticket.done:
+            return
+        ticket.dropped = True
+        if ticket.keys:
+            logger.warning(f"同步批次处理被取消，断点跳过其中 {len(ticket.keys)} 条消息")
+        self.complete(ticket)
+
+    def observe(self, key_buf: Any, msgs: Iterable[Any]) -> None:
+        """登记并立即确认一批消息（处理器同步处理完毕时使用）。"""
+        self.complete(self.begin(key_buf, msgs))
+
+    def pending_keys(self) -> Set[int]:
+        """尚未确认处理完的消息去重键（停止时不应记为已见，重启后需重新处理）。"""
+        return {key for t in self._tickets if not t.done for key in t.keys}
+
+    def _apply(self, ticket: CursorTicket) -> None:
+        if ticket.dropped:
+            return
+        cur = self.cursor
+        changed = False
+        if ticket.key_buf and ticket.key_buf != cur.key_buf:
+            cur.key_buf = ticket.key_buf
+            changed = True
+        if ticket.msg_seq is not None and (cur.msg_seq is None or ticket.msg_seq > cur.msg_seq):
+            cur.msg_seq = ticket.msg_seq
+            changed = True
+        if ticket.new_msg_id:
+            cur.new_msg_id = ticket.new_msg_id
+            changed = True
+        if changed:
+            cur.updated_at = time.time()
+            self._dirty = True
+
+    def save(self) -> None:
+        """写入 JSON 文件（先写临时文件再替换）。"""
+        self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(asdict(self.cursor)), encoding="utf-8")
+        tmp.replace(self.path)
+
+    async def flush(self) -> None:
+        """有变更时在工作线程中落盘。"""
+        if not self._dirty:
+            return
+        try:
+            await asyncio.to_thread(self.save)
+        except OSError as e:
+            self._dirty = True
+            logger.warning(f"保存同步断点失败 {self.path}: {e}")
+
+    async def flush_loop(self) -> None:
+        """后台批量落盘，直到被取消。"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
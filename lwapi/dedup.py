@@ -0,0 +1,109 @@
+# lwapi/dedup.py
+"""
+入站消息去重：WebSocket 重连、poll / websocket 切换时服务端可能重复推送同一条 AddMsg。
+
+按 newMsgId（缺失时退回 msgId）记录最近见过的消息；容量有界，采用两代 set 轮换
+（当前代写满后整体降为上一代，上一代丢弃），比逐条 LRU 更省内存与 CPU。
+可选持久化到 JSON 文件，进程重启后仍能识别重启前刚处理过的消息。
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from .models.msg import AddMsg
+
+
+def message_key(msg: AddMsg) -> Optional[int]:
+    """去重键：优先 newMsgId（全局唯一），否则 msgId。"""
+    if msg.newMsgId:
+        return int(msg.newMsgId)
+    if msg.msgId:
+        return int(msg.msgId)
+    return None
+
+
+class SeenMessageSet:
+    """有界「已见消息」集合，附带命中率统计。"""
+
+    def __init__(self, capacity: int = 4096) -> None:
+        # 单代容量为总容量的一半：任意时刻至少保留最近 capacity/2 条
+        self._generation_size = max(1, int(capacity) // 2)
+        self._current: Set[int] = set()
+        self._previous: Set[int] = set()
+        self.checked = 0
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._current or key in self._previous
+
+    def add(self, key: int) -> None:
+        if len(self._current) >= self._generation_size:
+            self._previous = self._current
+            self._current = set()
+        self._current.add(key)
+
+    def check_and_add(self, key: int) -> bool:
+        """返回 True 表示重复（已见过）；否则记录并返回 False。"""
+        self.checked += 1
+        if key in self:
+            self.duplicates += 1
+            return True
+        self.add(key)
+        return False
+
+    def filter_new(self, msgs: Iterable[AddMsg]) -> List[AddMsg]:
+        """过滤掉已见过的消息（同批内重复也会被过滤），保持原顺序。"""
+        out: List[AddMsg] = []
+        for m in msgs:
+            key = message_key(m)
+            if key is not None and self.check_and_add(key):
+                continue
+            out.append(m)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        hit_rate = self.duplicates / self.checked if self.checked else 0.0
+        return {
+            "size": len(self),
+            "capacity": self._generation_size * 2,
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "hit_rate": round(hit_rate, 4),
+        }
+
+    # ==================== 持久化 ====================
+    def load(self, path: Path) -> None:
+        """从 JSON 文件恢复（旧的在前）；文件不存在或损坏时忽略。"""
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取消息去重记录失败 {path}: {e}")
+            return
+        if not isinstance(raw, list):
+            return
+        for item in raw[-self._generation_size * 2 :]:
+            if isinstance(item, int):
+                self.add(item)
+
+    def snapshot(self, exclude: Iterable[int] = ()) -> List[int]:
+        """待落盘的键列表（旧的在前）；exclude 中的键不写入（如尚未处理完的消息）。"""
+        skip = set(exclude)
+        return [k for k in (*self._previous, *self._current) if k not in skip]
+
+    def save(self, path: Path, keys: Optional[List[int]] = None) -> None:
+        """写入 JSON 文件（先写临时文件再替换）；keys 为 snapshot() 的结果，缺省时取全部。"""
+        if keys is None:
+            keys = self.snapshot()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(keys), encoding="utf-8")
+        tmp.replace(path)
@@ -0,0 +1,199 @@
+# lwapi/dispatch.py
+"""
+WebSocket 收包与消息处理之间的有界队列。
+
+读协程只负责 ``ws.receive()`` 并入队，由独立消费协程解析、回调插件，
+慢插件不会再拖住 socket 读取（避免 sock_read 超时引发无谓重连）。
+
+队列满时的策略：
+- ``block``：读协程等待空位（背压，与旧行为一致但多了缓冲）；
+- ``drop_oldest``：丢弃最旧的一帧，保证新消息尽快处理；
+- ``spill``：溢出帧顺序写入临时文件，队列有空位后按原顺序读回，不丢消息。
+
+重连补拉、hybrid 长轮询得到的已解析结果经 ``put_item`` 进入同一队列，
+保证只有一个消费协程按到达顺序分发，不与 WebSocket 推送并发处理。
+"""
+from __future__ import annotations
+
+import asyncio
+import struct
+import tempfile
+from collections import deque
+from typing import IO, Any, Deque, Dict, Literal, Optional, Union
+
+from loguru import logger
+
+OverflowPolicy = Literal["block", "drop_oldest", "spill"]
+Frame = Union[str, bytes]
+
+OVERFLOW_POLICIES = frozenset({"block", "drop_oldest", "spill"})
+
+# 溢出文件记录头：类型（0=str, 1=bytes）+ 长度
+_SPILL_HEADER = struct.Struct(">BI")
+
+
+def normalize_overflow_policy(raw: str | None, *, default: OverflowPolicy = "block") -> OverflowPolicy:
+    """将配置中的溢出策略归一化；未知值抛 ValueError。"""
+    if not raw or not str(raw).strip():
+        return default
+    key = str(raw).strip().lower().replace("-", "_")
+    if key in OVERFLOW_POLICIES:
+        return key  # type: ignore[return-value]
+    raise ValueError(f"未知队列溢出策略: {raw!r}，可选 block / drop_oldest / spill")
+
+
+class _SpillFile:
+    """按 FIFO 顺序暂存溢出帧的临时文件（读空后截断复用）。"""
+
+    def __init__(self, spill_dir: Optional[str] = None) -> None:
+        self._dir = spill_dir
+        self._fp: Optional[IO[bytes]] = None
+        self._read_pos = 0
+        self._write_pos = 0
+        self.count = 0
+
+    def push(self, frame: Frame) -> None:
+        if self._fp is None:
+            self._fp = tempfile.TemporaryFile(dir=self._dir)
+        if isinstance(frame, str):
+            kind, data = 0, frame.encode("utf-8")
+        else:
+            kind, data = 1, bytes(frame)
+        self._fp.seek(self._write_pos)
+        self._fp.write(_SPILL_HEADER.pack(kind, len(data)))
+        self._fp.write(data)
+        self._write_pos = self._fp.tell()
+        self.count += 1
+
+    def pop(self) -> Frame:
+        assert self._fp is not None and self.count > 0
+        self._fp.seek(self._read_pos)
+        kind, size = _SPILL_HEADER.unpack(self._fp.read(_SPILL_HEADER.size))
+        data = self._fp.read(size)
+        self._read_pos = self._fp.tell()
+        self.count -= 1
+        if self.count == 0:
+            self._fp.seek(0)
+            self._fp.truncate()
+            self._read_pos = self._write_pos = 0
+        return data.decode("utf-8") if kind == 0 else data
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        self._read_pos = self._write_pos = 0
+        self.count = 0
+
+
+class DispatchQueue:
+    """单账号有界分发队列，附带深度与丢弃/溢出计数。"""
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        policy: OverflowPolicy = "block",
+        *,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self.policy = normalize_overflow_policy(policy)
+        self._items: Deque[Any] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._spill = _SpillFile(spill_dir)
+
+        self.enqueued = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.blocked = 0
+        self.max_depth = 0
+
+    def qsize(self) -> int:
+        """当前积压帧数（含溢出文件中的帧）。"""
+        return len(self._items) + self._spill.count
+
+    def _append(self, frame: Frame) -> None:
+        self._items.append(frame)
+        self._not_empty.set()
+        if len(self._items) >= self.maxsize:
+            self._not_full.clear()
+
+    async def put(self, frame: Frame) -> None:
+        """入队；队列满时按 policy 处理。"""
+        self.enqueued += 1
+        if self.policy == "spill" and (self._spill.count or len(self._items) >= self.maxsize):
+            # 溢出文件非空时新帧也必须落盘，保持整体 FIFO
+            self._spill.push(frame)
+            self.spilled += 1
+        elif len(self._items) < self.maxsize:
+            self._append(frame)
+        elif self.policy == "drop_oldest":
+            self._items.popleft()
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning(f"消息分发队列已满（{self.maxsize}），累计丢弃最旧消息 {self.dropped} 帧")
+            self._append(frame)
+        else:
+            self.blocked += 1
+            while len(self._items) >= self.maxsize:
+                await self._not_full.wait()
+            self._append(frame)
+        depth = self.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    async def put_item(self, item: Any) -> None:
+        """
+        入队已解析的对象（非原始帧）：总是等待空位，不受 policy 影响，不落盘也不丢弃。
+
+        溢出文件非空时同样等待其读空，保持与之前入队帧的先后顺序。
+        """
+        self.enqueued += 1
+        if self._spill.count or len(self._items) >= self.maxsize:
+            self.blocked += 1
+            while self._spill.count or len(self._items) >= self.maxsize:
+                self._not_full.clear()
+                await self._not_full.wait()
+        self._append(item)
+        depth = self.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    async def get(self) -> Any:
+        """出队（队列空时等待）；出队后从溢出文件补位。返回原始帧或 put_item 入队的对象。"""
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        frame = self._items.popleft()
+        while self._spill.count and len(self._items) < self.maxsize:
+            self._items.append(self._spill.pop())
+        if not self._items:
+            self._not_empty.clear()
+        if len(self._items) < self.maxsize:
+            self._not_full.set()
+        self.dispatched += 1
+        return frame
+
+    def close(self) -> None:
+        """丢弃积压并释放溢出文件。"""
+        self._items.clear()
+        self._spill.close()
+        self._not_full.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度与计数快照（供日志 / 运维台展示）。"""
+        return {
+            "policy": self.policy,
+            "maxsize": self.maxsize,
+            "depth": self.qsize(),
+            "spill_depth": self._spill.count,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "blocked": self.blocked,
+        }
@@ -0,0 +1,181 @@
+# lwapi/download.py
+"""
+分段下载：DownloadImg / DownloadVideo / DownloadFile 等按 (起始位置, 长度) 取数据的接口。
+
+把 data_len 切成若干段并发请求（有并发上限），失败的段按指数退避重试；
+每段解码后直接写入预分配大小的文件（mmap）或预分配的 bytearray 的对应位置，
+不再拼接大块 bytes；最后校验写入总长度。
+
+各段返回结构在不同服务端实现中略有差异，默认按 :func:`section_bytes` 提取
+（``{"data": {"iLen": n, "buffer": "<base64>"}}`` 之类），可通过 extract 参数替换。
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator, List, Optional, Tuple, Union
+
+from loguru import logger
+
+from .exceptions import DownloadError
+
+# (起始位置, 长度) -> 接口原始返回
+SectionFetch = Callable[[int, int], Awaitable[Any]]
+SectionExtract = Callable[[Any], bytes]
+
+DEFAULT_SECTION_SIZE = 64 * 1024
+# 查找段数据时的最大嵌套深度
+_MAX_DEPTH = 4
+_BUFFER_KEYS = ("buffer", "base64", "data")
+
+
+def _find_buffer(obj: Any, depth: int = 0) -> Optional[Any]:
+    if depth > _MAX_DEPTH or not isinstance(obj, dict):
+        return None
+    lowered = {str(k).lower(): v for k, v in obj.items()}
+    for key in _BUFFER_KEYS:
+        v = lowered.get(key)
+        if isinstance(v, (str, bytes, bytearray)):
+            return v
+    for v in obj.values():
+        found = _find_buffer(v, depth + 1)
+        if found is not None:
+            return found
+    return None
+
+
+def section_bytes(result: Any) -> bytes:
+    """从分段接口返回中取出该段二进制（Base64 字符串解码；已是 bytes 时原样返回）。"""
+    if isinstance(result, (bytes, bytearray)):
+        return bytes(result)
+    raw = result if isinstance(result, str) else _find_buffer(result)
+    if raw is None:
+        raise DownloadError("分段返回中没有数据字段")
+    if isinstance(raw, (bytes, bytearray)):
+        return bytes(raw)
+    return base64.b64decode(raw)
+
+
+def iter_sections(total_len: int, section_size: int) -> Iterator[Tuple[int, int]]:
+    """切分 [0, total_len) 为 (起始位置, 长度) 段。"""
+    size = max(1, int(section_size))
+    for start in range(0, total_len, size):
+        yield start, min(size, total_len - start)
+
+
+async def _fetch_section(
+    fetch: SectionFetch,
+    extract: SectionExtract,
+    start: int,
+    length: int,
+    *,
+    retries: int,
+    backoff: float,
+) -> bytes:
+    attempt = 0
+    while True:
+        try:
+            data = extract(await fetch(start, length))
+            if len(data) != length:
+                raise DownloadError(f"段长度不符：期望 {length}，实际 {len(data)}")
+            return data
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"分段 [{start}, +{length}) 下载失败: {e}") from e
+            delay = backoff * (2 ** (attempt - 1))
+            logger.debug(f"分段 [{start}, +{length}) 第 {attempt} 次重试（{delay:.1f}s 后）: {e}")
+            await asyncio.sleep(delay)
+
+
+async def download_sections(
+    fetch: SectionFetch,
+    total_len: int,
+    dest: Optional[Union[str, Path]] = None,
+    *,
+    section_size: int = DEFAULT_SECTION_SIZE,
+    concurrency: int = 4,
+    retries: int = 3,
+    backoff: float = 0.5,
+    extract: SectionExtract = section_bytes,
+) -> Union[Path, bytearray]:
+    """
+    并发分段下载 total_len 字节。
+
+    dest 非空时写入该文件（先写 ``.part`` 临时文件，成功后改名）并返回路径；
+    否则返回预分配并填好的 bytearray（不再复制一份 bytes）。任一段重试耗尽抛 DownloadError，临时文件会被删除。
+    """
+    if total_len < 0:
+        raise ValueError("total_len 不能为负")
+    sections = list(iter_sections(total_len, section_size))
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def _run(write: Callable[[int, bytes], None]) -> None:
+        async def _one(start: int, length: int) -> int:
+            async with sem:
+                data = await _fetch_section(
+                    fetch, extract, start, length, retries=retries, backoff=backoff
+                )
+            write(start, data)
+            return len(data)
+
+        tasks: List[asyncio.Task] = [asyncio.create_task(_one(s, n)) for s, n in sections]
+        try:
+            written = sum(await asyncio.gather(*tasks))
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        if written != total_len:
+            raise DownloadError(f"总长度不符：期望 {total_len}，实际 {written}")
+
+    if dest is None:
+        buf = bytearray(total_len)
+        view = memoryview(buf)
+
+        def _write_mem(start: int, data: bytes) -> None:
+            view[start : start + len(data)] = data
+
+        try:
+            await _run(_write_mem)
+        finally:
+            view.release()
+        return buf
+
+    path = Path(dest)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part = path.with_name(path.name + ".part")
+    fp = open(part, "w+b")
+    mm: Optional[mmap.mmap] = None
+    try:
+        fp.truncate(total_len)
+        if total_len:
+            mm = mmap.mmap(fp.fileno(), total_len)
+
+        def _write_file(start: int, data: bytes) -> None:
+            assert mm is not None
+            mm[start : start + len(data)] = data
+
+        await _run(_write_file)
+        if mm is not None:
+            mm.flush()
+    except BaseException:
+        if mm is not None:
+            mm.close()
+            mm = None
+        fp.close()
+        part.unlink(missing_ok=True)
+        raise
+    finally:
+        if mm is not None:
+            mm.close()
+        if not fp.closed:
+            fp.close()
+    os.replace(part, path)
+    return path
@@ -41,4 +41,12 @@ class LoginError(LwApiError):
 
     @property
     def recoverable(self) -> bool:
-        return self.reason in self.RECOVERABLE_REASONS
\ No newline at end of file
+        return self.reason in self.RECOVERABLE_REASONS
+
+
+class DownloadError(LwApiError):
+    """分段下载失败（重试耗尽或总长度不符），见 lwapi.download。"""
+
+
+class SendQueueClosed(LwApiError):
+    """发送队列已关闭：消息未发出或发送被中断（见 lwapi.outbox），稍后可重试。"""
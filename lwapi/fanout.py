@@ -0,0 +1,293 @@
+# lwapi/fanout.py
+"""
+大媒体群发：上传一次，其余会话按 CDN 消息 XML 转发。
+
+同一张图片 / 同一段视频发给多个会话时，``upload_image_base64`` / ``send_video_message``
+每次都要上传完整 Base64。这里只对第一个接收者上传，从返回结果中取出 CDN 描述
+（aeskey、fileid 等），拼成消息 XML 后用 ``send_cdn_image`` / ``send_cdn_video`` 转发给
+其余接收者。
+
+CDN 描述按 (账号 wxid, 媒体类型, 内容 sha256) 缓存（可持久化到 JSON 文件，带 TTL），
+同一内容下次群发连第一次上传也省掉。转发失败（如描述已过期）时作废缓存，
+该接收者改为直接上传。返回结果中取不到 CDN 描述时，全部退回逐个上传。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Literal, Optional, Tuple, Union
+from xml.sax.saxutils import quoteattr
+
+from loguru import logger
+
+from .exceptions import ApiError
+
+MediaKind = Literal["image", "video"]
+
+# 在返回结果中查找 CDN 字段的最大嵌套深度
+_MAX_DEPTH = 4
+# 各字段在不同服务端实现中的常见键名（比较时忽略大小写）
+_AES_KEYS = ("aeskey", "cdnaeskey", "fileaeskey")
+_FILE_ID_KEYS = ("fileid", "cdnurl", "cdnmidimgurl", "cdnbigimgurl", "cdnvideourl", "mediaid")
+_THUMB_AES_KEYS = ("thumbaeskey", "cdnthumbaeskey")
+_THUMB_ID_KEYS = ("thumbfileid", "cdnthumburl", "thumburl")
+_LENGTH_KEYS = ("totallen", "length", "datalen", "filelen", "videolen")
+_MD5_KEYS = ("md5", "filemd5")
+_XML_TAGS: Dict[str, str] = {"image": "<img", "video": "<videomsg"}
+
+
+def content_key(b64: str) -> str:
+    """媒体内容摘要（对 Base64 文本取 sha256，同一内容结果相同，无需先解码）。"""
+    return hashlib.sha256(b64.encode("ascii")).hexdigest()
+
+
+def _walk(obj: Any, depth: int = 0) -> Iterator[Tuple[str, Any]]:
+    if depth > _MAX_DEPTH:
+        return
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield str(k).lower(), v
+            yield from _walk(v, depth + 1)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from _walk(v, depth + 1)
+
+
+def _scalar(v: Any) -> Optional[str]:
+    # 兼容 {"string": "..."} 形式的 SKBuiltinString
+    if isinstance(v, dict) and "string" in v:
+        v = v["string"]
+    if v is None or isinstance(v, (dict, list)) or v == "":
+        return None
+    return str(v)
+
+
+def extract_cdn_xml(result: Any, kind: MediaKind, *, play_length: int = 0) -> Optional[str]:
+    """
+    从上传接口的返回中取出可供 CDN 转发的消息 XML。
+
+    优先使用返回中现成的消息 XML；否则按 aeskey / fileid / 长度 / md5 等字段拼装。取不到返回 None。
+    """
+    fields: Dict[str, str] = {}
+    tag = _XML_TAGS[kind]
+    for key, value in _walk(result):
+        if isinstance(value, str) and "<msg" in value and tag in value:
+            return value
+        text = _scalar(value)
+        if text is not None and key not in fields:
+            fields[key] = text
+
+    def pick(names: Tuple[str, ...]) -> Optional[str]:
+        return next((fields[n] for n in names if n in fields), None)
+
+    aeskey, file_id = pick(_AES_KEYS), pick(_FILE_ID_KEYS)
+    if not aeskey or not file_id:
+        return None
+    length = pick(_LENGTH_KEYS) or "0"
+    md5 = pick(_MD5_KEYS) or ""
+    if kind == "image":
+        return (
+            f'<?xml version="1.0"?><msg><img aeskey={quoteattr(aeskey)} '
+            f"cdnmidimgurl={quoteattr(file_id)} cdnbigimgurl={quoteattr(file_id)} "
+            f"length={quoteattr(length)} md5={quoteattr(md5)} /></msg>"
+        )
+    thumb_aes = pick(_THUMB_AES_KEYS) or aeskey
+    thumb_id = pick(_THUMB_ID_KEYS) or file_id
+    return (
+        f'<?xml version="1.0"?><msg><videomsg aeskey={quoteattr(aeskey)} '
+        f"cdnvideourl={quoteattr(file_id)} cdnthumbaeskey={quoteattr(thumb_aes)} "
+        f"cdnthumburl={quoteattr(thumb_id)} length={quoteattr(length)} "
+        f"playlength={quoteattr(str(play_length))} md5={quoteattr(md5)} /></msg>"
+    )
+
+
+class CdnDescriptorCache:
+    """(账号, 媒体类型, 内容摘要) -> CDN 消息 XML；内存 LRU，可选 JSON 文件持久化。"""
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        *,
+        ttl: float = 3 * 24 * 3600,
+        max_entries: int = 2048,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.ttl = float(ttl)
+        self.max_entries = max(1, int(max_entries))
+        self._items: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None:
+            self._load()
+
+    @staticmethod
+    def _key(wxid: str, kind: MediaKind, digest: str) -> str:
+        return f"{wxid}/{kind}/{digest}"
+
+    def _load(self) -> None:
+        assert self.path is not None
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取 CDN 描述缓存失败 {self.path}: {e}")
+            return
+        if not isinstance(raw, dict):
+            return
+        now = time.time()
+        skipped = 0
+        for key, value in raw.items():
+            # 文件可能被手工编辑或来自旧版本：逐条校验，坏条目跳过而不是让启动失败
+            if not (isinstance(value, list) and len(value) == 2 and isinstance(value[1], str)):
+                skipped += 1
+                continue
+            try:
+                created = float(value[0])
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            xml = value[1]
+            if now - created < self.ttl:
+                self._items[key] = (created, xml)
+        if skipped:
+            logger.warning(f"CDN 描述缓存 {self.path} 中有 {skipped} 条格式无效，已忽略")
+
+    def snapshot(self) -> Dict[str, Tuple[float, str]]:
+        """当前条目的副本（须在事件循环中取，再交给工作线程写文件）。"""
+        return dict(self._items)
+
+    def save(self, data: Optional[Dict[str, Tuple[float, str]]] = None) -> None:
+        """写入 JSON 文件（先写临时文件再替换）；未配置路径时不做任何事。data 缺省时取当前快照。"""
+        if self.path is None:
+            return
+        if data is None:
+            data = self.snapshot()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def get(self, wxid: str, kind: MediaKind, digest: str) -> Optional[str]:
+        key = self._key(wxid, kind, digest)
+        item = self._items.get(key)
+        if item is None or time.time() - item[0] >= self.ttl:
+            self._items.pop(key, None)
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, wxid: str, kind: MediaKind, digest: str, xml: str) -> None:
+        key = self._key(wxid, kind, digest)
+        self._items[key] = (time.time(), xml)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def invalidate(self, wxid: str, kind: MediaKind, digest: str) -> None:
+        self._items.pop(self._key(wxid, kind, digest), None)
+
+
+class MediaFanout:
+    """
+    一次群发的发送函数：第一个接收者上传并取得 CDN 描述，其余接收者按 XML 转发。
+
+    作为 ``run_bulk`` 的 send_one 使用（见 ``MsgClient.send_image_many`` / ``send_video_many``）。
+    """
+
+    def __init__(
+        self,
+        *,
+        wxid: str,
+        kind: MediaKind,
+        digest: str,
+        upload: Callable[[str], Awaitable[Any]],
+        forward: Callable[[str, str], Awaitable[Any]],
+        cache: CdnDescriptorCache,
+        play_length: int = 0,
+    ) -> None:
+        self.wxid = wxid
+        self.kind = kind
+        self.digest = digest
+        self._upload = upload
+        self._forward = forward
+        self._cache = cache
+        self._play_length = play_length
+        self._lock = asyncio.Lock()
+        self._xml = cache.get(wxid, kind, digest)
+        self._no_descriptor = False
+        self.uploads = 0
+        self.forwards = 0
+
+    async def _upload_one(self, to_wxid: str) -> Any:
+        self.uploads += 1
+        return await self._upload(to_wxid)
+
+    async def _upload_and_capture(self, to_wxid: str) -> Any:
+        result = await self._upload_one(to_wxid)
+        xml = extract_cdn_xml(result, self.kind, play_length=self._play_length)
+        if xml is None:
+            self._no_descriptor = True
+            logger.warning(f"上传返回中未找到 CDN 描述，本次群发改为逐个上传（{self.kind}）")
+            return result
+        self._xml = xml
+        self._cache.put(self.wxid, self.kind, self.digest, xml)
+        await self._persist()
+        return result
+
+    async def _persist(self) -> None:
+        if self._cache.path is None:
+            return
+        # 在事件循环中取快照，工作线程只负责写文件（并发群发可能同时修改缓存）
+        data = self._cache.snapshot()
+        try:
+            await asyncio.to_thread(self._cache.save, data)
+        except OSError as e:
+            logger.warning(f"保存 CDN 描述缓存失败 {self._cache.path}: {e}")
+
+    async def __call__(self, to_wxid: str) -> Any:
+        xml = self._xml
+        if xml is None and not self._no_descriptor:
+            async with self._lock:
+                # 其它协程可能已在等待期间完成首次上传
+                if self._xml is None and not self._no_descriptor:
+                    return await self._upload_and_capture(to_wxid)
+            xml = self._xml
+        if xml is None:
+            return await self._upload_one(to_wxid)
+        try:
+            result = await self._forward(to_wxid, xml)
+        except ApiError as e:
+            # 描述过期或无效：作废缓存，该接收者直接上传
+            logger.warning(f"CDN 转发失败，改为上传: {e}")
+            self._cache.invalidate(self.wxid, self.kind, self.digest)
+            if self._xml == xml:
+                self._xml = None  # 后续接收者重新走一次「上传并取描述」
+                await self._persist()
+            return await self._upload_one(to_wxid)
+        self.forwards += 1
+        return result
+
+
+_default_cache: Optional[CdnDescriptorCache] = None
+
+
+def configure_cdn_cache(path: Optional[Union[str, Path]] = None, **kwargs: Any) -> CdnDescriptorCache:
+    """设置进程级默认 CDN 描述缓存；参数同 CdnDescriptorCache。"""
+    global _default_cache
+    _default_cache = CdnDescriptorCache(path, **kwargs)
+    return _default_cache
+
+
+def default_cdn_cache() -> CdnDescriptorCache:
+    """获取进程级默认 CDN 描述缓存；未配置时为仅内存的实例。"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CdnDescriptorCache()
+    return _default_cache
@@ -0,0 +1,337 @@
+# lwapi/media.py
+"""
+按 URL 获取远程媒体（send_image_by_url 等）：
+
+- 进程内共用一个 aiohttp 会话，不再每次发送新建连接；
+- 下载边读边写入磁盘缓存并计算 sha256，不把整张图读进内存；缓存按内容寻址
+  （``objects/<sha256>``），URL 另记一份元数据（ETag / Last-Modified / sha256），
+  过了新鲜期用 If-None-Match / If-Modified-Since 条件请求复核，304 直接用缓存；
+- 同一 URL 的并发请求只下载一次（single-flight），同一内容的 Base64 只编码一次
+  （在工作线程中进行，并在内存中保留最近用过的几份）。
+
+一张海报群发到几百个群时，只下载、编码一次。
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar, Union
+
+import aiohttp
+from loguru import logger
+
+_T = TypeVar("_T")
+
+_CHUNK = 64 * 1024
+# 内存中保留的 Base64 总字符数上限
+_B64_MEMO_CHARS = 64 * 1024 * 1024
+# 无磁盘缓存时内存中保留的下载结果数
+_MEMORY_ENTRIES = 32
+
+
+@dataclass(frozen=True)
+class FetchedMedia:
+    """一次获取的结果：磁盘缓存路径（无缓存目录时为 None，内容在 data 中）与摘要。"""
+
+    url: str
+    sha256: str
+    size: int
+    path: Optional[Path] = None
+    data: Optional[bytes] = None
+    from_cache: bool = False
+
+    def read_bytes(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        assert self.path is not None
+        return self.path.read_bytes()
+
+
+class MediaFetcher:
+    """远程媒体下载器（共享会话 + 磁盘缓存 + single-flight）。"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        *,
+        max_bytes: int = 5 * 1024 * 1024,
+        fresh_seconds: float = 300.0,
+        max_cache_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        """
+        cache_dir 为 None 时只在内存中合并并发请求、缓存 Base64，不落盘。
+        fresh_seconds 内同一 URL 直接使用缓存，不再发条件请求复核。
+        max_cache_bytes 为磁盘缓存总大小上限，超过时按最近使用时间淘汰。
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_bytes = int(max_bytes)
+        self.fresh_seconds = float(fresh_seconds)
+        self.max_cache_bytes = int(max_cache_bytes)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[str, "asyncio.Task[FetchedMedia]"] = {}
+        self._b64_inflight: Dict[str, "asyncio.Task[str]"] = {}
+        self._b64_memo: "OrderedDict[str, str]" = OrderedDict()
+        self._b64_chars = 0
+        # 无磁盘缓存时的内存结果（URL -> 结果），同样受 fresh_seconds 约束
+        self._memory: "OrderedDict[str, tuple[float, FetchedMedia]]" = OrderedDict()
+
+        self.downloads = 0
+        self.revalidated = 0
+        self.cache_hits = 0
+        self.encodes = 0
+
+    # ==================== 会话 ====================
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ==================== 缓存文件 ====================
+    def _meta_path(self, url: str) -> Path:
+        assert self.cache_dir is not None
+        return self.cache_dir / "urls" / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+    def _object_path(self, sha256: str) -> Path:
+        assert self.cache_dir is not None
+        return self.cache_dir / "objects" / sha256
+
+    def _load_meta(self, url: str) -> Optional[dict]:
+        try:
+            meta = json.loads(self._meta_path(url).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(meta, dict) or meta.get("url") != url:
+            return None
+        if not self._object_path(str(meta.get("sha256"))).is_file():
+            return None
+        return meta
+
+    def _save_meta(self, url: str, meta: dict) -> None:
+        path = self._meta_path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        tmp.replace(path)
+
+    def _cached(self, url: str, meta: dict, *, revalidated: bool) -> FetchedMedia:
+        path = self._object_path(meta["sha256"])
+        try:
+            os.utime(path)  # 记录最近使用，淘汰时参考
+        except OSError:
+            pass
+        if revalidated:
+            self.revalidated += 1
+        else:
+            self.cache_hits += 1
+        return FetchedMedia(url, meta["sha256"], int(meta["size"]), path=path, from_cache=True)
+
+    def _prune(self) -> None:
+        assert self.cache_dir is not None
+        objects = self.cache_dir / "objects"
+        try:
+            files = [(p.stat(), p) for p in objects.iterdir() if p.is_file()]
+        except OSError:
+            return
+        total = sum(st.st_size for st, _ in files)
+        if total <= self.max_cache_bytes:
+            return
+        for st, p in sorted(files, key=lambda x: x[0].st_mtime):
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+            if total <= self.max_cache_bytes:
+                break
+
+    # ==================== 下载 ====================
+    async def fetch(self, url: str, *, timeout: float = 30.0) -> FetchedMedia:
+        """获取 URL 内容；同一 URL 的并发调用共享一次下载。失败抛 ValueError。"""
+        return await single_flight(self._inflight, url, lambda: self._fetch(url, timeout))
+
+    async def prefetch(self, urls: Iterable[str], *, timeout: float = 30.0) -> List[FetchedMedia]:
+        """并发预取多个 URL（群发前调用，后续发送直接命中缓存）。"""
+        return list(await asyncio.gather(*(self.fetch(u, timeout=timeout) for u in dict.fromkeys(urls))))
+
+    async def _fetch(self, url: str, timeout: float) -> FetchedMedia:
+        now = time.time()
+        if self.cache_dir is None:
+            hit = self._memory.get(url)
+            if hit is not None and now - hit[0] < self.fresh_seconds:
+                self.cache_hits += 1
+                return hit[1]
+            meta = None
+        else:
+            meta = await asyncio.to_thread(self._load_meta, url)
+            if meta is not None and now - float(meta.get("checked_at") or 0) < self.fresh_seconds:
+                return self._cached(url, meta, revalidated=False)
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            async with self._get_session().get(
+                url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as resp:
+                if resp.status == 304 and meta is not None:
+                    meta["checked_at"] = now
+                    await asyncio.to_thread(self._save_meta, url, meta)
+                    return self._cached(url, meta, revalidated=True)
+                if resp.status != 200:
+                    raise ValueError(f"下载失败，HTTP {resp.status}: {url}")
+                if resp.content_length is not None and resp.content_length > self.max_bytes:
+                    raise ValueError(self._too_large(resp.content_length))
+                media = await self._read_body(url, resp)
+                etag = resp.headers.get("ETag")
+                last_modified = resp.headers.get("Last-Modified")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ValueError(f"下载失败: {e}") from e
+
+        self.downloads += 1
+        logger.debug(f"已下载 {url}（{media.size} 字节，sha256={media.sha256[:12]}）")
+        if self.cache_dir is None:
+            self._memory[url] = (now, media)
+            self._memory.move_to_end(url)
+            while len(self._memory) > _MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+            return media
+        new_meta = {
+            "url": url,
+            "sha256": media.sha256,
+            "size": media.size,
+            "etag": etag,
+            "last_modified": last_modified,
+            "checked_at": now,
+        }
+        await asyncio.to_thread(self._save_meta, url, new_meta)
+        await asyncio.to_thread(self._prune)
+        return media
+
+    def _too_large(self, size: int) -> str:
+        return f"文件过大（{size / 1024 / 1024:.2f}MB），上限 {self.max_bytes / 1024 / 1024:.0f}MB"
+
+    async def _read_body(self, url: str, resp: aiohttp.ClientResponse) -> FetchedMedia:
+        """边读边算 sha256；有缓存目录时写入临时文件后按摘要改名（内容相同只存一份）。"""
+        digest = hashlib.sha256()
+        size = 0
+        if self.cache_dir is None:
+            chunks: List[bytes] = []
+            async for chunk in resp.content.iter_chunked(_CHUNK):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ValueError(self._too_large(size))
+                digest.update(chunk)
+                chunks.append(chunk)
+            return FetchedMedia(url, digest.hexdigest(), size, data=b"".join(chunks))
+
+        objects = self.cache_dir / "objects"
+        objects.mkdir(parents=True, exist_ok=True)
+        tmp = objects / f".{os.getpid()}-{id(resp)}.part"
+        try:
+            with tmp.open("wb") as fp:
+                async for chunk in resp.content.iter_chunked(_CHUNK):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ValueError(self._too_large(size))
+                    digest.update(chunk)
+                    fp.write(chunk)
+            sha = digest.hexdigest()
+            path = self._object_path(sha)
+            tmp.replace(path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return FetchedMedia(url, sha, size, path=path)
+
+    # ==================== Base64 ====================
+    async def fetch_base64(self, url: str, *, timeout: float = 30.0) -> str:
+        """获取 URL 内容的 Base64；同一内容只在工作线程中编码一次。"""
+        media = await self.fetch(url, timeout=timeout)
+        memo = self._b64_memo.get(media.sha256)
+        if memo is not None:
+            self._b64_memo.move_to_end(media.sha256)
+            return memo
+        return await single_flight(self._b64_inflight, media.sha256, lambda: self._encode(media))
+
+    async def _encode(self, media: FetchedMedia) -> str:
+        encoded = await asyncio.to_thread(lambda: base64.b64encode(media.read_bytes()).decode("ascii"))
+        self.encodes += 1
+        if len(encoded) <= _B64_MEMO_CHARS:
+            self._b64_memo[media.sha256] = encoded
+            self._b64_chars += len(encoded)
+            while self._b64_chars > _B64_MEMO_CHARS and self._b64_memo:
+                _, old = self._b64_memo.popitem(last=False)
+                self._b64_chars -= len(old)
+        return encoded
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "downloads": self.downloads,
+            "revalidated": self.revalidated,
+            "cache_hits": self.cache_hits,
+            "encodes": self.encodes,
+        }
+
+
+async def single_flight(
+    inflight: Dict[str, "asyncio.Task[_T]"], key: str, factory: Callable[[], Awaitable[_T]]
+) -> _T:
+    """
+    同一 key 同时只执行一次 factory，其余调用等待同一结果。
+
+    factory 在独立任务中执行，各调用方经 shield 等待：某个调用方被取消只影响它自己，
+    其余等待者照常拿到结果（全部调用方都取消时任务仍会执行完，结果照常进入缓存）。
+    """
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        inflight[key] = task
+        task.add_done_callback(lambda t: _finish_flight(inflight, key, t))
+    return await asyncio.shield(task)
+
+
+def _finish_flight(inflight: Dict[str, "asyncio.Task[Any]"], key: str, task: "asyncio.Task[Any]") -> None:
+    if inflight.get(key) is task:
+        del inflight[key]
+    if not task.cancelled():
+        task.exception()  # 无等待者时不告警
+
+
+_default_fetcher: Optional[MediaFetcher] = None
+
+
+def configure_media_fetcher(
+    cache_dir: Optional[Union[str, Path]] = None, **kwargs
+) -> MediaFetcher:
+    """设置进程级默认下载器（send_image_by_url 等使用）；参数同 MediaFetcher。"""
+    global _default_fetcher
+    _default_fetcher = MediaFetcher(cache_dir, **kwargs)
+    return _default_fetcher
+
+
+def default_media_fetcher() -> MediaFetcher:
+    """获取进程级默认下载器；未配置时为仅内存缓存的实例。"""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = MediaFetcher()
+    return _default_fetcher
+
+
+async def close_media_fetcher() -> None:
+    """关闭默认下载器的共享会话（进程退出时调用）。"""
+    if _default_fetcher is not None:
+        await _default_fetcher.aclose()
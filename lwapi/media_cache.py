@@ -0,0 +1,325 @@
+# lwapi/media_cache.py
+"""
+已下载消息媒体（图片、视频、语音、CDN 高清图）的本地缓存，多个插件共用。
+
+- 键为 (机器人 wxid, msg_id, 类型)；文件按内容 sha256 存放（``objects/ab/abcd...``），
+  不同消息的相同内容只占一份磁盘；
+- 总大小超过上限时按最近访问时间淘汰，超过 TTL 的条目视为失效；最近 _EVICT_GRACE 秒内
+  访问过的文件（包括刚下载的）不按大小淘汰，避免删掉调用方刚拿到、尚未打开的路径；
+  单个文件超过上限时不缓存，下载以 ValueError 失败；
+- 同一键的并发请求只下载一次（single-flight）；
+- 返回文件路径，或 :meth:`MediaCache.view` 映射出的只读 memoryview，
+  插件不必在内存里持有大段 Base64 字符串。
+
+索引保存在 ``index.json``（先写临时文件再替换），变更后在工作线程中落盘。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Literal, Optional, Tuple, Union
+
+from loguru import logger
+
+from .download import section_bytes
+from .media import single_flight
+
+if TYPE_CHECKING:
+    from .client import LwApiClient
+
+MediaKind = Literal["img", "video", "voice", "cdn_img"]
+# 下载函数：返回内容（bytes / bytearray），或已写好的临时文件路径（缓存会接管该文件）
+MediaLoader = Callable[[Path], Awaitable[Union[bytes, bytearray, Path]]]
+
+_HASH_CHUNK = 1024 * 1024
+# 最近访问过的文件在这段时间内不按大小淘汰（调用方拿到路径后还要打开 / 映射）
+_EVICT_GRACE = 60.0
+
+
+@dataclass
+class _Entry:
+    sha256: str
+    size: int
+    created_at: float
+    accessed_at: float
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        for chunk in iter(lambda: fp.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaCache:
+    """按 (wxid, msg_id, kind) 缓存消息媒体的内容寻址磁盘缓存。"""
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        *,
+        max_bytes: int = 1024 * 1024 * 1024,
+        ttl: float = 7 * 24 * 3600,
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self._entries: Dict[str, _Entry] = {}
+        self._inflight: Dict[str, "asyncio.Task[Path]"] = {}
+        self._loaded = False
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ==================== 索引 ====================
+    @staticmethod
+    def _key(wxid: str, msg_id: Union[int, str], kind: MediaKind) -> str:
+        return f"{wxid}/{msg_id}/{kind}"
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256[:2] / sha256
+
+    def _index_path(self) -> Path:
+        return self.root / "index.json"
+
+    def _load_index(self) -> None:
+        self._loaded = True
+        try:
+            raw = json.loads(self._index_path().read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取媒体缓存索引失败 {self._index_path()}: {e}")
+            return
+        fields = _Entry.__dataclass_fields__
+        for key, item in (raw.items() if isinstance(raw, dict) else []):
+            if isinstance(item, dict) and set(fields) <= set(item):
+                self._entries[key] = _Entry(**{k: item[k] for k in fields})
+
+    def _save_index(self, data: Dict[str, Any]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path().with_suffix(".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        tmp.replace(self._index_path())
+
+    async def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            await asyncio.to_thread(self._load_index)
+
+    async def flush(self) -> None:
+        """有变更时在工作线程中保存索引。"""
+        if self._dirty:
+            # 在事件循环中取快照，工作线程只负责写文件
+            self._dirty = False
+            data = {k: asdict(e) for k, e in self._entries.items()}
+            try:
+                await asyncio.to_thread(self._save_index, data)
+            except OSError as e:
+                self._dirty = True
+                logger.warning(f"保存媒体缓存索引失败: {e}")
+
+    # ==================== 淘汰 ====================
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        self._dirty = True
+        if entry is None:
+            return
+        if any(e.sha256 == entry.sha256 for e in self._entries.values()):
+            return  # 仍被其它消息引用
+        try:
+            self._object_path(entry.sha256).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Windows 下文件仍被映射时无法删除，下次淘汰再试
+            logger.debug(f"删除缓存文件失败 {entry.sha256}: {e}")
+
+    def _evict(self, now: float) -> None:
+        for key in [k for k, e in self._entries.items() if now - e.created_at >= self.ttl]:
+            self._drop(key)
+            self.evictions += 1
+        # 按文件淘汰：相同内容只计一次，以引用它的各条目中最近一次访问为准
+        objects: Dict[str, Tuple[float, int]] = {}
+        for e in self._entries.values():
+            last, _ = objects.get(e.sha256, (0.0, 0))
+            objects[e.sha256] = (max(last, e.accessed_at), e.size)
+        total = sum(size for _, size in objects.values())
+        recent = now - _EVICT_GRACE
+        for sha, (last, size) in sorted(objects.items(), key=lambda kv: kv[1][0]):
+            if total <= self.max_bytes or last >= recent:
+                # 其余文件都在宽限期内：暂时超出上限，之后的淘汰再处理
+                break
+            for key in [k for k, e in self._entries.items() if e.sha256 == sha]:
+                self._drop(key)
+                self.evictions += 1
+            total -= size
+
+    # ==================== 读写 ====================
+    def _lookup(self, key: str, now: float) -> Optional[Path]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        path = self._object_path(entry.sha256)
+        if now - entry.created_at >= self.ttl or not path.is_file():
+            self._drop(key)
+            return None
+        entry.accessed_at = now
+        self._dirty = True
+        return path
+
+    def _too_large(self, size: int) -> str:
+        return f"媒体文件过大（{size / 1024 / 1024:.2f}MB），超过缓存上限 {self.max_bytes / 1024 / 1024:.0f}MB"
+
+    def _place(self, payload: Union[bytes, bytearray, Path], tmp_dir: Path) -> Tuple[str, int]:
+        """
+        （工作线程）把下载结果放入 objects/，相同内容已存在时直接复用；返回 (sha256, 大小)。
+
+        超过缓存上限的文件删除临时文件并抛 ValueError（放进来也会被立即淘汰）。
+        """
+        if isinstance(payload, Path):
+            tmp = payload
+            size = tmp.stat().st_size
+            if size > self.max_bytes:
+                tmp.unlink(missing_ok=True)
+                raise ValueError(self._too_large(size))
+        else:
+            size = len(payload)
+            if size > self.max_bytes:
+                raise ValueError(self._too_large(size))
+            tmp = tmp_dir / f"{uuid.uuid4().hex}.part"
+            tmp.write_bytes(payload)
+        sha = _hash_file(tmp)
+        path = self._object_path(sha)
+        if path.is_file():
+            tmp.unlink(missing_ok=True)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, path)
+        return sha, size
+
+    async def get(self, wxid: str, msg_id: Union[int, str], kind: MediaKind) -> Optional[Path]:
+        """只查缓存，不下载。"""
+        await self._ensure_loaded()
+        return self._lookup(self._key(wxid, msg_id, kind), time.time())
+
+    async def get_or_fetch(
+        self, wxid: str, msg_id: Union[int, str], kind: MediaKind, loader: MediaLoader
+    ) -> Path:
+        """
+        命中缓存返回文件路径；否则调用 loader 下载并缓存（同一键并发时只下载一次）。
+
+        loader 接收一个临时目录，可把内容直接写入其中的文件并返回该路径（大文件不经内存），
+        也可直接返回 bytes。
+        """
+        await self._ensure_loaded()
+        key = self._key(wxid, msg_id, kind)
+        path = self._lookup(key, time.time())
+        if path is not None:
+            self.hits += 1
+            return path
+        return await single_flight(self._inflight, key, lambda: self._fetch(key, loader))
+
+    async def _fetch(self, key: str, loader: MediaLoader) -> Path:
+        self.misses += 1
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        payload = await loader(tmp_dir)
+        sha, size = await asyncio.to_thread(self._place, payload, tmp_dir)
+        now = time.time()
+        self._entries[key] = _Entry(sha256=sha, size=size, created_at=now, accessed_at=now)
+        self._dirty = True
+        self._evict(now)
+        await self.flush()
+        return self._object_path(sha)
+
+    @staticmethod
+    def view(path: Path) -> memoryview:
+        """只读映射缓存文件，返回 memoryview（空文件返回空视图）。"""
+        with path.open("rb") as fp:
+            if os.fstat(fp.fileno()).st_size == 0:
+                return memoryview(b"")
+            return memoryview(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = {e.sha256: e.size for e in self._entries.values()}
+        return {
+            "entries": len(self._entries),
+            "objects": len(sizes),
+            "bytes": sum(sizes.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    # ==================== 常用媒体 ====================
+    async def image(
+        self, client: "LwApiClient", from_wxid: str, msg_id: int, data_len: int, **kwargs: Any
+    ) -> Path:
+        """消息内高清图（OtherClient.download_img_full）；kwargs 透传 compress_type / concurrency 等。"""
+
+        async def _load(tmp_dir: Path) -> Path:
+            dest = tmp_dir / f"{uuid.uuid4().hex}.part"
+            return await client.other.download_img_full(from_wxid, msg_id, data_len, dest, **kwargs)
+
+        return await self.get_or_fetch(client.wxid, msg_id, "img", _load)
+
+    async def video(
+        self, client: "LwApiClient", from_wxid: str, msg_id: int, data_len: int, **kwargs: Any
+    ) -> Path:
+        """消息内视频（OtherClient.download_video_full）。"""
+
+        async def _load(tmp_dir: Path) -> Path:
+            dest = tmp_dir / f"{uuid.uuid4().hex}.part"
+            return await client.other.download_video_full(from_wxid, msg_id, data_len, dest, **kwargs)
+
+        return await self.get_or_fetch(client.wxid, msg_id, "video", _load)
+
+    async def voice(
+        self, client: "LwApiClient", bufid: str, from_user_name: str, length: int, msg_id: int
+    ) -> Path:
+        """语音（OtherClient.download_voice，返回中的 Base64 解码后缓存）。"""
+
+        async def _load(_tmp_dir: Path) -> bytes:
+            result = await client.other.download_voice(bufid, from_user_name, length, msg_id)
+            return await asyncio.to_thread(section_bytes, result)
+
+        return await self.get_or_fetch(client.wxid, msg_id, "voice", _load)
+
+    async def cdn_image(
+        self, client: "LwApiClient", msg_id: int, file_no: str, file_aes_key: str
+    ) -> Path:
+        """CDN 高清图（OtherClient.cdn_download_image）。"""
+
+        async def _load(_tmp_dir: Path) -> bytes:
+            result = await client.other.cdn_download_image(file_no, file_aes_key)
+            return await asyncio.to_thread(section_bytes, result)
+
+        return await self.get_or_fetch(client.wxid, msg_id, "cdn_img", _load)
+
+
+_default_cache: Optional[MediaCache] = None
+
+
+def configure_media_cache(root: Union[str, Path], **kwargs: Any) -> MediaCache:
+    """设置进程级默认媒体缓存；参数同 MediaCache。"""
+    global _default_cache
+    _default_cache = MediaCache(root, **kwargs)
+    return _default_cache
+
+
+def default_media_cache() -> MediaCache:
+    """获取进程级默认媒体缓存；未配置时位于 config/media_cache。"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = MediaCache(Path("config/media_cache"))
+    return _default_cache
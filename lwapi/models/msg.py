@@ -1,7 +1,7 @@
 # models/msg.py
 from ..models import BaseModelWithConfig
-from typing import List, Optional
-from pydantic import Field
+from typing import Any, List, Optional
+from pydantic import Field, PrivateAttr
 
 class SKBuiltinString_t(BaseModelWithConfig):
     """内置字符串类型"""
@@ -27,6 +27,7 @@ class AddMsg(BaseModelWithConfig):
     pushContent: Optional[str] = None  # 推送内容
     newMsgId: Optional[int] = None    # 新消息ID
     msgSeq: Optional[int] = None     # 消息序列号
+    _view: Any = PrivateAttr(default=None)  # lwapi.models.msg_view.message_view 的缓存
 
 class SyncMessageResponse(BaseModelWithConfig):
     """同步消息响应结构"""
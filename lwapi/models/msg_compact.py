@@ -0,0 +1,243 @@
+# models/msg_compact.py
+"""
+收消息热路径用的紧凑同步消息结构（与 models/msg.py 中 pydantic 模型属性兼容）。
+
+- 全部使用 ``__slots__``，无 pydantic 校验与 ``__dict__``，单条消息内存与构造开销更低；
+- ``imgBuf`` / ``keyBuf`` 首次访问时才构造；``modContacts``、``snsObjects`` 等其它段
+  保留服务端原始数据，首次访问时才取出（缺省为空列表）；
+- 插件常用的 ``msg.content.string``、``msg.fromUserName.string``、``msg.msgType`` 等
+  写法不变；另提供 ``model_dump`` / ``model_copy`` 以兼容少量 pydantic 用法。
+
+结构不完整时 :func:`parse_sync_compact` 抛 ValueError，调用方可回退 pydantic 校验拿到详细错误。
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+# SyncMessageResponse 中除 addMsgs / keyBuf 外的列表段（按需取出，不预先构造）
+SYNC_SECTIONS = frozenset(
+    {
+        "modUserInfos",
+        "modContacts",
+        "delContacts",
+        "functionSwitchs",
+        "modUserImgs",
+        "userInfoExts",
+        "snsObjects",
+        "snsActionGroups",
+        "delChatContacts",
+        "modChatRoomMembers",
+        "quitChatRooms",
+        "modChatRoomNotifys",
+        "modChatRoomTopics",
+    }
+)
+
+_ADD_MSG_FIELDS = (
+    "msgId",
+    "fromUserName",
+    "toUserName",
+    "msgType",
+    "content",
+    "status",
+    "imgStatus",
+    "imgBuf",
+    "createTime",
+    "msgSource",
+    "pushContent",
+    "newMsgId",
+    "msgSeq",
+)
+
+_MISSING = object()
+
+
+class CompactString:
+    """对应 SKBuiltinString_t。"""
+
+    __slots__ = ("string",)
+
+    def __init__(self, string: Optional[str] = None) -> None:
+        self.string = string
+
+    @classmethod
+    def from_raw(cls, raw: Any) -> "CompactString":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise ValueError(f"expected object, got {type(raw).__name__}")
+        return cls(raw.get("string"))
+
+    def model_dump(self) -> Dict[str, Any]:
+        return {"string": self.string}
+
+    def __eq__(self, other: object) -> bool:
+        return getattr(other, "string", _MISSING) == self.string
+
+    def __repr__(self) -> str:
+        return f"CompactString(string={self.string!r})"
+
+
+class CompactBuffer:
+    """对应 SKBuiltinBuffer_t；buffer 在首次访问时才转为 bytes。"""
+
+    __slots__ = ("iLen", "_buffer", "_decoded")
+
+    def __init__(self, iLen: Optional[int] = None, buffer: Any = None) -> None:
+        self.iLen = iLen
+        self._buffer = buffer
+        self._decoded = buffer is None or isinstance(buffer, bytes)
+
+    @classmethod
+    def from_raw(cls, raw: Any) -> "CompactBuffer":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, dict):
+            raise ValueError(f"expected object, got {type(raw).__name__}")
+        return cls(raw.get("iLen"), raw.get("buffer"))
+
+    @property
+    def buffer(self) -> Optional[bytes]:
+        if not self._decoded:
+            # 与 pydantic 的 bytes 校验一致：字符串按 UTF-8 编码
+            raw = self._buffer
+            self._buffer = raw.encode("utf-8") if isinstance(raw, str) else bytes(raw)
+            self._decoded = True
+        return self._buffer
+
+    def model_dump(self) -> Dict[str, Any]:
+        return {"iLen": self.iLen, "buffer": self.buffer}
+
+    def __repr__(self) -> str:
+        return f"CompactBuffer(iLen={self.iLen!r})"
+
+
+class CompactAddMsg:
+    """对应 AddMsg；imgBuf 首次访问时才构造。"""
+
+    __slots__ = (
+        "msgId",
+        "fromUserName",
+        "toUserName",
+        "msgType",
+        "content",
+        "status",
+        "imgStatus",
+        "_imgBuf",
+        "createTime",
+        "msgSource",
+        "pushContent",
+        "newMsgId",
+        "msgSeq",
+        "_view",  # lwapi.models.msg_view.message_view 的缓存（未访问时不赋值）
+    )
+
+    @classmethod
+    def from_raw(cls, raw: Any) -> "CompactAddMsg":
+        if not isinstance(raw, dict):
+            raise ValueError(f"expected object, got {type(raw).__name__}")
+        self = cls.__new__(cls)
+        try:
+            self.msgId = raw["msgId"]
+            self.fromUserName = CompactString.from_raw(raw["fromUserName"])
+            self.toUserName = CompactString.from_raw(raw["toUserName"])
+            self.msgType = raw["msgType"]
+            self.content = CompactString.from_raw(raw["content"])
+            self.status = raw["status"]
+            self.imgStatus = raw["imgStatus"]
+            self._imgBuf = raw["imgBuf"]
+            self.createTime = raw["createTime"]
+        except KeyError as e:
+            raise ValueError(f"missing field: {e.args[0]}") from None
+        if not isinstance(self.msgType, int) or not isinstance(self.msgId, int):
+            raise ValueError("msgId / msgType must be int")
+        self.msgSource = raw.get("msgSource")
+        self.pushContent = raw.get("pushContent")
+        self.newMsgId = raw.get("newMsgId")
+        self.msgSeq = raw.get("msgSeq")
+        return self
+
+    @property
+    def imgBuf(self) -> CompactBuffer:
+        buf = self._imgBuf
+        if not isinstance(buf, CompactBuffer):
+            buf = self._imgBuf = CompactBuffer.from_raw(buf)
+        return buf
+
+    @imgBuf.setter
+    def imgBuf(self, value: Any) -> None:
+        self._imgBuf = value
+
+    def model_dump(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name in _ADD_MSG_FIELDS:
+            value = getattr(self, name)
+            out[name] = value.model_dump() if hasattr(value, "model_dump") else value
+        return out
+
+    def __repr__(self) -> str:
+        return (
+            f"CompactAddMsg(msgId={self.msgId!r}, msgType={self.msgType!r}, "
+            f"from={self.fromUserName.string!r}, to={self.toUserName.string!r}, newMsgId={self.newMsgId!r})"
+        )
+
+
+class CompactSyncResponse:
+    """对应 SyncMessageResponse；addMsgs 立即解析，其余段按需从原始数据取出。"""
+
+    __slots__ = ("addMsgs", "_raw")
+
+    def __init__(
+        self,
+        addMsgs: Optional[List[CompactAddMsg]] = None,
+        *,
+        _raw: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.addMsgs = addMsgs if addMsgs is not None else []
+        self._raw: Dict[str, Any] = _raw if _raw is not None else {}
+
+    def __getattr__(self, name: str) -> Any:
+        # 仅在 slots 中找不到时调用：modContacts 等段与 keyBuf
+        if name in SYNC_SECTIONS:
+            raw = self._raw
+            if name not in raw:
+                raw[name] = []
+            return raw[name]
+        if name == "keyBuf":
+            buf = self._raw.get("keyBuf")
+            if buf is not None and not isinstance(buf, CompactBuffer):
+                buf = self._raw["keyBuf"] = CompactBuffer.from_raw(buf)
+            return buf
+        raise AttributeError(f"{type(self).__name__!s} object has no attribute {name!r}")
+
+    def model_copy(self, *, update: Optional[Dict[str, Any]] = None) -> "CompactSyncResponse":
+        """浅拷贝（与 pydantic model_copy 同名，便于拆批等场景通用）。"""
+        update = dict(update or {})
+        add_msgs = update.pop("addMsgs", self.addMsgs)
+        return CompactSyncResponse(add_msgs, _raw={**self._raw, **update})
+
+    def model_dump(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {name: getattr(self, name) for name in SYNC_SECTIONS}
+        out["addMsgs"] = [m.model_dump() for m in self.addMsgs]
+        key_buf = self.keyBuf
+        out["keyBuf"] = key_buf.model_dump() if key_buf is not None else None
+        return out
+
+    def __repr__(self) -> str:
+        return f"CompactSyncResponse(addMsgs={len(self.addMsgs)})"
+
+
+def parse_sync_compact(payload: Dict[str, Any]) -> CompactSyncResponse:
+    """由同步接口的 data（dict）构造紧凑结构；结构不合法时抛 ValueError。"""
+    if not isinstance(payload, dict):
+        raise ValueError(f"expected object, got {type(payload).__name__}")
+    raw_msgs = payload.get("addMsgs")
+    if raw_msgs is None:
+        add_msgs: List[CompactAddMsg] = []
+    elif isinstance(raw_msgs, list):
+        add_msgs = [CompactAddMsg.from_raw(m) for m in raw_msgs]
+    else:
+        raise ValueError("addMsgs must be a list")
+    # 原始 addMsgs 已转成紧凑对象，不再随其它段一起保留
+    rest = {k: v for k, v in payload.items() if k != "addMsgs"}
+    return CompactSyncResponse(add_msgs, _raw=rest)
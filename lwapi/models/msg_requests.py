@@ -159,3 +159,13 @@ class RevokeMsgParam(MsgRequestBody):
     new_msg_id: Optional[int] = Field(None, serialization_alias="newMsgId")
     to_user_name: Optional[str] = Field(None, serialization_alias="toUserName")
     wxid: Optional[str] = Field(None, description="相关 wxid，视服务端要求填写")
+
+
+class MsgSyncParam(MsgRequestBody):
+    """POST /Msg/Sync 的可选请求体：携带上次同步返回的 keyBuf 从断点继续（与 /Favor/Sync 一致）。"""
+
+    key_buf: Optional[str] = Field(
+        None,
+        serialization_alias="keyBuf",
+        description="上次同步返回的密钥，首次可空",
+    )
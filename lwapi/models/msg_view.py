@@ -0,0 +1,143 @@
+# models/msg_view.py
+"""
+单条 AddMsg 的解析视图：群聊判断、发言人、正文、@ 列表、type 49 的 XML 等。
+
+各字段首次访问时才计算，结果缓存在视图上；视图本身缓存在消息对象上
+（紧凑结构的 ``_view`` 槽位 / pydantic 模型的私有属性），同一条消息无论经过
+多少个插件，都只解析一次。插件中用 :func:`message_view` 获取::
+
+    v = message_view(msg)
+    if v.is_group and not v.is_at(bot_wxid):
+        continue
+    text = v.body
+"""
+from __future__ import annotations
+
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Optional, Tuple
+
+NOTIFY_ALL = "notify@all"
+APP_MSG_TYPE = 49
+
+_ATUSERLIST_CDATA_RE = re.compile(
+    r"<atuserlist>\s*<!\[CDATA\[(?P<cdata>.*?)\]\]>\s*</atuserlist>",
+    re.IGNORECASE | re.DOTALL,
+)
+# 群消息正文形如「发言人wxid:\n正文」；兼容 wxid_ 开头、冒号后无换行的写法
+_SPEAKER_RE = re.compile(
+    r"^(?:(?P<wxid>wxid_[^:\s]+)\s*:|(?P<head>[^:\s]+):\n)\s*(?P<body>.*)$",
+    re.DOTALL,
+)
+
+_UNSET: Any = object()
+
+
+class MessageView:
+    """AddMsg 的惰性解析结果（只读）。"""
+
+    __slots__ = ("msg", "_content", "_speaker", "_body", "_at_list", "_xml")
+
+    def __init__(self, msg: Any) -> None:
+        self.msg = msg
+        self._content: Any = _UNSET
+        self._speaker: Any = _UNSET
+        self._body: Any = _UNSET
+        self._at_list: Any = _UNSET
+        self._xml: Any = _UNSET
+
+    @property
+    def from_id(self) -> str:
+        """会话 id：私聊为对方 wxid，群聊为群 id。"""
+        return (self.msg.fromUserName.string or "").strip()
+
+    @property
+    def is_group(self) -> bool:
+        return self.from_id.endswith("@chatroom")
+
+    @property
+    def content(self) -> str:
+        """去掉首尾空白的原始 content。"""
+        if self._content is _UNSET:
+            self._content = (self.msg.content.string or "").strip()
+        return self._content
+
+    def _split(self) -> None:
+        text = self.content
+        speaker: Optional[str] = None
+        if self.is_group and text:
+            m = _SPEAKER_RE.match(text)
+            if m:
+                speaker = m.group("wxid") or m.group("head")
+                text = (m.group("body") or "").strip()
+        self._speaker, self._body = speaker, text
+
+    @property
+    def speaker(self) -> Optional[str]:
+        """群聊发言人 wxid；私聊或无法识别时为 None。"""
+        if self._speaker is _UNSET:
+            self._split()
+        return self._speaker
+
+    @property
+    def body(self) -> str:
+        """正文：群聊去掉「发言人:」前缀，私聊即 content。"""
+        if self._body is _UNSET:
+            self._split()
+        return self._body
+
+    @property
+    def at_list(self) -> Tuple[str, ...]:
+        """msgSource 中 atuserlist 的 wxid（可能含 notify@all）。"""
+        if self._at_list is _UNSET:
+            found: Tuple[str, ...] = ()
+            src = self.msg.msgSource
+            m = _ATUSERLIST_CDATA_RE.search(src) if src else None
+            if m:
+                found = tuple(p.strip() for p in (m.group("cdata") or "").split(",") if p.strip())
+            self._at_list = found
+        return self._at_list
+
+    @property
+    def at_all(self) -> bool:
+        """是否 @所有人。"""
+        return NOTIFY_ALL in self.at_list
+
+    def is_at(self, wxid: str) -> bool:
+        """是否 @ 了指定 wxid（不含 @所有人）。"""
+        return bool(wxid) and wxid in self.at_list
+
+    @property
+    def xml(self) -> Optional[ET.Element]:
+        """type 49（链接、文件、小程序、引用等）的消息 XML 根节点；其它类型或解析失败为 None。"""
+        if self._xml is _UNSET:
+            root: Optional[ET.Element] = None
+            if self.msg.msgType == APP_MSG_TYPE and self.body:
+                try:
+                    root = ET.fromstring(self.body)
+                except ET.ParseError:
+                    root = None
+            self._xml = root
+        return self._xml
+
+    @property
+    def app_type(self) -> Optional[int]:
+        """type 49 消息的 appmsg/type（5 链接、6 文件、33/36 小程序、57 引用等）。"""
+        root = self.xml
+        text = root.findtext("appmsg/type") if root is not None else None
+        try:
+            return int(text) if text else None
+        except ValueError:
+            return None
+
+
+def message_view(msg: Any) -> MessageView:
+    """取得（必要时创建并缓存）该消息的解析视图；紧凑结构与 pydantic 模型均可。"""
+    view = getattr(msg, "_view", None)
+    if view is None:
+        view = MessageView(msg)
+        try:
+            msg._view = view
+        except AttributeError:
+            pass  # 无缓存位的消息对象：每次新建
+    return view
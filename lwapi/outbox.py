@@ -0,0 +1,543 @@
+# lwapi/outbox.py
+"""
+单账号发送队列：按接收者与账号两级令牌桶限速，按优先级出队，可合并连续短文本。
+
+插件突发回复或群发时不再同时打到 /Msg/SendTxt 等接口，降低被服务端限流、触发风控的概率：
+
+- 令牌桶：每个接收者（私聊对象 / 群）一个，整个账号一个，两者都有令牌才发送；
+- 优先级：interactive（交互回复）> normal（默认）> bulk（群发 / 广播），高优先级先出队；
+  同一优先级内各接收者轮转，单个接收者的大量消息不会饿死其它会话；
+- 合并（可选，默认关闭）：发往同一接收者、仍在排队的连续短文本（相同 @ 列表）合并为一条，用换行连接；
+- 同一接收者同时只有一个请求在途，保证到达顺序与提交顺序一致。
+
+提交返回 :class:`SendReceipt`，``await`` 得到接口原始返回（失败时抛出原异常）。
+每个回执有独立的 future：等待方被取消只影响自己的回执；消息发出前其全部回执都已取消时不再发送，
+合并文本中已取消的部分在出队时剔除。
+群发等低优先级场景可用 ``with send_priority("bulk"):`` 包裹，期间的发送自动进入 bulk 队列。
+``with measure_send_wait(meter):`` 期间（含其中创建的子任务）await 回执的时长累计到
+:class:`SendWaitMeter`，供调用方把排队等待从自身耗时中扣除（如插件 handle 的时限）。
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Literal, Optional, Set
+
+from loguru import logger
+
+from .config import OutboxConfig
+from .exceptions import LwApiError, SendQueueClosed
+
+SendPriority = Literal["interactive", "normal", "bulk"]
+# 出队顺序
+PRIORITIES = ("interactive", "normal", "bulk")
+
+# (接口路径, JSON 请求体, 超时) -> 接口返回
+PostFunc = Callable[[str, Any, Optional[float]], Awaitable[Any]]
+# (接收者, 文本, @列表) -> 文本消息请求体；合并文本后在出队时才生成
+TextPayloadFunc = Callable[[str, str, Optional[str]], Any]
+
+# 统计等待时间分位数时保留的最近样本数
+_WAIT_SAMPLES = 512
+# 空闲（已回满）接收者令牌桶超过该数量时清理
+_MAX_IDLE_BUCKETS = 1024
+
+_current_priority: ContextVar[Optional[SendPriority]] = ContextVar("lwapi_send_priority", default=None)
+_current_wait_meter: ContextVar[Optional["SendWaitMeter"]] = ContextVar("lwapi_send_wait_meter", default=None)
+
+
+def normalize_send_priority(raw: str | None, *, default: SendPriority = "normal") -> SendPriority:
+    """归一化优先级；未知值抛 ValueError。"""
+    if not raw or not str(raw).strip():
+        return default
+    key = str(raw).strip().lower()
+    if key in PRIORITIES:
+        return key  # type: ignore[return-value]
+    raise ValueError(f"未知发送优先级: {raw!r}，可选 interactive / normal / bulk")
+
+
+@contextmanager
+def send_priority(priority: str | SendPriority) -> Iterator[None]:
+    """在上下文（含其中创建的子任务）内，未显式指定优先级的发送使用该优先级。"""
+    token = _current_priority.set(normalize_send_priority(priority))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_send_priority(default: SendPriority = "normal") -> SendPriority:
+    return _current_priority.get() or default
+
+
+class SendWaitMeter:
+    """累计 await 发送回执的时长（秒）；同时等待多个回执时重叠部分只计一次。"""
+
+    __slots__ = ("total", "_active", "_since")
+
+    def __init__(self) -> None:
+        self.total = 0.0
+        self._active = 0
+        self._since = 0.0
+
+    def _enter(self) -> None:
+        if self._active == 0:
+            self._since = time.monotonic()
+        self._active += 1
+
+    def _exit(self) -> None:
+        self._active -= 1
+        if self._active == 0:
+            self.total += time.monotonic() - self._since
+
+    def elapsed(self) -> float:
+        """到目前为止的累计等待时长（含正在进行的等待）。"""
+        if self._active:
+            return self.total + time.monotonic() - self._since
+        return self.total
+
+
+@contextmanager
+def measure_send_wait(meter: Optional[SendWaitMeter]) -> Iterator[None]:
+    """在上下文（含其中创建的子任务）内把 await 回执的时长计入 meter；None 表示不计。"""
+    token = _current_wait_meter.set(meter)
+    try:
+        yield
+    finally:
+        _current_wait_meter.reset(token)
+
+
+class TokenBucket:
+    """令牌桶：rate 条/秒持续补充，最多积累 burst 个。rate <= 0 表示不限速。"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float) -> None:
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """距离可取到一个令牌还需等待的秒数（0 表示现在即可）。"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        if self.rate <= 0:
+            return
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def idle(self, now: float) -> bool:
+        """令牌已回满（长时间未使用）。"""
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class SendReceipt:
+    """一次排队发送的回执；``await receipt`` 得到接口原始返回，失败时抛出原异常。"""
+
+    __slots__ = ("to_wxid", "priority", "merged", "text", "enqueued_at", "sent_at", "_future")
+
+    def __init__(
+        self,
+        to_wxid: str,
+        priority: SendPriority,
+        *,
+        merged: bool = False,
+        text: Optional[str] = None,
+    ) -> None:
+        self.to_wxid = to_wxid
+        self.priority = priority
+        # True 表示这条文本已并入同一接收者的前一条排队消息（两者共享同一次发送的结果）
+        self.merged = merged
+        # 文本消息中属于本回执的部分（合并时按未取消的回执重新拼接）
+        self.text = text
+        self.enqueued_at = time.monotonic()
+        self.sent_at: Optional[float] = None
+        self._future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        # 调用方可能丢弃回执：取走异常，避免 "exception was never retrieved" 告警
+        self._future.add_done_callback(_retrieve_exception)
+
+    def __await__(self):
+        meter = _current_wait_meter.get()
+        if meter is None:
+            return self._future.__await__()
+        return self._metered(meter).__await__()
+
+    async def _metered(self, meter: SendWaitMeter) -> Any:
+        meter._enter()
+        try:
+            return await self._future
+        finally:
+            meter._exit()
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def cancelled(self) -> bool:
+        """等待方已取消（例如插件超时被取消）。"""
+        return self._future.cancelled()
+
+    def cancel(self) -> bool:
+        """撤回尚未发出的消息；已发出或已完成时返回 False。"""
+        if self.sent_at is not None:
+            return False
+        return self._future.cancel()
+
+    def _set_result(self, result: Any) -> None:
+        if not self._future.done():
+            self._future.set_result(result)
+
+    def _set_exception(self, error: BaseException) -> None:
+        if not self._future.done():
+            self._future.set_exception(error)
+
+    @property
+    def wait_seconds(self) -> Optional[float]:
+        """排队等待时长；尚未发出时为 None。"""
+        if self.sent_at is None:
+            return None
+        return self.sent_at - self.enqueued_at
+
+
+class _SendItem:
+    __slots__ = ("peer", "path", "payload", "timeout", "is_text", "at", "receipts")
+
+    def __init__(
+        self,
+        peer: str,
+        path: str,
+        payload: Any,
+        timeout: Optional[float],
+        *,
+        is_text: bool = False,
+        at: Optional[str] = None,
+    ) -> None:
+        self.peer = peer
+        self.path = path
+        self.payload = payload
+        self.timeout = timeout
+        self.is_text = is_text
+        self.at = at
+        self.receipts: List[SendReceipt] = []
+
+    def live(self) -> List[SendReceipt]:
+        """仍有人等待结果的回执。"""
+        return [r for r in self.receipts if not r.cancelled()]
+
+    def abandoned(self) -> bool:
+        return not any(not r.cancelled() for r in self.receipts)
+
+    def text(self) -> str:
+        return "\n".join(r.text or "" for r in self.live())
+
+    def set_result(self, result: Any) -> None:
+        for receipt in self.receipts:
+            receipt._set_result(result)
+
+    def set_exception(self, error: BaseException) -> None:
+        for receipt in self.receipts:
+            receipt._set_exception(error)
+
+
+def _retrieve_exception(fut: "asyncio.Future[Any]") -> None:
+    if not fut.cancelled():
+        fut.exception()
+
+
+class OutboundScheduler:
+    """单账号的发送队列与后台出队协程（首次提交时启动）。"""
+
+    def __init__(
+        self,
+        post: PostFunc,
+        config: Optional[OutboxConfig] = None,
+        *,
+        text_path: str = "/Msg/SendTxt",
+        text_payload: Optional[TextPayloadFunc] = None,
+    ) -> None:
+        self._post = post
+        self.config = config or OutboxConfig()
+        self._text_path = text_path
+        self._text_payload = text_payload
+        now = time.monotonic()
+        self._account = TokenBucket(self.config.account_rate, self.config.account_burst, now)
+        self._peers: Dict[str, TokenBucket] = {}
+        # 每个优先级：接收者 -> 待发队列；OrderedDict 维持接收者轮转顺序
+        self._lanes: Dict[str, "OrderedDict[str, Deque[_SendItem]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._busy_peers: Set[str] = set()
+        self._inflight: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.merged = 0
+        self.throttled = 0
+        self.cancelled = 0
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._max_wait = 0.0
+
+    # ==================== 提交 ====================
+    def submit(
+        self,
+        to_wxid: str,
+        path: str,
+        payload: Any,
+        *,
+        timeout: Optional[float] = None,
+        priority: str | SendPriority | None = None,
+    ) -> SendReceipt:
+        """提交任意发送接口请求（请求体已组装好）。"""
+        prio = self._priority(priority)
+        item = _SendItem(to_wxid, path, payload, timeout)
+        return self._enqueue(item, prio, SendReceipt(to_wxid, prio))
+
+    def submit_text(
+        self,
+        to_wxid: str,
+        content: str,
+        at: Optional[str] = None,
+        *,
+        timeout: Optional[float] = None,
+        priority: str | SendPriority | None = None,
+    ) -> SendReceipt:
+        """提交文本消息；开启合并时可能并入同一接收者仍在排队的上一条文本。"""
+        if self._text_payload is None:
+            raise LwApiError("发送队列未配置文本消息请求体")
+        prio = self._priority(priority)
+        cfg = self.config
+        if cfg.coalesce and not self._closed:
+            queue = self._lanes[prio].get(to_wxid)
+            last = queue[-1] if queue else None
+            if (
+                last is not None
+                and last.is_text
+                and last.at == at
+                and not last.abandoned()
+                and len(last.text()) + 1 + len(content) <= cfg.coalesce_max_chars
+            ):
+                self.merged += 1
+                receipt = SendReceipt(to_wxid, prio, merged=True, text=content)
+                last.receipts.append(receipt)
+                return receipt
+        item = _SendItem(to_wxid, self._text_path, None, timeout, is_text=True, at=at)
+        return self._enqueue(item, prio, SendReceipt(to_wxid, prio, text=content))
+
+    def _priority(self, priority: str | SendPriority | None) -> SendPriority:
+        if priority:
+            return normalize_send_priority(priority)
+        return current_send_priority()
+
+    def _enqueue(self, item: _SendItem, priority: SendPriority, receipt: SendReceipt) -> SendReceipt:
+        if self._closed:
+            raise SendQueueClosed("发送队列已关闭")
+        item.receipts.append(receipt)
+        lane = self._lanes[priority]
+        queue = lane.get(item.peer)
+        if queue is None:
+            queue = lane[item.peer] = deque()
+        queue.append(item)
+        self.enqueued += 1
+        self._ensure_worker()
+        assert self._wakeup is not None
+        self._wakeup.set()
+        return receipt
+
+    # ==================== 出队 ====================
+    def _ensure_worker(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def _peer_bucket(self, peer: str, now: float) -> TokenBucket:
+        bucket = self._peers.get(peer)
+        if bucket is None:
+            if len(self._peers) >= _MAX_IDLE_BUCKETS:
+                self._prune_buckets(now)
+            bucket = self._peers[peer] = TokenBucket(self.config.peer_rate, self.config.peer_burst, now)
+        return bucket
+
+    def _prune_buckets(self, now: float) -> None:
+        queued = {peer for lane in self._lanes.values() for peer in lane}
+        for peer in [p for p, b in self._peers.items() if b.idle(now) and p not in queued]:
+            del self._peers[peer]
+
+    def _next_ready(self, now: float) -> tuple[Optional[_SendItem], Optional[float]]:
+        """取下一条可发送的消息；都不可发时返回 (None, 最短等待秒数)。"""
+        if len(self._inflight) >= max(1, self.config.max_inflight):
+            return None, None
+        account_delay = self._account.delay(now)
+        soonest: Optional[float] = None
+        for prio in PRIORITIES:
+            lane = self._lanes[prio]
+            picked: Optional[str] = None
+            emptied: List[str] = []
+            for peer, queue in lane.items():
+                # 回执已全部取消的消息不再发送（也不占用令牌）
+                while queue and queue[0].abandoned():
+                    queue.popleft()
+                    self.cancelled += 1
+                if not queue:
+                    emptied.append(peer)
+                    continue
+                if peer in self._busy_peers:
+                    continue
+                delay = max(account_delay, self._peer_bucket(peer, now).delay(now))
+                if delay > 0:
+                    soonest = delay if soonest is None else min(soonest, delay)
+                    continue
+                picked = peer
+                break
+            for peer in emptied:
+                del lane[peer]
+            if picked is not None:
+                queue = lane[picked]
+                item = queue.popleft()
+                if queue:
+                    lane.move_to_end(picked)
+                else:
+                    del lane[picked]
+                self._account.consume(now)
+                self._peers[picked].consume(now)
+                return item, None
+        if soonest is not None:
+            self.throttled += 1
+        return None, soonest
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        wakeup = self._wakeup
+        while True:
+            item, delay = self._next_ready(time.monotonic())
+            if item is None:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._busy_peers.add(item.peer)
+            task = asyncio.create_task(self._send(item))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, item: _SendItem) -> None:
+        now = time.monotonic()
+        live = item.live()
+        if not live:
+            self.cancelled += 1
+            self._release(item)
+            return
+        for receipt in live:
+            receipt.sent_at = now
+            wait = now - receipt.enqueued_at
+            self._waits.append(wait)
+            if wait > self._max_wait:
+                self._max_wait = wait
+        payload = item.payload
+        if item.is_text:
+            assert self._text_payload is not None
+            # 合并文本只拼接仍在等待的部分
+            payload = self._text_payload(item.peer, "\n".join(r.text or "" for r in live), item.at)
+        try:
+            result = await self._post(item.path, payload, item.timeout)
+        except asyncio.CancelledError:
+            # 出队协程被关闭：回执以普通异常失败，不把取消传给等待方
+            item.set_exception(SendQueueClosed("发送队列已关闭，消息发送被中断"))
+            raise
+        except Exception as e:
+            self.failed += 1
+            item.set_exception(e)
+        else:
+            self.sent += 1
+            item.set_result(result)
+        finally:
+            self._release(item)
+
+    def _release(self, item: _SendItem) -> None:
+        """
+        发送结束：释放接收者与在途名额，并唤醒出队协程。
+
+        须在唤醒前移出 _inflight：任务的 done 回调晚于唤醒执行，名额已满时出队协程
+        会误以为仍然占满而无限期等待。
+        """
+        task = asyncio.current_task()
+        if task is not None:
+            self._inflight.discard(task)
+        self._busy_peers.discard(item.peer)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ==================== 统计与关闭 ====================
+    def pending(self) -> int:
+        return sum(len(q) for lane in self._lanes.values() for q in lane.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度与排队等待时间（秒）快照。"""
+        waits = sorted(self._waits)
+        return {
+            "pending": self.pending(),
+            "lanes": {p: sum(len(q) for q in self._lanes[p].values()) for p in PRIORITIES},
+            "inflight": len(self._inflight),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "merged": self.merged,
+            "cancelled": self.cancelled,
+            "throttled": self.throttled,
+            "wait_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+            "wait_max": round(self._max_wait, 3),
+        }
+
+    async def _drained(self) -> None:
+        while self.pending() or self._inflight:
+            await asyncio.sleep(0.05)
+
+    async def aclose(self, drain_timeout: float = 5.0) -> None:
+        """
+        停止接收新消息，最多等待 drain_timeout 秒把队列发完；
+        之后停止出队、等待在途请求结束，仍在排队的回执以 LwApiError 失败。
+        """
+        self._closed = True
+        if drain_timeout > 0 and self._worker is not None and not self._worker.done():
+            try:
+                await asyncio.wait_for(self._drained(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+        dropped = 0
+        for lane in self._lanes.values():
+            for queue in lane.values():
+                for item in queue:
+                    item.set_exception(SendQueueClosed("发送队列已关闭，消息未发出"))
+                    dropped += 1
+            lane.clear()
+        if dropped:
+            logger.warning(f"发送队列关闭，丢弃 {dropped} 条未发出的消息")
@@ -0,0 +1,97 @@
+# lwapi/pacing.py
+"""
+HTTP 长轮询（/Msg/Sync）节奏控制。
+
+- 上一批有消息：立即再拉，突发消息不再被固定间隔拖慢；
+- 空批：从 base 起指数退避到 max_delay；服务端已挂起等待过的时间计入间隔；
+- 每次等待叠加 ±jitter 比例的随机抖动，避免大量账号同频轮询。
+
+同时统计轮询次数、空批率、批大小与最近一分钟的实际轮询频率。
+"""
+from __future__ import annotations
+
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+# 统计「最近轮询频率」的时间窗口（秒）
+_RATE_WINDOW_SEC = 60.0
+
+
+class PollPacer:
+    """单账号长轮询的间隔计算与统计。"""
+
+    def __init__(self, base: float = 1.0, max_delay: float = 5.0, jitter: float = 0.2) -> None:
+        self.base = max(0.0, float(base))
+        self.max_delay = max(self.base, float(max_delay))
+        self.jitter = min(max(0.0, float(jitter)), 1.0)
+        self._empty_streak = 0
+        self._recent: Deque[float] = deque()
+        self._started = time.monotonic()
+
+        self.polls = 0
+        self.empty_polls = 0
+        self.errors = 0
+        self.messages = 0
+        self.max_batch = 0
+        self.last_delay = 0.0
+
+    def _jittered(self, delay: float) -> float:
+        if delay <= 0 or not self.jitter:
+            return delay
+        return delay * random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+
+    def _count_poll(self) -> None:
+        now = time.monotonic()
+        self.polls += 1
+        self._recent.append(now)
+        while self._recent and now - self._recent[0] > _RATE_WINDOW_SEC:
+            self._recent.popleft()
+
+    def after_batch(self, batch_size: int, elapsed: float) -> float:
+        """记录一次成功轮询，返回下次轮询前应等待的秒数。"""
+        self._count_poll()
+        if batch_size > 0:
+            self.messages += batch_size
+            if batch_size > self.max_batch:
+                self.max_batch = batch_size
+            self._empty_streak = 0
+            self.last_delay = 0.0
+            return 0.0
+        self.empty_polls += 1
+        self._empty_streak += 1
+        delay = min(self.base * (2 ** (self._empty_streak - 1)), self.max_delay)
+        # 服务端挂起长轮询的时间已经起到了「等待」的作用
+        self.last_delay = self._jittered(max(0.0, delay - elapsed))
+        return self.last_delay
+
+    def after_timeout(self) -> float:
+        """长轮询超时（服务端挂满未返回）：视为空批，短暂抖动后立即再拉。"""
+        self._count_poll()
+        self.empty_polls += 1
+        self.last_delay = self._jittered(min(self.base, 0.5))
+        return self.last_delay
+
+    def after_error(self, delay: float = 2.0) -> float:
+        """请求失败：固定退避（带抖动）。"""
+        self.errors += 1
+        self.last_delay = self._jittered(delay)
+        return self.last_delay
+
+    def stats(self) -> Dict[str, Any]:
+        """轮询频率与批大小快照（供日志 / 运维台展示）。"""
+        now = time.monotonic()
+        recent = sum(1 for t in self._recent if now - t <= _RATE_WINDOW_SEC)
+        window = min(_RATE_WINDOW_SEC, max(now - self._started, 1e-9))
+        full = self.polls - self.empty_polls
+        return {
+            "polls": self.polls,
+            "empty_polls": self.empty_polls,
+            "errors": self.errors,
+            "messages": self.messages,
+            "avg_batch": round(self.messages / full, 2) if full else 0.0,
+            "max_batch": self.max_batch,
+            "polls_per_min": round(recent * 60.0 / window, 2),
+            "last_delay": round(self.last_delay, 3),
+        }
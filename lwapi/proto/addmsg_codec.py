@@ -0,0 +1,78 @@
+# lwapi/proto/addmsg_codec.py
+"""
+protobuf ``wechat.AddMsg``（proto/addmsg.proto）与 SDK 模型 :class:`~lwapi.models.msg.AddMsg` 互转。
+
+WebSocket 以 protobuf 编码推送时，每个 BINARY 帧为一条序列化的 AddMsg。
+解码结果与 JSON 推送的 addMsgs 元素同形（未设置的 optional 字段为 None），
+可直接交给 pydantic 一次性校验，省去 JSON 文本解析。
+"""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from google.protobuf.message import DecodeError
+
+from ..models.msg import AddMsg
+from . import addmsg_pb2
+
+__all__ = ["DecodeError", "decode_add_msg", "decode_add_msg_dict", "encode_add_msg"]
+
+
+def _sk_string(pb: addmsg_pb2.SKBuiltinString_t) -> Dict[str, Any]:
+    return {"string": pb.string if pb.HasField("string") else None}
+
+
+def _optional(pb: Any, name: str) -> Any:
+    return getattr(pb, name) if pb.HasField(name) else None
+
+
+def decode_add_msg_dict(data: bytes) -> Dict[str, Any]:
+    """解析一条 protobuf AddMsg 为 JSON 同形 dict；数据不完整或非法时抛 DecodeError。"""
+    pb = addmsg_pb2.AddMsg()
+    pb.ParseFromString(data)
+    img = pb.imgBuf
+    return {
+        "msgId": pb.msgId,
+        "fromUserName": _sk_string(pb.fromUserName),
+        "toUserName": _sk_string(pb.toUserName),
+        "msgType": pb.msgType,
+        "content": _sk_string(pb.content),
+        "status": pb.status,
+        "imgStatus": pb.imgStatus,
+        "imgBuf": {"iLen": img.iLen, "buffer": _optional(img, "buffer")},
+        "createTime": pb.createTime,
+        "msgSource": _optional(pb, "msgSource"),
+        "pushContent": _optional(pb, "pushContent"),
+        "newMsgId": _optional(pb, "newMsgId"),
+        "msgSeq": _optional(pb, "msgSeq"),
+    }
+
+
+def decode_add_msg(data: bytes) -> AddMsg:
+    """解析一条 protobuf AddMsg 为 SDK 模型。"""
+    return AddMsg.model_validate(decode_add_msg_dict(data))
+
+
+def encode_add_msg(msg: AddMsg) -> bytes:
+    """将 SDK AddMsg 序列化为 protobuf（用于测试、基准与本地回放）。"""
+    pb = addmsg_pb2.AddMsg(
+        msgId=msg.msgId,
+        msgType=msg.msgType,
+        status=msg.status,
+        imgStatus=msg.imgStatus,
+        createTime=msg.createTime,
+    )
+    for name in ("fromUserName", "toUserName", "content"):
+        sk = getattr(msg, name)
+        target = getattr(pb, name)
+        target.SetInParent()
+        if sk is not None and sk.string is not None:
+            target.string = sk.string
+    pb.imgBuf.iLen = (msg.imgBuf.iLen if msg.imgBuf else None) or 0
+    if msg.imgBuf and msg.imgBuf.buffer is not None:
+        pb.imgBuf.buffer = msg.imgBuf.buffer
+    for name in ("msgSource", "pushContent", "newMsgId", "msgSeq"):
+        value = getattr(msg, name)
+        if value is not None:
+            setattr(pb, name, value)
+    return pb.SerializeToString()
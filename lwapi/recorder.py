@@ -0,0 +1,83 @@
+# lwapi/recorder.py
+"""
+原始同步数据录制（gzip 压缩的 NDJSON），用于离线回放压测插件链。
+
+第一行为文件头::
+
+    {"type": "header", "wxid": "...", "ws_encoding": "json", "started_at": 1700000000.0}
+
+之后每行一条记录::
+
+    {"t": 时间戳, "src": "ws" | "sync", "kind": "text" | "bytes" | "json", "data": ...}
+
+- ``src=ws``：WebSocket 帧，text 原样保存，bytes（如 protobuf）以 base64 保存；
+- ``src=sync``：/Msg/Sync 返回的 data（已拆掉外层 code/message），kind 为 json。
+
+回放见 ``python -m src.replay``。
+"""
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, Optional, Union
+
+from loguru import logger
+
+RecordPayload = Union[str, bytes, Dict[str, Any]]
+
+
+class SyncRecorder:
+    """把同步原始数据追加写入 .ndjson.gz 文件。"""
+
+    def __init__(self, path: Union[str, Path], *, wxid: str = "", ws_encoding: str = "json") -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fp: Optional[IO[str]] = gzip.open(self.path, "at", encoding="utf-8")
+        self.count = 0
+        self._write(
+            {"type": "header", "wxid": wxid, "ws_encoding": ws_encoding, "started_at": time.time()}
+        )
+
+    def _write(self, obj: Dict[str, Any]) -> None:
+        if self._fp is None:
+            return
+        self._fp.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")))
+        self._fp.write("\n")
+
+    def record(self, source: str, raw: Any) -> None:
+        """记录一条原始数据；录制失败只打日志，不影响收消息。"""
+        if isinstance(raw, str):
+            kind, data = "text", raw
+        elif isinstance(raw, (bytes, bytearray)):
+            kind, data = "bytes", base64.b64encode(raw).decode("ascii")
+        else:
+            kind, data = "json", raw
+        try:
+            self._write({"t": time.time(), "src": source, "kind": kind, "data": data})
+            self.count += 1
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"录制同步数据失败 {self.path}: {e}")
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+def read_records(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """逐行读取录制文件（含文件头；同一文件多次追加录制时会出现多个文件头）。"""
+    with gzip.open(Path(path), "rt", encoding="utf-8") as fp:
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def record_payload(record: Dict[str, Any]) -> RecordPayload:
+    """还原记录中的原始数据（bytes 记录解码 base64）。"""
+    if record.get("kind") == "bytes":
+        return base64.b64decode(record["data"])
+    return record["data"]
@@ -0,0 +1,161 @@
+# lwapi/streaming.py
+"""
+大媒体请求体的流式 JSON 编码（发视频、发语音、发图片）。
+
+原先视频 / 语音 / 图片以完整 Base64 字符串传入，经 pydantic 模型、``to_api()`` 的 dict、
+httpx 的 JSON 序列化各复制一遍，20MB 的视频要占用数倍内存。这里让媒体字段接受
+文件路径、bytes 或二进制流，请求体按块读取、按块 Base64 编码后边编码边发送，
+单次发送的峰值内存只与块大小有关，与媒体大小无关。
+
+- ``str`` 仍视为已编码的 Base64（与旧接口一致，走普通 JSON 请求）；
+- ``bytes`` / ``bytearray`` / ``memoryview``：原始二进制，按块编码，不复制整块；
+- ``os.PathLike``（如 ``Path``）：文件在工作线程中按块读取；
+- 有 ``read`` 方法的二进制文件对象，或 bytes 的异步迭代器：按块读取，只能发送一次。
+
+长度可知时（bytes、文件、可 fstat 的文件对象）带 Content-Length，否则使用分块传输。
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Dict, List, Mapping, Optional, Type, Union
+
+from pydantic import BaseModel
+
+# 每块原始字节数（3 的倍数，编码后正好 256KB，不产生中间填充）
+RAW_CHUNK_SIZE = 192 * 1024
+
+MediaSource = Union[str, bytes, bytearray, memoryview, "os.PathLike[str]", BinaryIO, AsyncIterable[bytes]]
+
+
+def _known_size(source: Any) -> Optional[int]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    if isinstance(source, os.PathLike):
+        return os.stat(source).st_size
+    if hasattr(source, "seekable"):
+        try:
+            if source.seekable():
+                pos = source.tell()
+                end = source.seek(0, os.SEEK_END)
+                source.seek(pos)
+                return end - pos
+        except (OSError, ValueError):
+            return None
+    return None
+
+
+class Base64Field:
+    """请求体中按块 Base64 编码的媒体字段（编码后不含需转义的字符，直接写入 JSON 字符串）。"""
+
+    def __init__(self, source: Any, *, chunk_size: int = RAW_CHUNK_SIZE) -> None:
+        if isinstance(source, str):
+            raise TypeError("str 视为已编码的 Base64，请直接放入普通 JSON")
+        self.source = source
+        self.chunk_size = max(3, chunk_size - chunk_size % 3)
+        self.raw_size = _known_size(source)
+
+    @property
+    def encoded_size(self) -> Optional[int]:
+        return None if self.raw_size is None else 4 * ((self.raw_size + 2) // 3)
+
+    async def _raw_chunks(self) -> AsyncIterator[Any]:
+        src, size = self.source, self.chunk_size
+        if isinstance(src, (bytes, bytearray, memoryview)):
+            view = memoryview(src).cast("B")
+            for start in range(0, len(view), size):
+                yield view[start : start + size]
+        elif isinstance(src, os.PathLike):
+            fp = await asyncio.to_thread(open, src, "rb")
+            try:
+                while chunk := await asyncio.to_thread(fp.read, size):
+                    yield chunk
+            finally:
+                await asyncio.to_thread(fp.close)
+        elif hasattr(src, "read"):
+            while chunk := await asyncio.to_thread(src.read, size):
+                yield chunk
+        else:
+            async for chunk in src:
+                yield chunk
+
+    async def aiter_encoded(self) -> AsyncIterator[bytes]:
+        """按块产出 Base64 文本；读到的块不是 3 的倍数时把余下 1~2 字节并入下一块。"""
+        carry = b""
+        async for raw in self._raw_chunks():
+            data = carry + raw if carry else raw
+            cut = len(data) - len(data) % 3
+            carry = bytes(data[cut:])
+            if cut:
+                yield base64.b64encode(data[:cut])
+        if carry:
+            yield base64.b64encode(carry)
+
+
+class StreamingJsonBody:
+    """
+    含 :class:`Base64Field` 的 JSON 对象请求体；``AsyncHTTPTransport.post`` 的 json 参数可直接传入。
+
+    其余字段在构造时用标准库 json 编码好，发送时依次写出，媒体字段按块编码写出。
+    """
+
+    def __init__(self, fields: Mapping[str, Any]) -> None:
+        self._segments: List[Union[bytes, Base64Field]] = []
+        buf = "{"
+        for i, (key, value) in enumerate(fields.items()):
+            buf += ("," if i else "") + json.dumps(key) + ":"
+            if isinstance(value, Base64Field):
+                self._segments.append((buf + '"').encode("utf-8"))
+                self._segments.append(value)
+                buf = '"'
+            else:
+                buf += json.dumps(value, ensure_ascii=False)
+        self._segments.append((buf + "}").encode("utf-8"))
+
+    @property
+    def content_length(self) -> Optional[int]:
+        total = 0
+        for seg in self._segments:
+            if isinstance(seg, Base64Field):
+                if seg.encoded_size is None:
+                    return None
+                total += seg.encoded_size
+            else:
+                total += len(seg)
+        return total
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        length = self.content_length
+        if length is not None:
+            headers["Content-Length"] = str(length)
+        return headers
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for seg in self._segments:
+            if isinstance(seg, Base64Field):
+                async for chunk in seg.aiter_encoded():
+                    yield chunk
+            else:
+                yield seg
+
+
+def media_body(
+    model: Type[BaseModel], media: Mapping[str, MediaSource], **fields: Any
+) -> Union[Dict[str, Any], StreamingJsonBody]:
+    """
+    构造含媒体字段的请求体：media 为 模型字段名 -> 媒体来源，其余字段照常传入。
+
+    媒体均为 str（已编码的 Base64）时返回与 ``model(...).to_api()`` 相同的 dict；
+    否则其余字段仍经模型校验与别名映射，媒体字段替换为按块编码的 :class:`Base64Field`。
+    """
+    if all(isinstance(v, str) for v in media.values()):
+        return model(**fields, **media).to_api()  # type: ignore[attr-defined]
+    payload = model(**fields, **{name: "" for name in media}).to_api()  # type: ignore[attr-defined]
+    for name, source in media.items():
+        info = model.model_fields[name]
+        alias = info.serialization_alias or info.alias or name
+        payload[alias] = source if isinstance(source, str) else Base64Field(source)
+    return StreamingJsonBody(payload)
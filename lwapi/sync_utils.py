@@ -5,14 +5,18 @@ from __future__ import annotations
 from typing import Literal
 from urllib.parse import urlencode, urlparse
 
-SyncMode = Literal["poll", "websocket"]
+SyncMode = Literal["poll", "websocket", "hybrid"]
+WsEncoding = Literal["json", "protobuf"]
 
 _POLL_ALIASES = frozenset({"poll", "polling", "http", "longpoll", "long_poll"})
 _WS_ALIASES = frozenset({"websocket", "ws", "wss", "wssocket", "socket"})
+_HYBRID_ALIASES = frozenset({"hybrid", "auto", "ws+poll", "websocket+poll"})
+_JSON_ALIASES = frozenset({"json", "text"})
+_PROTOBUF_ALIASES = frozenset({"protobuf", "proto", "pb", "binary"})
 
 
 def normalize_sync_mode(raw: str | None, *, default: SyncMode = "websocket") -> SyncMode:
-    """将用户/配置中的同步方式归一化为 poll 或 websocket。"""
+    """将用户/配置中的同步方式归一化为 poll、websocket 或 hybrid。"""
     if not raw or not str(raw).strip():
         return default
     key = str(raw).strip().lower()
@@ -20,15 +24,30 @@ def normalize_sync_mode(raw: str | None, *, default: SyncMode = "websocket") ->
         return "poll"
     if key in _WS_ALIASES:
         return "websocket"
-    raise ValueError(f"未知消息同步方式: {raw!r}，可选 poll / websocket")
+    if key in _HYBRID_ALIASES:
+        return "hybrid"
+    raise ValueError(f"未知消息同步方式: {raw!r}，可选 poll / websocket / hybrid")
 
 
-def build_msg_ws_url(base_url: str, wxid: str) -> str:
+def normalize_ws_encoding(raw: str | None, *, default: WsEncoding = "json") -> WsEncoding:
+    """将 WebSocket 推送编码归一化为 json 或 protobuf。"""
+    if not raw or not str(raw).strip():
+        return default
+    key = str(raw).strip().lower()
+    if key in _JSON_ALIASES:
+        return "json"
+    if key in _PROTOBUF_ALIASES:
+        return "protobuf"
+    raise ValueError(f"未知 WebSocket 消息编码: {raw!r}，可选 json / protobuf")
+
+
+def build_msg_ws_url(base_url: str, wxid: str, *, encoding: WsEncoding = "json") -> str:
     """
     根据 HTTP base_url 与 wxid 构造消息同步 WebSocket 地址。
 
     示例：http://127.0.0.1:8081 + wxid_xxx
           -> ws://127.0.0.1:8081/ws/sync?wxid=wxid_xxx
+    encoding 为 protobuf 时追加 ``encoding=protobuf``，请求服务端以二进制 AddMsg 推送。
     """
     wxid = (wxid or "").strip()
     if not wxid:
@@ -43,5 +62,8 @@ def build_msg_ws_url(base_url: str, wxid: str) -> str:
     if not host:
         raise ValueError(f"无法从 base_url 解析主机: {base_url!r}")
 
-    query = urlencode({"wxid": wxid})
+    params = {"wxid": wxid}
+    if encoding == "protobuf":
+        params["encoding"] = "protobuf"
+    query = urlencode(params)
     return f"{scheme}://{host}/ws/sync?{query}"
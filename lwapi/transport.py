@@ -1,51 +1,139 @@
 # lwapi/transport.py
 import httpx
 from loguru import logger
-from typing import TypeVar, Type, Optional
+from typing import Dict, Literal, Tuple, TypeVar, Type, Optional, Union
 
-from .config import ClientConfig
-from .models.base import ApiResponse
+from .codec import json_loads, parse_envelope
+from .config import ClientConfig, HttpPoolConfig
 from .exceptions import HttpError, ApiError
+from .streaming import StreamingJsonBody
 
 _T = TypeVar("_T")
 
+# 连接通道：普通接口（发消息、查询）与长轮询（/Msg/Sync）各用一个连接池，
+# 长轮询占满连接时不会让发消息排队。
+Lane = Literal["api", "sync"]
+LANE_API: Lane = "api"
+LANE_SYNC: Lane = "sync"
+
+# 进程级共享连接池：同一通道 + HttpPoolConfig 的所有账号复用一个 httpx.AsyncClient，
+# X-Wxid 仍按请求单独设置，互不影响。
+_shared_clients: Dict[Tuple[Lane, HttpPoolConfig], httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client(pool: HttpPoolConfig, timeout: float) -> httpx.AsyncClient:
+    http2 = pool.http2
+    if http2 and not _http2_available():
+        logger.warning("未安装 h2，HTTP/2 已回退为 HTTP/1.1（pip install 'httpx[http2]'）")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=pool.max_connections,
+        max_keepalive_connections=pool.max_keepalive_connections,
+        keepalive_expiry=pool.keepalive_expiry,
+    )
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=http2)
+
+
+def shared_http_client(
+    pool: HttpPoolConfig,
+    *,
+    lane: Lane = LANE_API,
+    timeout: float = 15.0,
+) -> httpx.AsyncClient:
+    """获取（必要时创建）该通道与连接池参数对应的进程级共享客户端。"""
+    key = (lane, pool)
+    client = _shared_clients.get(key)
+    if client is None or client.is_closed:
+        client = _build_client(pool, timeout)
+        _shared_clients[key] = client
+    return client
+
+
+async def close_shared_clients() -> None:
+    """关闭全部共享连接池（进程退出时调用；单个 transport.aclose 不会关闭共享池）。"""
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+    for client in clients:
+        if not client.is_closed:
+            await client.aclose()
+
+
 class AsyncHTTPTransport:
     def __init__(self, config: ClientConfig):
         self._config = config
-        self._client = httpx.AsyncClient(timeout=config.timeout)
+        # 独占模式下各通道的连接池按需创建（WebSocket 同步的账号不会用到 sync 通道）
+        self._own_clients: Dict[Lane, httpx.AsyncClient] = {}
+
+    def _lane_settings(self, lane: Lane) -> Tuple[HttpPoolConfig, float]:
+        if lane == LANE_SYNC:
+            return self._config.sync_pool, self._config.sync_timeout
+        return self._config.pool, self._config.timeout
+
+    def _client_for(self, lane: Lane) -> httpx.AsyncClient:
+        pool, timeout = self._lane_settings(lane)
+        if self._config.shared_pool:
+            return shared_http_client(pool, lane=lane, timeout=timeout)
+        client = self._own_clients.get(lane)
+        if client is None:
+            client = _build_client(pool, timeout)
+            self._own_clients[lane] = client
+        return client
+
+    def default_timeout(self, lane: Lane = LANE_API) -> float:
+        """该通道的默认超时（秒）。"""
+        return self._lane_settings(lane)[1]
 
     async def aclose(self) -> None:
-        """关闭底层连接池，避免程序退出时出现未关闭连接告警。"""
-        await self._client.aclose()
+        """关闭底层连接池，避免程序退出时出现未关闭连接告警（共享池由 close_shared_clients 统一关闭）。"""
+        clients = list(self._own_clients.values())
+        self._own_clients.clear()
+        for client in clients:
+            await client.aclose()
 
     async def post(
         self,
         path: str,
-        json: Optional[dict] = None,
+        json: Optional[Union[dict, StreamingJsonBody]] = None,
         params: Optional[dict] = None,
         *,
         timeout: Optional[float] = None,
         response_model: Type[_T] = dict,  # 默认返回 dict，避免每次都写
+        lane: Lane = LANE_API,
     ) -> _T:
         """
         完全兼容 Python 3.9+ 的泛型 post
         - 自动加 X-Wxid
         - 自动检查 HTTP 200 + 业务 code 200
         - 直接返回你指定的模型实例（类型提示完美）
+        - lane="sync" 时走长轮询专用连接池与超时
+        - json 为 StreamingJsonBody 时流式发送（大媒体按块 Base64 编码，见 lwapi.streaming）
         """
         headers = {}
         if self._config.x_wxid:
             headers["X-Wxid"] = self._config.x_wxid
 
         url = self._config.api_url(path)
+        if isinstance(json, StreamingJsonBody):
+            headers.update(json.headers())
+            body = {"content": json}
+        else:
+            body = {"json": json}
 
         try:
-            response = await self._client.post(
+            response = await self._client_for(lane).post(
                 url,
-                json=json,
+                **body,
                 params=params,
                 headers=headers,
-                timeout=timeout if timeout is not None else self._config.timeout,
+                timeout=timeout if timeout is not None else self.default_timeout(lane),
             )
         except httpx.TimeoutException:
             raise HttpError(0, "request timeout")
@@ -57,27 +145,27 @@ class AsyncHTTPTransport:
             raise HttpError(response.status_code, response.text[:500])
 
         try:
-            raw_json = response.json()
+            raw_json = json_loads(response.content)
         except ValueError as e:
             raise HttpError(response.status_code, f"invalid json: {e}")
 
-        # 解析外层通用结构
+        # 解析外层通用结构（dict 模型走免校验快速路径，其它模型复用缓存的校验器）
         try:
-            api_resp = ApiResponse[response_model].model_validate(raw_json)
+            code, message, data = parse_envelope(raw_json, response_model)
         except Exception as e:
             logger.error(f"ApiResponse parse failed: {raw_json}")
             raise ApiError(-1, f"response format error: {e}")
 
-        if api_resp.code != 200:
-            msg = api_resp.message or "unknown error"
+        if code != 200:
+            msg = message or "unknown error"
             # 二次登录缓存失效为正常分支，随后会走扫码
-            if path.rstrip("/").endswith("SecAutoAuth") and api_resp.code == -1019:
-                logger.debug(f"API [{api_resp.code}] {path}: {msg}")
+            if path.rstrip("/").endswith("SecAutoAuth") and code == -1019:
+                logger.debug(f"API [{code}] {path}: {msg}")
             else:
-                logger.error(f"API error [{api_resp.code}] {path}: {msg}")
-            raise ApiError(api_resp.code, msg)
+                logger.error(f"API error [{code}] {path}: {msg}")
+            raise ApiError(code, msg)
 
-        return api_resp.data  # 类型自动推断为 _T，完美！
+        return data  # 类型自动推断为 _T，完美！
 
     async def post_envelope(
         self,
@@ -97,7 +185,7 @@ class AsyncHTTPTransport:
         url = self._config.api_url(path)
 
         try:
-            response = await self._client.post(
+            response = await self._client_for(LANE_API).post(
                 url,
                 json=json,
                 headers=headers,
@@ -113,7 +201,7 @@ class AsyncHTTPTransport:
             raise HttpError(response.status_code, response.text[:500])
 
         try:
-            raw_json = response.json()
+            raw_json = json_loads(response.content)
         except ValueError as e:
             raise HttpError(response.status_code, f"invalid json: {e}")
 
@@ -11,7 +11,12 @@ import asyncio
 from lwapi import LwApiClient
 from lwapi.models.msg import SyncMessageResponse
 from src.plugins.bot_tasks import spawn_bot_task
-from src.runtime.client_registry import get_client, iter_online_clients, require_client
+from src.runtime.client_registry import (
+    get_client,
+    iter_online_clients,
+    require_client,
+    send_many_online,
+)
 
 # ---------------------------------------------------------------------------
 # 1. 消息驱动（最常见）
@@ -35,8 +40,19 @@ async def send_to_someone() -> None:
 
 
 async def broadcast_all_online() -> None:
-    for wxid, client in (await iter_online_clients()).items():
-        await client.msg.send_text_message(to_wxid="wxid_对方", content=f"来自 {wxid}")
+    # 单账号群发：限并发、限速，汇总 ok / failed / retryable；中断后用同一断点文件重跑即续发
+    client = await require_client("wxid_你的机器人")
+    result = await client.msg.send_many(
+        ["wxid_a", "wxid_b", "12345@chatroom"],
+        "通知内容",
+        concurrency=8,
+        checkpoint="config/broadcast_notice.ckpt",
+    )
+    print(result.summary())
+
+    # 跨账号：每个在线账号给同一接收者发一条
+    pairs = [(wxid, "wxid_对方") for wxid in await iter_online_clients()]
+    await send_many_online(pairs, lambda bot, to: f"来自 {bot}", per_account_rate=2)
 
 
 # ---------------------------------------------------------------------------
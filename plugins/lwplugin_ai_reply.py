@@ -7,16 +7,16 @@ AI 智能回复插件（默认对接 DeepSeek OpenAI 兼容接口）。
 
 from __future__ import annotations
 
-import re
-from typing import Any
+from typing import Any, Mapping, Sequence
 
 import httpx
 from loguru import logger
 
 from lwapi import LwApiClient
 from lwapi.models.msg import SyncMessageResponse
+from lwapi.models.msg_view import message_view
 from src.plugins.bot_tasks import spawn_bot_task
-from src.plugins.config import load_plugin_settings
+from src.plugins.config import plugin_settings
 
 PLUGIN_ID = "ai_reply"
 PLUGIN_TITLE = "AI 智能回复"
@@ -27,18 +27,16 @@ PLUGIN_VERSION = "1.0.0"
 PLUGIN_AUTHOR = "LWAPI"
 PLUGIN_ICON = "🤖"
 PLUGIN_SETTINGS_PANEL = "panels/ai_reply"
+# 只处理文本消息：其它类型的消息不会进入 handle
+PLUGIN_MSG_TYPES = (1,)
 
 _GROUP_CMD_PREFIX = "#"
-_ATUSERLIST_CDATA_RE = re.compile(
-    r"<atuserlist>\s*<!\[CDATA\[(?P<cdata>.*?)\]\]>\s*</atuserlist>",
-    re.IGNORECASE | re.DOTALL,
-)
 
 # 进程内多轮对话缓存：(bot_wxid, peer_wxid) -> messages
 _history: dict[tuple[str, str], list[dict[str, str]]] = {}
 
 
-def _cfg_bool(cfg: dict[str, Any], key: str, default: bool = True) -> bool:
+def _cfg_bool(cfg: Mapping[str, Any], key: str, default: bool = True) -> bool:
     val = cfg.get(key)
     if val is None:
         return default
@@ -49,32 +47,32 @@ def _cfg_bool(cfg: dict[str, Any], key: str, default: bool = True) -> bool:
     return bool(val)
 
 
-def _cfg_float(cfg: dict[str, Any], key: str, default: float) -> float:
+def _cfg_float(cfg: Mapping[str, Any], key: str, default: float) -> float:
     try:
         return float(cfg.get(key, default))
     except (TypeError, ValueError):
         return default
 
 
-def _cfg_int(cfg: dict[str, Any], key: str, default: int) -> int:
+def _cfg_int(cfg: Mapping[str, Any], key: str, default: int) -> int:
     try:
         return int(cfg.get(key, default))
     except (TypeError, ValueError):
         return default
 
 
-def _effective_api_key(cfg: dict[str, Any]) -> str:
+def _effective_api_key(cfg: Mapping[str, Any]) -> str:
     return (cfg.get("api_key") or "").strip()
 
 
-def _api_base(cfg: dict[str, Any]) -> str:
+def _api_base(cfg: Mapping[str, Any]) -> str:
     base = (cfg.get("base_url") or "https://api.deepseek.com").strip().rstrip("/")
     if base.endswith("/v1"):
         base = base[:-3]
     return base
 
 
-def _models_endpoint_candidates(cfg: dict[str, Any]) -> list[str]:
+def _models_endpoint_candidates(cfg: Mapping[str, Any]) -> list[str]:
     """OpenAI 兼容服务模型列表常见路径（优先 /v1/models）。"""
     base = _api_base(cfg)
     seen: set[str] = set()
@@ -87,7 +85,7 @@ def _models_endpoint_candidates(cfg: dict[str, Any]) -> list[str]:
     return out
 
 
-def _chat_endpoint(cfg: dict[str, Any]) -> str:
+def _chat_endpoint(cfg: Mapping[str, Any]) -> str:
     if _cfg_bool(cfg, "use_full_url", False):
         url = (cfg.get("chat_url") or "").strip().rstrip("/")
         if url:
@@ -99,28 +97,6 @@ def _chat_endpoint(cfg: dict[str, Any]) -> str:
     return base + path
 
 
-def _parse_atuserlist(msg_source: str | None) -> list[str]:
-    if not msg_source:
-        return []
-    m = _ATUSERLIST_CDATA_RE.search(msg_source)
-    if not m:
-        return []
-    inner = (m.group("cdata") or "").strip()
-    if not inner:
-        return []
-    return [p.strip() for p in inner.split(",") if p.strip()]
-
-
-def _parse_group_sender_and_body(raw: str) -> tuple[str | None, str]:
-    text = (raw or "").strip()
-    if not text:
-        return None, ""
-    m = re.match(r"^(?P<head>wxid_[^:\s]+)\s*:\s*(?P<body>.*)$", text, flags=re.DOTALL)
-    if m:
-        return m.group("head"), (m.group("body") or "").strip()
-    return None, text
-
-
 _DEFAULT_SYSTEM_PROMPT = "你是一个友善、简洁的中文助手。"
 
 
@@ -139,7 +115,7 @@ def _parse_pipe_list(raw: object) -> set[str]:
     return out
 
 
-def _allow_list_pass(cfg: dict[str, Any], key: str, peer_id: str) -> bool:
+def _allow_list_pass(cfg: Mapping[str, Any], key: str, peer_id: str) -> bool:
     """白名单字段为空则全部允许，否则 peer_id 须在列表中。"""
     allow = _parse_pipe_list(cfg.get(key))
     if not allow:
@@ -147,15 +123,15 @@ def _allow_list_pass(cfg: dict[str, Any], key: str, peer_id: str) -> bool:
     return peer_id.strip() in allow
 
 
-def _private_peer_allowed(cfg: dict[str, Any], peer_wxid: str) -> bool:
+def _private_peer_allowed(cfg: Mapping[str, Any], peer_wxid: str) -> bool:
     return _allow_list_pass(cfg, "private_allow_wxids", peer_wxid)
 
 
-def _group_chat_allowed(cfg: dict[str, Any], chatroom_id: str) -> bool:
+def _group_chat_allowed(cfg: Mapping[str, Any], chatroom_id: str) -> bool:
     return _allow_list_pass(cfg, "group_allow_wxids", chatroom_id)
 
 
-def _system_prompt_for(cfg: dict[str, Any], *, is_group: bool) -> str:
+def _system_prompt_for(cfg: Mapping[str, Any], *, is_group: bool) -> str:
     if is_group:
         specific = (cfg.get("system_prompt_group") or "").strip()
     else:
@@ -179,12 +155,12 @@ def _strip_bot_mention(body: str, bot_wxid: str) -> str:
 
 def _should_reply(
     *,
-    cfg: dict[str, Any],
+    cfg: Mapping[str, Any],
     bot_wxid: str,
     from_id: str,
     body: str,
     is_group: bool,
-    at_list: list[str],
+    at_list: Sequence[str],
 ) -> tuple[bool, str]:
     """判断是否触发 AI，并返回用于模型的用户文本。"""
     if not _cfg_bool(cfg, "enabled", True):
@@ -255,7 +231,7 @@ def clear_chat_history(*, bot_wxid: str | None = None) -> int:
 
 
 async def chat_completion(
-    cfg: dict[str, Any],
+    cfg: Mapping[str, Any],
     user_text: str,
     *,
     bot_wxid: str,
@@ -317,13 +293,13 @@ async def chat_completion(
     return content
 
 
-async def clear_context(cfg: dict[str, Any]) -> dict[str, Any]:
+async def clear_context(cfg: Mapping[str, Any]) -> dict[str, Any]:
     """运维台「清空对话上下文」：清空本进程内全部多轮缓存。"""
     n = clear_chat_history()
     return {"ok": True, "cleared_sessions": n, "message": f"已清空 {n} 个联系人的对话上下文"}
 
 
-async def test_settings(cfg: dict[str, Any]) -> dict[str, Any]:
+async def test_settings(cfg: Mapping[str, Any]) -> dict[str, Any]:
     reply = await chat_completion(
         cfg,
         "请只回复：连接成功",
@@ -355,7 +331,7 @@ def _merge_model_ids(*sources: object) -> list[str]:
     return out
 
 
-async def list_models(cfg: dict[str, Any]) -> dict[str, Any]:
+async def list_models(cfg: Mapping[str, Any]) -> dict[str, Any]:
     """GET /v1/models 或 /models（DeepSeek 等 OpenAI 兼容接口）。"""
     api_key = _effective_api_key(cfg)
     if not api_key:
@@ -413,7 +389,7 @@ async def _reply_task(
     peer_for_history: str,
     is_group: bool,
 ) -> None:
-    cfg = load_plugin_settings(PLUGIN_ID)
+    cfg = plugin_settings(PLUGIN_ID)
     bot_wxid = (client.wxid or "").strip()
     try:
         reply = await chat_completion(
@@ -438,7 +414,7 @@ async def _reply_task(
 
 
 async def handle(client: LwApiClient, resp: SyncMessageResponse) -> bool | None:
-    cfg = load_plugin_settings(PLUGIN_ID)
+    cfg = plugin_settings(PLUGIN_ID)
     if not _effective_api_key(cfg):
         return None
     if not _cfg_bool(cfg, "enabled", True):
@@ -446,30 +422,21 @@ async def handle(client: LwApiClient, resp: SyncMessageResponse) -> bool | None:
 
     bot_wxid = (client.wxid or "").strip()
     for msg in resp.addMsgs or []:
-        if msg.msgType != 1:
-            continue
-        sender = (msg.fromUserName.string or "").strip()
-        if sender == bot_wxid:
+        # 群聊发言人、正文与 @ 列表由框架统一解析并缓存（各插件共用）
+        view = message_view(msg)
+        from_id = view.from_id
+        if from_id == bot_wxid:
             continue
-
-        raw_content = (msg.content.string or "").strip()
-        from_id = sender
-        is_group = from_id.endswith("chatroom")
-        at_list: list[str] = []
-        speaker: str | None = None
-        body = raw_content
-
-        if is_group:
-            speaker, body = _parse_group_sender_and_body(raw_content)
-            at_list = _parse_atuserlist(msg.msgSource)
+        is_group = view.is_group
+        speaker = view.speaker
 
         ok, user_text = _should_reply(
             cfg=cfg,
             bot_wxid=bot_wxid,
             from_id=from_id,
-            body=body,
+            body=view.body,
             is_group=is_group,
-            at_list=at_list,
+            at_list=view.at_list,
         )
         if not ok:
             continue
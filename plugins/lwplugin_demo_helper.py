@@ -6,7 +6,6 @@
 
 from __future__ import annotations
 
-import re
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -14,6 +13,7 @@ from loguru import logger
 
 from lwapi import LwApiClient
 from lwapi.models.msg import AddMsg, SyncMessageResponse
+from lwapi.models.msg_view import NOTIFY_ALL, message_view
 
 PLUGIN_ID = "demo_helper"
 PLUGIN_TITLE = "Demo-自动回复"
@@ -23,14 +23,11 @@ PLUGIN_DESCRIPTION = (
 PLUGIN_VERSION = "1.0.0"
 PLUGIN_AUTHOR = "LWAPI"
 PLUGIN_ICON = "💬"
+# 只处理文本消息：其它类型的消息不会进入 handle
+PLUGIN_MSG_TYPES = (1,)
 
 _TZ = ZoneInfo("Asia/Shanghai")
 _GROUP_CMD_PREFIX = "#"
-_NOTIFY_ALL = "notify@all"
-_ATUSERLIST_CDATA_RE = re.compile(
-    r"<atuserlist>\s*<!\[CDATA\[(?P<cdata>.*?)\]\]>\s*</atuserlist>",
-    re.IGNORECASE | re.DOTALL,
-)
 
 
 def _safe_str(s: object | None, *, max_len: int = 120) -> str:
@@ -42,18 +39,6 @@ def _safe_str(s: object | None, *, max_len: int = 120) -> str:
     return text
 
 
-def _parse_atuserlist(msg_source: str | None) -> list[str]:
-    if not msg_source:
-        return []
-    m = _ATUSERLIST_CDATA_RE.search(msg_source)
-    if not m:
-        return []
-    inner = (m.group("cdata") or "").strip()
-    if not inner:
-        return []
-    return [p.strip() for p in inner.split(",") if p.strip()]
-
-
 def _ascii_suffix_cmd_ok(before_lower: str, needle_lower: str) -> bool:
     if not before_lower.endswith(needle_lower):
         return False
@@ -89,16 +74,6 @@ def _find_trailing_command(body: str) -> str | None:
     return None
 
 
-def _parse_group_sender_and_body(raw: str) -> tuple[str | None, str]:
-    text = (raw or "").strip()
-    if not text:
-        return None, ""
-    m = re.match(r"^(?P<head>wxid_[^:\s]+)\s*:\s*(?P<body>.*)$", text, flags=re.DOTALL)
-    if m:
-        return m.group("head"), (m.group("body") or "").strip()
-    return None, text
-
-
 def _is_self_message(client_wxid: str, msg: AddMsg) -> bool:
     sender = (msg.fromUserName.string or "").strip()
     return bool(sender and sender == client_wxid)
@@ -110,7 +85,7 @@ def _debug_log_addmsg(wxid: str, msg: AddMsg) -> None:
     ct = msg.content.string
     src = msg.msgSource
     src_preview = _safe_str(src, max_len=160) if src else ""
-    at_users = _parse_atuserlist(src)
+    at_users = list(message_view(msg).at_list)
     logger.debug(
         "[{pid}] wxid={wxid} ← msgId={mid} fromUserName={fu} toUserName={tu} "
         "msgType={mt} content={ct!r} status={st} imgStatus={ist} "
@@ -155,24 +130,21 @@ def _build_help_text(*, is_group: bool) -> str:
 async def handle(client: LwApiClient, resp: SyncMessageResponse) -> bool | None:
     wxid = client.wxid
     for msg in resp.addMsgs or []:
-        if msg.msgType != 1:
-            continue
         if _is_self_message(wxid, msg):
             continue
         _debug_log_addmsg(wxid, msg)
-        raw_content = (msg.content.string or "").strip()
-        from_id = (msg.fromUserName.string or "").strip()
-        is_group = from_id.endswith("chatroom")
-        at_list: list[str] = []
-        speaker, body = _parse_group_sender_and_body(raw_content) if is_group else (None, raw_content)
+        # 群聊发言人、正文与 @ 列表由框架统一解析并缓存（各插件共用）
+        view = message_view(msg)
+        from_id = view.from_id
+        is_group = view.is_group
+        speaker, body = view.speaker, view.body
         if is_group:
-            at_list = _parse_atuserlist(msg.msgSource)
-            hash_ok = body.strip().startswith(_GROUP_CMD_PREFIX)
-            at_bot_ok = wxid in at_list
+            hash_ok = body.startswith(_GROUP_CMD_PREFIX)
+            at_bot_ok = view.is_at(wxid)
             if not hash_ok and not at_bot_ok:
                 continue
             if hash_ok:
-                user_cmd = body.strip()[len(_GROUP_CMD_PREFIX) :].strip().lower()
+                user_cmd = body[len(_GROUP_CMD_PREFIX) :].strip().lower()
             else:
                 user_cmd = _find_trailing_command(body)
                 if user_cmd is None:
@@ -191,8 +163,8 @@ async def handle(client: LwApiClient, resp: SyncMessageResponse) -> bool | None:
         target = from_id
         at_user: str | None = None
         if is_group:
-            if any(x == _NOTIFY_ALL for x in at_list):
-                at_user = _NOTIFY_ALL
+            if view.at_all:
+                at_user = NOTIFY_ALL
             elif speaker:
                 at_user = speaker
         await client.msg.send_text_message(to_wxid=target, content=reply, at=at_user)
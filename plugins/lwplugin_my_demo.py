@@ -23,6 +23,8 @@ PLUGIN_DESCRIPTION = (
 PLUGIN_VERSION = "1.0.0"
 PLUGIN_AUTHOR = "LWAPI"
 PLUGIN_ICON = "⚡"
+# handle 只打印日志、从不返回 False，可与相邻的并行插件同时执行
+PLUGIN_PARALLEL = True
 
 # ---------------------------------------------------------------------------
 # 配置区（按需填写，留空 "" 则跳过对应 demo）
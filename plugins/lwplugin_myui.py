@@ -10,7 +10,8 @@ from loguru import logger
 
 from lwapi import LwApiClient
 from lwapi.models.msg import SyncMessageResponse
-from src.plugins.config import load_plugin_settings
+from lwapi.models.msg_view import message_view
+from src.plugins.config import plugin_settings
 
 PLUGIN_ID = "myui"
 PLUGIN_TITLE = "示例：自定义设置页"
@@ -22,11 +23,17 @@ PLUGIN_ICON = "🎛️"
 # 相对 plugins 目录；须含 index.html
 PLUGIN_SETTINGS_PANEL = "panels/myui"
 
+# 只处理私聊文本消息（框架按路由索引过滤，handle 中无需再判断）
+PLUGIN_MSG_TYPES = (1,)
+PLUGIN_SCOPE = "private"
+# 从不中断插件链，可与相邻的并行插件同时执行
+PLUGIN_PARALLEL = True
+
 _DEFAULT_GREETING = "你好，这是 MyUI 插件！"
 
 
 def _greeting() -> str:
-    cfg = load_plugin_settings(PLUGIN_ID)
+    cfg = plugin_settings(PLUGIN_ID)
     text = (cfg.get("greeting") or "").strip()
     return text or _DEFAULT_GREETING
 
@@ -34,13 +41,11 @@ def _greeting() -> str:
 async def handle(client: LwApiClient, resp: SyncMessageResponse) -> None:
     wxid = (client.wxid or "").strip()
     for msg in resp.addMsgs or []:
-        if msg.msgType != 1:
-            continue
-        sender = (msg.fromUserName.string or "").strip()
+        view = message_view(msg)
+        sender = view.from_id
         if sender == wxid:
             continue
-        content = (msg.content.string or "").strip()
-        if content.lower() != "myui":
+        if view.content.lower() != "myui":
             continue
         reply = _greeting()
         await client.msg.send_text_message(to_wxid=sender, content=reply)
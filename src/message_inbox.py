@@ -18,6 +18,8 @@ from lwapi.models.msg import AddMsg, SyncMessageResponse
 
 DB_PATH = Path("config/messages.sqlite")
 _lock = threading.Lock()
+# 入库吞吐统计（行数、批次数与累计写入耗时），供回放压测与排障使用
+_write_stats = {"rows": 0, "batches": 0, "seconds": 0.0}
 
 _MSG_TYPE_LABELS: dict[int, str] = {
     1: "文本",
@@ -55,6 +57,11 @@ def _peer_wxid(bot: str, from_u: str, to_u: str) -> str:
     return from_u
 
 
+def peer_wxid_for(bot_wxid: str, msg: AddMsg) -> str:
+    """消息所属会话：群聊为群 id，私聊为对方 wxid（与入库 peer_wxid 一致）。"""
+    return _peer_wxid(bot_wxid, _sk_string(msg.fromUserName), _sk_string(msg.toUserName))
+
+
 def _init_conn(conn: sqlite3.Connection) -> None:
     conn.executescript(
         """
@@ -114,6 +121,7 @@ def _insert_rows_sync(rows: List[tuple]) -> None:
     if not rows:
         return
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
     with _lock:
         conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
         try:
@@ -131,6 +139,14 @@ def _insert_rows_sync(rows: List[tuple]) -> None:
             conn.commit()
         finally:
             conn.close()
+        _write_stats["rows"] += len(rows)
+        _write_stats["batches"] += 1
+        _write_stats["seconds"] += time.perf_counter() - started
+
+
+def inbox_write_stats() -> dict[str, Any]:
+    """累计入库行数、批次数与写入耗时（秒）的快照。"""
+    return dict(_write_stats)
 
 
 async def append_sync_messages(client: LwApiClient, resp: SyncMessageResponse) -> None:
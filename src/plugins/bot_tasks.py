@@ -18,6 +18,8 @@ from typing import Awaitable, Set
 
 from loguru import logger
 
+from lwapi import measure_send_wait
+
 _tasks_by_wxid: dict[str, Set[asyncio.Task[None]]] = defaultdict(set)
 
 
@@ -38,7 +40,9 @@ def spawn_bot_task(
 
     async def _runner() -> None:
         try:
-            await coro
+            # 后台任务与插件 handle 无关：其中等待发送回执的时间不应顺延 handle 的时限
+            with measure_send_wait(None):
+                await coro
         except asyncio.CancelledError:
             raise
         except Exception:
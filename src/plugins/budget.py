@@ -0,0 +1,125 @@
+"""
+插件 handle 的执行时限与慢插件隔离。
+
+- 每次 handle 调用有时限：插件模块的 PLUGIN_TIMEOUT（秒），未声明时取环境变量
+  LWAPI_PLUGIN_TIMEOUT_SEC（默认 30）；0 表示不限。超时的调用被取消，插件链继续执行后续插件。
+- 同一账号上某插件连续超时 LWAPI_PLUGIN_QUARANTINE_AFTER 次（默认 3）后，该插件在此账号上
+  被隔离 LWAPI_PLUGIN_QUARANTINE_SEC 秒（默认 300）：期间插件链跳过它，冷却结束后自动恢复。
+  任意一次按时完成即清零连续超时计数。
+- 在 handle 内 await 发送队列（lwapi.outbox）回执的时间不计入时限：同一接收者的消息按间隔
+  排队，连发多条时等待可能远超时限，但这不是插件慢，不应因此被取消或隔离。
+
+状态只在进程内存中，重启即清空；隔离情况经 /api/plugins/stats 的 quarantine 字段展示。
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.plugins.types import PluginSpec
+
+_DEFAULT_TIMEOUT = 30.0
+_DEFAULT_QUARANTINE_AFTER = 3
+_DEFAULT_QUARANTINE_SEC = 300.0
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def timeout_for(spec: PluginSpec) -> Optional[float]:
+    """该插件单次 handle 的时限（秒）；None 表示不限。"""
+    value = spec.timeout if spec.timeout is not None else _env_float("LWAPI_PLUGIN_TIMEOUT_SEC", _DEFAULT_TIMEOUT)
+    return value if value > 0 else None
+
+
+class _BudgetState:
+    __slots__ = ("overruns", "total_overruns", "quarantines", "until", "since")
+
+    def __init__(self) -> None:
+        self.overruns = 0  # 连续超时次数
+        self.total_overruns = 0
+        self.quarantines = 0
+        self.until = 0.0  # 隔离结束时刻（monotonic）；0 表示未隔离
+        self.since = 0.0  # 本次隔离开始时间（wall clock，供展示）
+
+
+# (账号 wxid, 插件 id) -> 状态
+_states: Dict[Tuple[str, str], _BudgetState] = {}
+
+
+def is_quarantined(wxid: str, plugin_id: str) -> bool:
+    """该插件当前是否在此账号上被隔离；冷却结束时顺带解除。"""
+    state = _states.get((wxid, plugin_id))
+    if state is None or not state.until:
+        return False
+    if time.monotonic() < state.until:
+        return True
+    state.until = 0.0
+    state.overruns = 0
+    logger.info(f"插件 [{plugin_id}] 隔离冷却结束，已在账号 {wxid} 上恢复")
+    return False
+
+
+def record_overrun(wxid: str, plugin_id: str, timeout: float) -> None:
+    """记录一次超时；连续超时达到阈值时隔离该插件。"""
+    state = _states.get((wxid, plugin_id))
+    if state is None:
+        state = _states[(wxid, plugin_id)] = _BudgetState()
+    state.overruns += 1
+    state.total_overruns += 1
+    limit = _env_int("LWAPI_PLUGIN_QUARANTINE_AFTER", _DEFAULT_QUARANTINE_AFTER)
+    if state.overruns < limit:
+        logger.warning(
+            f"插件 [{plugin_id}] 处理超时（{timeout:g}s），已取消并继续后续插件 "
+            f"(wxid={wxid}，连续 {state.overruns}/{limit})"
+        )
+        return
+    cool_down = _env_float("LWAPI_PLUGIN_QUARANTINE_SEC", _DEFAULT_QUARANTINE_SEC)
+    state.until = time.monotonic() + max(cool_down, 1.0)
+    state.since = time.time()
+    state.quarantines += 1
+    logger.error(
+        f"插件 [{plugin_id}] 在账号 {wxid} 上连续 {state.overruns} 次超时，"
+        f"隔离 {cool_down:g}s，期间不再处理该账号的消息"
+    )
+
+
+def record_in_time(wxid: str, plugin_id: str) -> None:
+    """按时完成：清零连续超时计数。"""
+    state = _states.get((wxid, plugin_id))
+    if state is not None:
+        state.overruns = 0
+
+
+def quarantined_plugins() -> List[Dict[str, Any]]:
+    """当前处于隔离中的 (账号, 插件) 列表。"""
+    now = time.monotonic()
+    out: List[Dict[str, Any]] = []
+    for (wxid, plugin_id), state in sorted(_states.items()):
+        if state.until and now < state.until:
+            out.append(
+                {
+                    "wxid": wxid,
+                    "plugin_id": plugin_id,
+                    "since": state.since,
+                    "remaining_sec": round(state.until - now, 1),
+                    "quarantines": state.quarantines,
+                    "total_overruns": state.total_overruns,
+                }
+            )
+    return out
@@ -1,43 +1,192 @@
 """
 消息插件链的入口：按 config/plugins.json 中 enabled 顺序依次调用各插件的 handle。
 
+启用列表与路由索引取自内存中的配置快照（src.plugins.snapshot），收消息时不读配置文件。
+
 LwApi 在收到一批同步消息后回调此处；每个插件应自行 try/except 或依赖本模块
 统一捕获并打日志，避免单个插件异常中断后续插件。若 handle 返回 False，则不再调用后续插件。
+handle 超过时限会被取消，反复超时的插件在该账号上暂时隔离（见 src.plugins.budget）。
+
+一批消息先整体入库，再按会话拆分交给 dispatcher：同一会话内按顺序执行插件链，
+不同会话之间并发（见 src.plugins.dispatcher）。
 """
 
 from __future__ import annotations
 
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple, Union
+
 from loguru import logger
 
-from lwapi import LwApiClient
+from lwapi import LwApiClient, SendWaitMeter, measure_send_wait, send_priority
 from lwapi.models.msg import SyncMessageResponse
 
 from src.message_inbox import append_sync_messages
-from src.plugins.registry import resolve_handlers
-from src.plugins.settings import load_enabled_ids
+from src.plugins.budget import is_quarantined, record_in_time, record_overrun, timeout_for
+from src.plugins.dispatcher import dispatch_by_conversation
+from src.plugins.registry import PluginRoutes, plugin_routes
+from src.plugins.snapshot import current_plugin_snapshot
+from src.plugins.stats import record_handle, record_skip
+from src.plugins.types import PluginSpec
+
+
+# 插件执行观察者：(插件 id, 耗时秒, 异常或 None)；回放压测等场景用于统计各插件耗时
+PluginObserver = Callable[[str, float, Optional[BaseException]], None]
+_observers: List[PluginObserver] = []
+
+
+def add_plugin_observer(observer: PluginObserver) -> None:
+    _observers.append(observer)
+
+
+def remove_plugin_observer(observer: PluginObserver) -> None:
+    try:
+        _observers.remove(observer)
+    except ValueError:
+        pass
+
+
+def _notify(plugin_id: str, elapsed: float, error: Optional[BaseException]) -> None:
+    for observer in _observers:
+        try:
+            observer(plugin_id, elapsed, error)
+        except Exception:
+            logger.exception("插件观察者异常")
+
+
+async def _await_within(coro: Awaitable[Any], timeout: float) -> Tuple[Any, bool]:
+    """
+    在时限内等待 coro，返回 (结果, 是否超时)；超时则取消并等它结束。
+
+    以任务在时限到达时是否完成判定超时，不比较耗时（Windows 上时钟粒度约 15.6ms，
+    「耗时 >= 时限」不可靠），插件内部自己抛出的 TimeoutError 也不会被当成超时。
+    在发送队列中 await 回执的时间不计入时限：插件慢在排队而不是自身时，截止时间相应顺延。
+    """
+    meter = SendWaitMeter()
+    with measure_send_wait(meter):
+        task = asyncio.ensure_future(coro)
+    started = time.monotonic()
+    try:
+        while True:
+            remaining = started + timeout + meter.elapsed() - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait({task}, timeout=remaining)
+            if done:
+                return task.result(), False
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    task.cancel()
+    await asyncio.wait({task})
+    if not task.cancelled():
+        # 插件在取消时自行抛出的异常：已按超时处理，这里仅取出避免告警
+        task.exception()
+    return None, True
+
+
+async def _run_one(client: LwApiClient, wxid: str, spec: PluginSpec, sub: SyncMessageResponse) -> bool:
+    """执行单个插件的 handle（时限、隔离、统计、异常日志），返回是否要求中断插件链。"""
+    if is_quarantined(wxid, spec.id):
+        record_skip(spec.id)
+        return False
+    n_msgs = len(sub.addMsgs or ())
+    timeout = timeout_for(spec)
+    timed_out = False
+    started = time.perf_counter()
+    try:
+        if timeout is None:
+            stop = await spec.handle(client, sub)
+        else:
+            stop, timed_out = await _await_within(spec.handle(client, sub), timeout)
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        record_handle(spec.id, elapsed, n_msgs, e)
+        if _observers:
+            _notify(spec.id, elapsed, e)
+        logger.exception(f"插件 [{spec.id}] 处理消息时异常")
+        return False
+    elapsed = time.perf_counter() - started
+    if timeout is not None and timed_out:
+        error = asyncio.TimeoutError()
+        record_handle(spec.id, elapsed, n_msgs, error, timed_out=True)
+        if _observers:
+            _notify(spec.id, elapsed, error)
+        record_overrun(wxid, spec.id, timeout)
+        return False
+    record_handle(spec.id, elapsed, n_msgs, stopped=stop is False)
+    if timeout is not None:
+        record_in_time(wxid, spec.id)
+    if _observers:
+        _notify(spec.id, elapsed, None)
+    if stop is False:
+        logger.debug(f"插件 [{spec.id}] handle 返回 False，跳过后续插件")
+        return True
+    return False
+
+
+async def _run_group(
+    client: LwApiClient, wxid: str, group: List[Tuple[PluginSpec, SyncMessageResponse]]
+) -> bool:
+    """同时执行一组相邻的并行插件；任一返回 False 时，整组结束后中断插件链。"""
+    if len(group) == 1:
+        return await _run_one(client, wxid, *group[0])
+    results = await asyncio.gather(*(_run_one(client, wxid, spec, sub) for spec, sub in group))
+    return any(results)
+
+
+async def run_plugin_chain(
+    specs: Union[Sequence[PluginSpec], PluginRoutes], client: LwApiClient, resp: SyncMessageResponse
+) -> None:
+    """
+    对一批（通常为单个会话的）消息按顺序执行插件链。
+
+    经路由索引跳过声明了 PLUGIN_MSG_TYPES 等过滤条件、但本批没有匹配消息的插件；
+    specs 可直接传入预先编译好的 PluginRoutes。相邻的 PLUGIN_PARALLEL 插件同时执行，
+    总耗时约为其中最慢者而非各自之和。
+    """
+    routes = specs if isinstance(specs, PluginRoutes) else plugin_routes(list(specs))
+    wxid = (client.wxid or "").strip()
+    group: List[Tuple[PluginSpec, SyncMessageResponse]] = []
+    for spec, sub in routes.route(resp):
+        if spec.parallel:
+            group.append((spec, sub))
+            continue
+        if group:
+            if await _run_group(client, wxid, group):
+                return
+            group = []
+        if await _run_one(client, wxid, spec, sub):
+            return
+    if group:
+        await _run_group(client, wxid, group)
 
 
 async def composite_message_handler(
     client: LwApiClient, resp: SyncMessageResponse
-) -> None:
-    """根据 config/plugins.json 的 enabled 顺序依次执行各插件。"""
+) -> Optional["asyncio.Future[None]"]:
+    """
+    根据 config/plugins.json 的 enabled 顺序依次执行各插件。
+
+    插件链在会话通道中异步执行；返回的 Future 在整批处理结束后完成（同步断点据此推进），
+    未启用插件时返回 None。
+    """
     if resp.addMsgs:
         try:
             await append_sync_messages(client, resp)
         except Exception:
             logger.exception("消息入库（聚合用）失败")
 
-    enabled = load_enabled_ids()
-    specs = resolve_handlers(enabled)
-    if not specs:
+    # 整批消息使用同一份快照；处理期间配置被替换不影响本批
+    routes = current_plugin_snapshot().routes
+    if not routes.specs:
         logger.warning("未启用任何消息插件，请在运维台「插件管理」中勾选")
-        return
-    for spec in specs:
-        try:
-            stop = await spec.handle(client, resp)
-        except Exception:
-            logger.exception(f"插件 [{spec.id}] 处理消息时异常")
-            continue
-        if stop is False:
-            logger.debug(f"插件 [{spec.id}] handle 返回 False，跳过后续插件")
-            break
+        return None
+
+    async def _job(sub: SyncMessageResponse) -> None:
+        # 插件对收到消息的回复走发送队列的交互优先级（群发可自行包一层 send_priority("bulk")）
+        with send_priority("interactive"):
+            await run_plugin_chain(routes, client, sub)
+
+    return await dispatch_by_conversation((client.wxid or "").strip(), resp, _job)
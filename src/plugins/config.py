@@ -1,65 +1,36 @@
 """
 各插件业务配置的读写与缓存（存于 config/plugins.json 的 settings 段）。
 
-与 enabled 列表共用同一文件；mtime 变化后自动失效缓存，保存后无需重启进程。
+与 enabled 列表共用同一文件；保存后无需重启进程。消息处理中请用 :func:`plugin_settings`
+读取内存快照中的只读配置（不读盘、不复制）；:func:`load_plugin_settings` 返回可修改的副本。
 """
 
 from __future__ import annotations
 
-import json
 from copy import deepcopy
-from pathlib import Path
-from typing import Any, Dict
-
-from src.plugins.settings import PLUGIN_CONFIG, _ensure_file, invalidate_plugin_settings_cache
-from src.utils import atomic_write_json, logger
-
-_config_mtime: float | None = None
-_cached_raw: Dict[str, Any] | None = None
-
-
-def invalidate_plugin_config_cache() -> None:
-    global _config_mtime, _cached_raw
-    _config_mtime = None
-    _cached_raw = None
-
-
-def _load_raw() -> Dict[str, Any]:
-    global _config_mtime, _cached_raw
-    _ensure_file()
-    try:
-        m = PLUGIN_CONFIG.stat().st_mtime
-    except OSError:
-        return {}
-    if _cached_raw is not None and _config_mtime == m:
-        return deepcopy(_cached_raw)
-    try:
-        raw = json.loads(PLUGIN_CONFIG.read_text(encoding="utf-8"))
-        data = raw if isinstance(raw, dict) else {}
-    except (json.JSONDecodeError, OSError) as e:
-        logger.warning(f"读取 {PLUGIN_CONFIG} 失败: {e}")
-        data = {}
-    _config_mtime = m
-    _cached_raw = data
-    return deepcopy(data)
+from typing import Any, Dict, Mapping
+
+from src.plugins.settings import PLUGIN_CONFIG, _read_config_dict, invalidate_plugin_settings_cache
+from src.utils import atomic_write_json
 
 
 def _save_raw(data: Dict[str, Any]) -> None:
     atomic_write_json(PLUGIN_CONFIG, data)
     invalidate_plugin_settings_cache()
-    invalidate_plugin_config_cache()
+
+
+def plugin_settings(plugin_id: str) -> Mapping[str, Any]:
+    """某插件配置的只读视图（取自内存快照，嵌套 dict / list 为只读类型）；热路径请用此函数。"""
+    from src.plugins.snapshot import current_plugin_snapshot
+
+    return current_plugin_snapshot().settings_for(plugin_id)
 
 
 def load_plugin_settings(plugin_id: str) -> Dict[str, Any]:
-    """返回某插件的配置副本。"""
-    raw = _load_raw()
-    settings = raw.get("settings")
-    if not isinstance(settings, dict):
-        return {}
-    block = settings.get(plugin_id)
-    if not isinstance(block, dict):
-        return {}
-    return deepcopy(block)
+    """返回某插件配置的可修改副本。"""
+    from src.plugins.snapshot import thaw
+
+    return thaw(plugin_settings(plugin_id))
 
 
 _SECRET_FIELD_NAMES = frozenset({"api_key", "secret_key", "access_token"})
@@ -103,8 +74,8 @@ def prepare_settings_patch(patch: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def save_plugin_settings(plugin_id: str, patch: Dict[str, Any]) -> Dict[str, Any]:
-    """合并写入插件配置，返回合并后的完整配置。"""
-    raw = _load_raw()
+    """合并写入插件配置（以磁盘上的最新内容为准），返回合并后的完整配置。"""
+    raw = _read_config_dict()
     settings = raw.get("settings")
     if not isinstance(settings, dict):
         settings = {}
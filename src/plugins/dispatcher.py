@@ -0,0 +1,222 @@
+"""
+按会话并行的插件链调度：同一会话（私聊对方 / 群）内严格按到达顺序处理，
+不同会话之间并发执行，总并发受上限约束。
+
+一批同步消息按 peer（与 message_inbox 入库的 peer_wxid 同一规则）拆成若干子批，
+每个会话一条 FIFO 通道；繁忙群聊不会再拖慢同一账号下其它私聊的回复。
+
+环境变量：
+- LWAPI_PLUGIN_CONCURRENCY：单账号同时执行插件链的会话数上限（默认 8）
+- LWAPI_PLUGIN_MAX_PENDING：单账号积压子批上限，超过后上游等待（默认 1000）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from lwapi.models.msg import AddMsg, SyncMessageResponse
+
+from src.message_inbox import peer_wxid_for
+
+ConversationJob = Callable[[SyncMessageResponse], Awaitable[None]]
+# 子批结束时的回调：参数 True 表示已处理（插件异常也算），False 表示被取消、不会再处理
+JobDoneCallback = Callable[[bool], None]
+LaneItem = Tuple[ConversationJob, SyncMessageResponse, Optional[JobDoneCallback]]
+
+_DEFAULT_CONCURRENCY = 8
+_DEFAULT_MAX_PENDING = 1000
+
+
+def _env_int(name: str, default: int, minimum: int) -> int:
+    try:
+        v = int(os.getenv(name, str(default)))
+    except ValueError:
+        v = default
+    return max(minimum, v)
+
+
+def split_by_conversation(
+    bot_wxid: str, resp: SyncMessageResponse
+) -> List[Tuple[str, SyncMessageResponse]]:
+    """
+    按会话拆分 addMsgs，保持各会话内原有顺序；会话顺序按首次出现。
+
+    联系人变更等其它字段只随第一个子批下发，避免插件重复处理。
+    """
+    groups: Dict[str, List[AddMsg]] = {}
+    for msg in resp.addMsgs or []:
+        groups.setdefault(peer_wxid_for(bot_wxid, msg), []).append(msg)
+    if len(groups) <= 1:
+        peer = next(iter(groups), "")
+        return [(peer, resp)]
+    out: List[Tuple[str, SyncMessageResponse]] = []
+    for i, (peer, msgs) in enumerate(groups.items()):
+        if i == 0:
+            sub = resp.model_copy(update={"addMsgs": msgs})
+        else:
+            # 与原批同类型（pydantic 模型或 lwapi.models.msg_compact 紧凑结构）
+            sub = type(resp)(addMsgs=msgs)
+        out.append((peer, sub))
+    return out
+
+
+class ConversationDispatcher:
+    """单账号的会话通道集合：每会话一个顺序 worker，共享并发信号量。"""
+
+    def __init__(self, bot_wxid: str, *, max_concurrency: int, max_pending: int) -> None:
+        self.bot_wxid = bot_wxid
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max(1, max_pending)
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._lanes: Dict[str, Deque[LaneItem]] = {}
+        self._workers: Dict[str, asyncio.Task[None]] = {}
+        self._pending = 0
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def pending(self) -> int:
+        """已提交但尚未处理完的子批数。"""
+        return self._pending
+
+    async def submit(
+        self,
+        peer: str,
+        job: ConversationJob,
+        resp: SyncMessageResponse,
+        on_done: Optional[JobDoneCallback] = None,
+    ) -> None:
+        """
+        把子批加入该会话通道；积压达上限时等待，向上游施加背压。
+
+        on_done 在该子批处理结束后以 True 调用（插件异常也算结束）；执行中被取消或
+        随 aclose 丢弃时以 False 调用。
+        """
+        while self._pending >= self.max_pending:
+            self._has_room.clear()
+            await self._has_room.wait()
+        self._pending += 1
+        self._idle.clear()
+        self._lanes.setdefault(peer, deque()).append((job, resp, on_done))
+        if peer not in self._workers:
+            self._workers[peer] = asyncio.create_task(
+                self._run_lane(peer),
+                name=f"conv:{self.bot_wxid}:{peer}",
+            )
+
+    async def _run_lane(self, peer: str) -> None:
+        lane = self._lanes[peer]
+        try:
+            while lane:
+                job, resp, on_done = lane.popleft()
+                try:
+                    async with self._sem:
+                        await job(resp)
+                except asyncio.CancelledError:
+                    if on_done is not None:
+                        on_done(False)
+                    raise
+                except Exception:
+                    logger.exception(f"会话 {peer} 插件链执行异常 (wxid={self.bot_wxid})")
+                finally:
+                    self._done_one()
+                if on_done is not None:
+                    on_done(True)
+        finally:
+            self._workers.pop(peer, None)
+            if not lane:
+                self._lanes.pop(peer, None)
+
+    def _done_one(self) -> None:
+        self._pending -= 1
+        if self._pending < self.max_pending:
+            self._has_room.set()
+        if self._pending == 0:
+            self._idle.set()
+
+    async def drain(self) -> None:
+        """等待所有已提交子批处理完成（回放、测试或优雅退出时使用）。"""
+        await self._idle.wait()
+
+    async def aclose(self) -> None:
+        """取消全部会话 worker 并丢弃积压。"""
+        workers = list(self._workers.values())
+        for t in workers:
+            t.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        # 尚未开始执行的子批：通知提交方不会再处理
+        for lane in self._lanes.values():
+            for _job, _resp, on_done in lane:
+                if on_done is not None:
+                    on_done(False)
+        self._workers.clear()
+        self._lanes.clear()
+        self._pending = 0
+        self._has_room.set()
+        self._idle.set()
+
+
+_dispatchers: Dict[str, ConversationDispatcher] = {}
+
+
+def dispatcher_for(bot_wxid: str) -> ConversationDispatcher:
+    """获取（必要时创建）该账号的会话调度器。"""
+    key = (bot_wxid or "").strip()
+    d = _dispatchers.get(key)
+    if d is None:
+        d = ConversationDispatcher(
+            key,
+            max_concurrency=_env_int("LWAPI_PLUGIN_CONCURRENCY", _DEFAULT_CONCURRENCY, 1),
+            max_pending=_env_int("LWAPI_PLUGIN_MAX_PENDING", _DEFAULT_MAX_PENDING, 1),
+        )
+        _dispatchers[key] = d
+    return d
+
+
+async def dispatch_by_conversation(
+    bot_wxid: str, resp: SyncMessageResponse, job: ConversationJob
+) -> "asyncio.Future[None]":
+    """
+    拆分一批消息并提交到各会话通道（不等待插件执行完成）。
+
+    返回的 Future 在整批的所有子批处理结束后完成，供同步断点确认这批消息已处理；
+    任一子批被取消（如账号下线时 close_dispatcher）时 Future 随之取消。
+    """
+    d = dispatcher_for(bot_wxid)
+    parts = split_by_conversation(bot_wxid, resp)
+    done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+    remaining = len(parts)
+
+    def _one_done(finished: bool) -> None:
+        nonlocal remaining
+        if done.done():
+            return
+        if not finished:
+            done.cancel()
+            return
+        remaining -= 1
+        if remaining == 0:
+            done.set_result(None)
+
+    try:
+        for peer, sub in parts:
+            await d.submit(peer, job, sub, _one_done)
+    except BaseException:
+        done.cancel()
+        raise
+    return done
+
+
+async def close_dispatcher(bot_wxid: str) -> None:
+    """账号下线时调用：取消该账号仍在排队或执行中的插件链。"""
+    d = _dispatchers.pop((bot_wxid or "").strip(), None)
+    if d is not None:
+        await d.aclose()
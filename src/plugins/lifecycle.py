@@ -11,7 +11,9 @@
 from __future__ import annotations
 
 import asyncio
-from typing import AsyncIterator, List
+import os
+import time
+from typing import AsyncIterator, Awaitable, List
 
 from aiohttp import web
 from loguru import logger
@@ -19,13 +21,33 @@ from loguru import logger
 from lwapi import LwApiClient
 
 from src.plugins.bot_tasks import cancel_tasks_for_wxid
-from src.plugins.registry import resolve_handlers
-from src.plugins.settings import load_enabled_ids
+from src.plugins.dispatcher import close_dispatcher
+from src.plugins.snapshot import current_plugin_snapshot, plugin_config_watcher
+from src.plugins.stats import record_hook
 from src.plugins.types import PluginSpec
 
 
 def _enabled_specs() -> List[PluginSpec]:
-    return resolve_handlers(load_enabled_ids())
+    return list(current_plugin_snapshot().specs)
+
+
+def _poll_interval() -> float:
+    try:
+        return max(0.2, float(os.getenv("LWAPI_PLUGIN_CONFIG_POLL_SEC", "2")))
+    except ValueError:
+        return 2.0
+
+
+async def _call_hook(spec: PluginSpec, hook: str, call: Awaitable[None], where: str = "") -> None:
+    """执行一个生命周期钩子：异常只记日志，耗时与异常计入插件统计。"""
+    started = time.perf_counter()
+    try:
+        await call
+    except Exception as e:
+        record_hook(spec.id, hook, time.perf_counter() - started, e)
+        logger.exception(f"插件 [{spec.id}] {hook} 异常{where}")
+        return
+    record_hook(spec.id, hook, time.perf_counter() - started)
 
 
 async def notify_bot_online(client: LwApiClient) -> None:
@@ -33,46 +55,42 @@ async def notify_bot_online(client: LwApiClient) -> None:
     for spec in _enabled_specs():
         if spec.on_bot_online is None:
             continue
-        try:
-            await spec.on_bot_online(client)
-        except Exception:
-            logger.exception(f"插件 [{spec.id}] on_bot_online 异常 (wxid={wxid})")
+        await _call_hook(spec, "on_bot_online", spec.on_bot_online(client), f" (wxid={wxid})")
 
 
 async def notify_app_ready() -> None:
     for spec in _enabled_specs():
         if spec.on_app_ready is None:
             continue
-        try:
-            await spec.on_app_ready()
-        except Exception:
-            logger.exception(f"插件 [{spec.id}] on_app_ready 异常")
+        await _call_hook(spec, "on_app_ready", spec.on_app_ready())
 
 
 async def notify_bot_offline(wxid: str) -> None:
     key = (wxid or "").strip()
+    await close_dispatcher(key)
     await cancel_tasks_for_wxid(key)
     for spec in _enabled_specs():
         if spec.on_bot_offline is None:
             continue
-        try:
-            await spec.on_bot_offline(key)
-        except Exception:
-            logger.exception(f"插件 [{spec.id}] on_bot_offline 异常 (wxid={key})")
+        await _call_hook(spec, "on_bot_offline", spec.on_bot_offline(key), f" (wxid={key})")
 
 
 async def _run_background(spec: PluginSpec) -> None:
     assert spec.start_background is not None
+    started = time.perf_counter()
     try:
         await spec.start_background()
     except asyncio.CancelledError:
         raise
-    except Exception:
+    except Exception as e:
+        record_hook(spec.id, "start_background", time.perf_counter() - started, e)
         logger.exception(f"插件 [{spec.id}] 后台任务异常退出")
 
 
 async def plugin_background_lifespan(app: web.Application) -> AsyncIterator[None]:
-    """aiohttp cleanup_ctx：on_app_ready → start_background，退出时统一 cancel。"""
+    """aiohttp cleanup_ctx：监听 plugins.json → on_app_ready → start_background，退出时统一 cancel。"""
+    watcher = plugin_config_watcher(poll_interval=_poll_interval())
+    watcher.start()
     await notify_app_ready()
     tasks: list[asyncio.Task[None]] = []
     for spec in _enabled_specs():
@@ -87,4 +105,5 @@ async def plugin_background_lifespan(app: web.Application) -> AsyncIterator[None
         t.cancel()
     if tasks:
         await asyncio.gather(*tasks, return_exceptions=True)
+    await watcher.stop()
     logger.info("插件后台任务已全部停止")
@@ -7,15 +7,19 @@
 
 from __future__ import annotations
 
+import fnmatch
 import importlib.util
 import os
+import re
 import sys
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from loguru import logger
 
-from src.plugins.types import PluginSpec
+from lwapi.models.msg import SyncMessageResponse
+
+from src.plugins.types import MessageFilter, PluginSpec
 
 PLUGIN_FILE_PREFIX = "lwplugin_"
 _PLUGINS_DIR_ENV = "LWAPI_PLUGINS_DIR"
@@ -52,6 +56,48 @@ def _resolve_settings_panel_dir(module: object, *, source: str) -> Optional[Path
     return panel
 
 
+def _names(raw: Any) -> List[Any]:
+    if raw is None:
+        return []
+    if isinstance(raw, (str, int)):
+        return [raw]
+    return list(raw)
+
+
+def _filter_from_module(module: object, *, source: str) -> Optional[MessageFilter]:
+    """解析 PLUGIN_MSG_TYPES / PLUGIN_SCOPE / PLUGIN_SENDERS；均未声明时返回 None。"""
+    raw_types = getattr(module, "PLUGIN_MSG_TYPES", None)
+    raw_scope = getattr(module, "PLUGIN_SCOPE", None)
+    raw_senders = getattr(module, "PLUGIN_SENDERS", None)
+    if raw_types is None and raw_scope is None and raw_senders is None:
+        return None
+    try:
+        msg_types = frozenset(int(t) for t in _names(raw_types)) if raw_types is not None else None
+    except (TypeError, ValueError):
+        logger.warning(f"插件 PLUGIN_MSG_TYPES 无效，已忽略 {source}: {raw_types!r}")
+        msg_types = None
+    scope = str(raw_scope or "all").strip().lower()
+    if scope not in ("all", "private", "group"):
+        logger.warning(f"插件 PLUGIN_SCOPE 无效，按 all 处理 {source}: {raw_scope!r}")
+        scope = "all"
+    patterns = [str(p).strip() for p in _names(raw_senders) if str(p).strip()]
+    senders = re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+    return MessageFilter(msg_types=msg_types, scope=scope, senders=senders)  # type: ignore[arg-type]
+
+
+def _timeout_from_module(module: object, *, source: str) -> Optional[float]:
+    """解析 PLUGIN_TIMEOUT（秒）；未声明或无效时返回 None（使用全局默认）。"""
+    raw = getattr(module, "PLUGIN_TIMEOUT", None)
+    if raw is None:
+        return None
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        logger.warning(f"插件 PLUGIN_TIMEOUT 无效，已忽略 {source}: {raw!r}")
+        return None
+    return max(0.0, value)
+
+
 def _spec_from_module(module: object, *, source: str) -> Optional[PluginSpec]:
     pid = getattr(module, "PLUGIN_ID", None)
     if not pid or not isinstance(pid, str):
@@ -85,6 +131,9 @@ def _spec_from_module(module: object, *, source: str) -> Optional[PluginSpec]:
         test_settings=_optional_hook("test_settings"),
         list_models=_optional_hook("list_models"),
         clear_context=_optional_hook("clear_context"),
+        msg_filter=_filter_from_module(module, source=source),
+        timeout=_timeout_from_module(module, source=source),
+        parallel=bool(getattr(module, "PLUGIN_PARALLEL", False)),
     )
 
 
@@ -176,3 +225,67 @@ def resolve_handlers(enabled_ids: List[str]) -> List[PluginSpec]:
         if spec:
             out.append(spec)
     return out
+
+
+class PluginRoutes:
+    """
+    一组已启用插件的路由索引：msgType -> 可能处理该类型的插件下标。
+
+    每个会话子批只调用声明了匹配条件的插件；声明了过滤条件的插件只收到匹配的 addMsgs，
+    未声明的插件照旧收到整个子批。
+    """
+
+    def __init__(self, specs: Tuple[PluginSpec, ...]) -> None:
+        self.specs = specs
+        any_type: List[int] = []
+        typed: Dict[int, List[int]] = {}
+        for i, spec in enumerate(specs):
+            f = spec.msg_filter
+            if f is None or f.msg_types is None:
+                any_type.append(i)
+            else:
+                for t in f.msg_types:
+                    typed.setdefault(t, []).append(i)
+        self._any_type = tuple(any_type)
+        self._by_type = {t: tuple(idx) for t, idx in typed.items()}
+        # 只有这些插件会收到不含 addMsgs 的子批（联系人变更等）
+        self._unfiltered = tuple(i for i, spec in enumerate(specs) if spec.msg_filter is None)
+
+    def route(self, resp: SyncMessageResponse) -> Iterator[Tuple[PluginSpec, SyncMessageResponse]]:
+        """按链顺序产出 (插件, 交给它的子批)；惰性求值，插件中断链时后续不再计算。"""
+        msgs = resp.addMsgs or []
+        if not msgs:
+            candidates: Tuple[int, ...] = self._unfiltered
+        else:
+            types = {m.msgType for m in msgs}
+            picked = set(self._any_type)
+            for t in types:
+                picked.update(self._by_type.get(t, ()))
+            candidates = tuple(sorted(picked))
+        for i in candidates:
+            spec = self.specs[i]
+            f = spec.msg_filter
+            if f is None:
+                yield spec, resp
+                continue
+            matched = [m for m in msgs if f.accepts(m)]
+            if not matched:
+                continue
+            if len(matched) == len(msgs):
+                yield spec, resp
+            else:
+                # 与原批同类型（pydantic 模型或紧凑结构），只带匹配的消息
+                yield spec, type(resp)(addMsgs=matched)
+
+
+_routes_cache: Dict[Tuple[str, ...], PluginRoutes] = {}
+
+
+def plugin_routes(specs: List[PluginSpec]) -> PluginRoutes:
+    """按插件 id 序列缓存路由索引（插件集合只在进程启动时扫描一次）。"""
+    key = tuple(p.id for p in specs)
+    routes = _routes_cache.get(key)
+    if routes is None:
+        routes = PluginRoutes(tuple(specs))
+        _routes_cache[key] = routes
+    return routes
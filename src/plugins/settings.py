@@ -1,8 +1,9 @@
 """
 插件启用列表的持久化与缓存：读写 config/plugins.json。
 
-enabled 为字符串 id 数组，顺序即消息处理时插件执行顺序；文件 mtime 变化后
-load_enabled_ids 会自动失效缓存，便于运维台保存后下一轮消息即生效。
+enabled 为字符串 id 数组，顺序即消息处理时插件执行顺序。读取走内存中的配置快照
+（src.plugins.snapshot）：运维台保存后立即替换快照，文件被外部修改时由监听器替换，
+下一轮消息即生效。
 """
 
 from __future__ import annotations
@@ -16,9 +17,6 @@ from src.utils import atomic_write_json, logger
 PLUGIN_CONFIG = Path("config/plugins.json")
 DEFAULT_ENABLED = ["demo_helper", "debug_types"]
 
-_mtime: float | None = None
-_cached_enabled: List[str] | None = None
-
 
 def _read_config_dict() -> dict:
     _ensure_file()
@@ -39,44 +37,21 @@ def _ensure_file() -> None:
 
 
 def invalidate_plugin_settings_cache() -> None:
-    """保存配置后调用，强制下次重新读盘（亦可依赖 mtime 自然失效）。"""
-    global _mtime, _cached_enabled
-    _mtime = None
-    _cached_enabled = None
-    try:
-        from src.plugins.config import invalidate_plugin_config_cache
+    """保存配置后调用：重新读盘并替换插件配置快照。"""
+    from src.plugins.snapshot import reload_plugin_snapshot
 
-        invalidate_plugin_config_cache()
-    except ImportError:
-        pass
+    reload_plugin_snapshot()
 
 
 def load_enabled_ids() -> List[str]:
-    """按配置文件顺序返回已启用插件 id（带 mtime 缓存，便于热更新）。"""
-    global _mtime, _cached_enabled
-    _ensure_file()
-    try:
-        m = PLUGIN_CONFIG.stat().st_mtime
-    except OSError:
-        return list(DEFAULT_ENABLED)
-    if _cached_enabled is not None and _mtime == m:
-        return list(_cached_enabled)
-    try:
-        raw = json.loads(PLUGIN_CONFIG.read_text(encoding="utf-8"))
-        ids = raw.get("enabled") if isinstance(raw, dict) else None
-        if not isinstance(ids, list):
-            ids = list(DEFAULT_ENABLED)
-        out = [str(x).strip() for x in ids if str(x).strip()]
-    except (json.JSONDecodeError, OSError) as e:
-        logger.warning(f"读取 {PLUGIN_CONFIG} 失败，使用默认插件列表: {e}")
-        out = list(DEFAULT_ENABLED)
-    _mtime = m
-    _cached_enabled = out
-    return list(out)
+    """按配置文件顺序返回已启用插件 id（取自内存快照，不读盘）。"""
+    from src.plugins.snapshot import current_plugin_snapshot
+
+    return list(current_plugin_snapshot().enabled)
 
 
 def save_enabled_ids(ids: List[str]) -> None:
-    """覆盖写入启用列表并清空缓存（保留 settings 段）。"""
+    """覆盖写入启用列表并替换快照（保留 settings 段）。"""
     raw = _read_config_dict()
     raw["enabled"] = ids
     atomic_write_json(PLUGIN_CONFIG, raw)
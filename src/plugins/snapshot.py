@@ -0,0 +1,136 @@
+"""
+插件配置快照：启用列表、解析好的插件链（含路由索引）与各插件 settings 的只读副本。
+
+收消息热路径只读取当前快照（一次模块属性访问），不再每批消息 stat 配置文件、
+复制启用列表或深拷贝 settings。快照在以下时机整体替换（赋值即原子切换，
+正在执行的插件链继续使用旧快照）：
+
+- 运维台保存启用列表 / 插件配置后（save_enabled_ids / save_plugin_settings）；
+- config/plugins.json 被外部修改时，由 :class:`~src.plugins.watch.FileWatcher`
+  （inotify，不可用时轮询 stat）触发重新读取。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from loguru import logger
+
+from src.plugins.registry import PluginRoutes, plugin_routes, resolve_handlers
+from src.plugins.settings import DEFAULT_ENABLED, PLUGIN_CONFIG, _ensure_file
+from src.plugins.types import PluginSpec
+from src.plugins.watch import FileWatcher
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def _freeze(value: Any) -> Any:
+    """dict -> 只读 MappingProxyType，list -> tuple（递归），插件无法改动快照。"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """_freeze 的逆操作，得到可修改的普通 dict / list。"""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class PluginSnapshot:
+    enabled: Tuple[str, ...]
+    specs: Tuple[PluginSpec, ...]
+    routes: PluginRoutes
+    settings: Mapping[str, Mapping[str, Any]]
+    version: int
+
+    def settings_for(self, plugin_id: str) -> Mapping[str, Any]:
+        block = self.settings.get(plugin_id)
+        return block if isinstance(block, Mapping) else _EMPTY
+
+
+def _read_config() -> Dict[str, Any]:
+    """读取 plugins.json；文件损坏时抛 ValueError / OSError（由调用方决定是否沿用旧快照）。"""
+    _ensure_file()
+    raw = json.loads(PLUGIN_CONFIG.read_text(encoding="utf-8"))
+    return raw if isinstance(raw, dict) else {}
+
+
+def _enabled_from(raw: Mapping[str, Any]) -> List[str]:
+    ids = raw.get("enabled")
+    if not isinstance(ids, list):
+        ids = list(DEFAULT_ENABLED)
+    return [str(x).strip() for x in ids if str(x).strip()]
+
+
+_snapshot: Optional[PluginSnapshot] = None
+_version = 0
+
+
+def _install(raw: Mapping[str, Any]) -> PluginSnapshot:
+    global _snapshot, _version
+    enabled = _enabled_from(raw)
+    specs = resolve_handlers(enabled)
+    settings = raw.get("settings")
+    _version += 1
+    snap = PluginSnapshot(
+        enabled=tuple(enabled),
+        specs=tuple(specs),
+        routes=plugin_routes(specs),
+        settings=_freeze(settings) if isinstance(settings, dict) else _EMPTY,
+        version=_version,
+    )
+    _snapshot = snap
+    return snap
+
+
+def reload_plugin_snapshot() -> PluginSnapshot:
+    """重新读取 plugins.json 并替换快照；读取失败时保留当前快照（首次加载则用默认启用列表）。"""
+    try:
+        raw = _read_config()
+    except (ValueError, OSError) as e:
+        if _snapshot is not None:
+            logger.warning(f"读取 {PLUGIN_CONFIG} 失败，保留当前插件配置: {e}")
+            return _snapshot
+        logger.warning(f"读取 {PLUGIN_CONFIG} 失败，使用默认插件列表: {e}")
+        raw = {}
+    return _install(raw)
+
+
+def current_plugin_snapshot() -> PluginSnapshot:
+    """当前快照（首次调用时读取配置文件）。"""
+    snap = _snapshot
+    if snap is None:
+        snap = reload_plugin_snapshot()
+    return snap
+
+
+async def _on_file_changed() -> None:
+    try:
+        raw = await asyncio.to_thread(_read_config)
+    except (ValueError, OSError) as e:
+        # 编辑器保存过程中可能读到半个文件，下次变更事件会再读
+        logger.warning(f"读取 {PLUGIN_CONFIG} 失败，保留当前插件配置: {e}")
+        return
+    old = current_plugin_snapshot()
+    snap = _install(raw)
+    if snap.enabled != old.enabled:
+        logger.info(f"插件启用列表已更新: {', '.join(snap.enabled) or '（无）'}")
+    else:
+        logger.debug(f"插件配置已重新加载（版本 {snap.version}）")
+
+
+def plugin_config_watcher(*, poll_interval: float = 2.0) -> FileWatcher:
+    """监听 plugins.json 变更并替换快照的 watcher（由 Web 进程启动 / 停止）。"""
+    current_plugin_snapshot()
+    return FileWatcher(PLUGIN_CONFIG, _on_file_changed, poll_interval=poll_interval)
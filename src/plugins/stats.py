@@ -0,0 +1,185 @@
+"""
+各插件的运行统计（进程内存，重启清零）：调用次数、收到的消息数、handle 耗时分位数、
+异常数、超时数、中断插件链次数、因隔离跳过的次数，以及生命周期钩子的调用与异常。
+
+由插件链（src.plugins.chain）与生命周期（src.plugins.lifecycle）在每次调用后记录，
+运维台经 /api/plugins/stats 读取，用于排查「回复变慢是哪个插件拖的」。
+耗时分位数按最近 _LATENCY_SAMPLES 次调用计算，反映当前状况而非启动以来的平均。
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.plugins.budget import quarantined_plugins
+
+# 每个插件保留的最近耗时样本数
+_LATENCY_SAMPLES = 2048
+# 吞吐按最近多少秒统计
+_RATE_WINDOW = 60.0
+
+
+def _pick(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def _error_text(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"[:300]
+
+
+class _HookStats:
+    __slots__ = ("calls", "errors", "total", "max", "last_error")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total / self.calls * 1000.0, 2) if self.calls else 0.0,
+            "max_ms": round(self.max * 1000.0, 2),
+            "last_error": self.last_error,
+        }
+
+
+class PluginStats:
+    """单个插件的累计计数与最近耗时样本。"""
+
+    __slots__ = (
+        "plugin_id",
+        "calls",
+        "messages",
+        "errors",
+        "timeouts",
+        "stops",
+        "skipped",
+        "total",
+        "max",
+        "last_error",
+        "last_error_at",
+        "_samples",
+        "hooks",
+    )
+
+    def __init__(self, plugin_id: str) -> None:
+        self.plugin_id = plugin_id
+        self.calls = 0
+        self.messages = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.stops = 0
+        self.skipped = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+        # (完成时刻 monotonic, 耗时秒, 消息数)
+        self._samples: Deque[Tuple[float, float, int]] = deque(maxlen=_LATENCY_SAMPLES)
+        self.hooks: Dict[str, _HookStats] = {}
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        latencies = sorted(s[1] for s in self._samples)
+        recent = [s for s in self._samples if now - s[0] <= _RATE_WINDOW]
+        out: Dict[str, Any] = {
+            "id": self.plugin_id,
+            "calls": self.calls,
+            "messages": self.messages,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "stops": self.stops,
+            "skipped": self.skipped,
+            "calls_per_min": len(recent),
+            "msgs_per_min": sum(s[2] for s in recent),
+            "avg_ms": round(self.total / self.calls * 1000.0, 2) if self.calls else 0.0,
+            "max_ms": round(self.max * 1000.0, 2),
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at,
+            "hooks": {name: h.to_dict() for name, h in sorted(self.hooks.items())},
+        }
+        for key, q in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            out[key] = round(_pick(latencies, q) * 1000.0, 2) if latencies else 0.0
+        return out
+
+
+_stats: Dict[str, PluginStats] = {}
+_since = time.time()
+
+
+def _entry(plugin_id: str) -> PluginStats:
+    entry = _stats.get(plugin_id)
+    if entry is None:
+        entry = _stats[plugin_id] = PluginStats(plugin_id)
+    return entry
+
+
+def record_handle(
+    plugin_id: str,
+    elapsed: float,
+    messages: int,
+    error: Optional[BaseException] = None,
+    *,
+    stopped: bool = False,
+    timed_out: bool = False,
+) -> None:
+    """记录一次 handle 调用（插件链每个插件执行完后调用；超时的调用 error 为 TimeoutError）。"""
+    entry = _entry(plugin_id)
+    entry.calls += 1
+    entry.messages += messages
+    entry.total += elapsed
+    if elapsed > entry.max:
+        entry.max = elapsed
+    entry._samples.append((time.monotonic(), elapsed, messages))
+    if timed_out:
+        entry.timeouts += 1
+        entry.last_error = f"超时（{elapsed:.1f}s）"
+        entry.last_error_at = time.time()
+    elif error is not None:
+        entry.errors += 1
+        entry.last_error = _error_text(error)
+        entry.last_error_at = time.time()
+    if stopped:
+        entry.stops += 1
+
+
+def record_skip(plugin_id: str) -> None:
+    """记录一次因隔离被跳过的调用。"""
+    _entry(plugin_id).skipped += 1
+
+
+def record_hook(plugin_id: str, hook: str, elapsed: float, error: Optional[BaseException] = None) -> None:
+    """记录一次生命周期钩子调用（on_app_ready / on_bot_online / on_bot_offline / start_background）。"""
+    entry = _entry(plugin_id)
+    h = entry.hooks.get(hook)
+    if h is None:
+        h = entry.hooks[hook] = _HookStats()
+    h.calls += 1
+    h.total += elapsed
+    if elapsed > h.max:
+        h.max = elapsed
+    if error is not None:
+        h.errors += 1
+        h.last_error = _error_text(error)
+
+
+def plugin_stats() -> Dict[str, Any]:
+    """全部插件的统计快照与当前隔离情况（供 /api/plugins/stats）。"""
+    now = time.monotonic()
+    return {
+        "since": _since,
+        "window_sec": _RATE_WINDOW,
+        "items": [entry.to_dict(now) for _, entry in sorted(_stats.items())],
+        "quarantine": quarantined_plugins(),
+    }
+
+
+def reset_plugin_stats() -> None:
+    global _since
+    _stats.clear()
+    _since = time.time()
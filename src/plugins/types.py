@@ -3,18 +3,37 @@
 
 handle 签名与 LwApi MsgClient 回调一致：(LwApiClient, SyncMessageResponse) -> Awaitable[bool | None]。
 返回 False 时不再调用后续插件；返回 None 或 True 时继续。
+resp 为单个会话（私聊对方或群）的消息子批，同一会话的子批按到达顺序依次交给插件链。
+默认（LWAPI_MSG_COMPACT=1）resp 为 lwapi.models.msg_compact 紧凑结构，请按属性读取字段（msg.content.string 等）。
 
 可选生命周期（在 lwplugin_*.py 中按需定义）：
 - on_app_ready()：Web 进程启动后调用一次（可在此 asyncio.create_task / sleep 后执行业务）
 - on_bot_online(client) / on_bot_offline(wxid)：单账号上下线
 - start_background()：进程级长驻协程（应用存活期间一直运行）
+
+可选消息过滤（声明后框架按路由索引跳过无关消息，handle 只收到匹配的 addMsgs）：
+- PLUGIN_MSG_TYPES：关心的 msgType，如 (1,) 只收文本
+- PLUGIN_SCOPE："private"（仅私聊）/ "group"（仅群聊）/ "all"（默认）
+- PLUGIN_SENDERS：发送方通配符（fnmatch），匹配私聊对方、群 id 或群内发言人 wxid
+
+可选并行执行：
+- PLUGIN_PARALLEL = True：声明 handle 从不中断插件链（不依赖前面插件的结果、也不阻止后面的插件），
+  链中相邻的并行插件用 asyncio.gather 同时执行；其余插件仍按顺序。并行插件若返回 False，
+  在同组全部结束后才中断后续插件
+
+可选执行时限（见 src.plugins.budget）：
+- PLUGIN_TIMEOUT：单次 handle 的时限（秒），超时即取消并继续后续插件；0 表示不限，
+  未声明时取 LWAPI_PLUGIN_TIMEOUT_SEC。在发送队列中排队等待的时间不计入时限
 """
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Awaitable, Callable, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Literal, Optional
+
+from lwapi.models.msg_view import message_view
 
 # 在 handle 中 return False（或 HANDLE_STOP_CHAIN）可中断后续插件
 HANDLE_STOP_CHAIN = False
@@ -28,6 +47,30 @@ SettingsTestHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
 ListModelsHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
 ClearContextHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
 
+PluginScope = Literal["all", "private", "group"]
+
+
+@dataclass(frozen=True)
+class MessageFilter:
+    """插件声明的消息过滤条件（由 registry 从 PLUGIN_MSG_TYPES 等模块属性生成）。"""
+
+    msg_types: Optional[FrozenSet[int]] = None  # None 表示不限类型
+    scope: PluginScope = "all"
+    senders: Optional["re.Pattern[str]"] = None  # 多个通配符编译成的一个正则
+
+    def accepts(self, msg: Any) -> bool:
+        if self.msg_types is not None and msg.msgType not in self.msg_types:
+            return False
+        if self.scope == "all" and self.senders is None:
+            return True
+        # 与插件共用同一份解析结果（见 lwapi.models.msg_view）
+        view = message_view(msg)
+        if (self.scope == "private" and view.is_group) or (self.scope == "group" and not view.is_group):
+            return False
+        if self.senders is None or self.senders.match(view.from_id):
+            return True
+        return view.speaker is not None and self.senders.match(view.speaker) is not None
+
 
 @dataclass(frozen=True)
 class PluginSpec:
@@ -47,3 +90,9 @@ class PluginSpec:
     test_settings: Optional[SettingsTestHandler] = None
     list_models: Optional[ListModelsHandler] = None
     clear_context: Optional[ClearContextHandler] = None
+    # 未声明任何过滤条件时为 None，handle 收到会话子批的全部内容
+    msg_filter: Optional[MessageFilter] = None
+    # handle 时限（秒）；None 使用 LWAPI_PLUGIN_TIMEOUT_SEC，0 表示不限
+    timeout: Optional[float] = None
+    # 可与相邻的并行插件同时执行（PLUGIN_PARALLEL）
+    parallel: bool = False
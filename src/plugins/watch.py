@@ -0,0 +1,178 @@
+"""
+配置文件变更监听：Linux 下用 inotify（ctypes 调用 libc，无额外依赖），其它平台或 inotify
+不可用时回退为定时比较 stat。
+
+监听的是文件所在目录：atomic_write_json 等「写临时文件再 replace」的保存方式会替换
+文件 inode，直接监听文件本身会丢失后续事件。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+from loguru import logger
+
+ChangeCallback = Callable[[], Awaitable[None]]
+
+# <sys/inotify.h>
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_CREATE | _IN_DELETE | _IN_MODIFY
+_EVENT_HEADER = struct.Struct("iIII")
+
+# 编辑器保存常伴随多次事件，合并为一次回调
+_DEBOUNCE = 0.1
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class FileWatcher:
+    """文件变更时调用 on_change（协程）；start / stop 需在事件循环中调用。"""
+
+    def __init__(self, path: Path, on_change: ChangeCallback, *, poll_interval: float = 2.0) -> None:
+        self.path = Path(path)
+        self._on_change = on_change
+        self.poll_interval = max(0.1, float(poll_interval))
+        self._fd: Optional[int] = None
+        self._poll_task: Optional[asyncio.Task[None]] = None
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._running: Optional[asyncio.Task[None]] = None
+        self._again = False
+        self.mode = "stopped"
+
+    # ==================== inotify ====================
+    def _start_inotify(self, loop: asyncio.AbstractEventLoop) -> bool:
+        libc = _load_libc()
+        if libc is None:
+            return False
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            logger.debug(f"inotify_init1 失败 errno={ctypes.get_errno()}")
+            return False
+        directory = str(self.path.parent.resolve()).encode()
+        if libc.inotify_add_watch(fd, directory, _WATCH_MASK) < 0:
+            logger.debug(f"inotify_add_watch 失败 errno={ctypes.get_errno()}")
+            os.close(fd)
+            return False
+        try:
+            loop.add_reader(fd, self._on_readable)
+        except (NotImplementedError, RuntimeError):
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def _on_readable(self) -> None:
+        assert self._fd is not None
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.warning(f"读取 inotify 事件失败: {e}")
+            return
+        target = self.path.name.encode()
+        offset = 0
+        hit = False
+        while offset + _EVENT_HEADER.size <= len(data):
+            _wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name == target:
+                hit = True
+        if hit:
+            self._schedule()
+
+    # ==================== 轮询 ====================
+    async def _poll(self, last: Optional[Tuple[int, int, int]]) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(_stat_key, self.path)
+            if current != last:
+                last = current
+                self._schedule()
+
+    # ==================== 回调 ====================
+    def _schedule(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+        self._pending = asyncio.get_running_loop().call_later(_DEBOUNCE, self._fire)
+
+    def _fire(self) -> None:
+        self._pending = None
+        if self._running is not None and not self._running.done():
+            # 上一次回调未结束：结束后再执行一次
+            self._again = True
+            return
+        self._running = asyncio.create_task(self._invoke(), name=f"watch:{self.path.name}")
+
+    async def _invoke(self) -> None:
+        while True:
+            self._again = False
+            try:
+                await self._on_change()
+            except Exception:
+                logger.exception(f"处理 {self.path} 变更时异常")
+            if not self._again:
+                return
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.mode != "stopped":
+            return
+        if self._start_inotify(loop):
+            self.mode = "inotify"
+        else:
+            # 基准在 start 时取，避免任务首次调度前的修改被当作初始状态
+            self._poll_task = asyncio.create_task(self._poll(_stat_key(self.path)), name=f"watch-poll:{self.path.name}")
+            self.mode = "poll"
+        logger.debug(f"已开始监听 {self.path}（{self.mode}）")
+
+    async def stop(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if self._fd is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        for task in (self._poll_task, self._running):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._poll_task = None
+        self._running = None
+        self.mode = "stopped"
@@ -0,0 +1,219 @@
+"""
+离线回放录制的同步数据，压测插件链（上线新的 lwplugin_*.py 前排查性能回退）。
+
+录制：在 .env 中设置 LWAPI_MSG_RECORD_DIR，登录后每个账号每次启动收消息写一个
+``<wxid>-<时间>.ndjson.gz``（格式见 lwapi.recorder）。
+
+回放::
+
+    python -m src.replay logs/sync_record/wxid_xxx-20260101-120000.ndjson.gz --speed max
+
+- ``--speed``：1 为按录制时间间隔原速回放，N 为 N 倍速，max 为不等待尽快回放；
+- 默认启动本地桩服务应答插件发出的 /api/* 请求（不会真的发消息），
+  ``--base-url`` 可改为指向测试环境的 LwApi 服务；
+- 默认入库到临时 SQLite，不污染 config/messages.sqlite；``--inbox-db`` 可指定路径。
+
+结束后输出消息吞吐（条/秒）、各插件耗时分位数与入库吞吐。
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from dotenv import load_dotenv
+from loguru import logger
+
+from src.app_paths import env_file, prepare_runtime
+
+prepare_runtime()
+load_dotenv(env_file())
+
+from lwapi import LwApiClient  # noqa: E402
+from lwapi.recorder import read_records, record_payload  # noqa: E402
+from lwapi.sync_utils import normalize_ws_encoding  # noqa: E402
+
+from src import message_inbox  # noqa: E402
+from src.plugins.chain import (  # noqa: E402
+    add_plugin_observer,
+    composite_message_handler,
+    remove_plugin_observer,
+)
+from src.plugins.dispatcher import dispatcher_for  # noqa: E402
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    """max / 0 表示不等待；否则为回放倍速。"""
+    v = value.strip().lower()
+    if v in ("max", "0", "inf"):
+        return None
+    speed = float(v)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed 须为正数或 max")
+    return speed
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+class _PluginTimings:
+    """收集插件链观察者上报的耗时（毫秒）与异常数。"""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def __call__(self, plugin_id: str, elapsed: float, error: Optional[BaseException]) -> None:
+        self.samples.setdefault(plugin_id, []).append(elapsed * 1000.0)
+        if error is not None:
+            self.errors[plugin_id] = self.errors.get(plugin_id, 0) + 1
+
+    def report(self) -> List[str]:
+        lines = [f"{'插件':<24}{'调用':>8}{'异常':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for pid, values in sorted(self.samples.items()):
+            lines.append(
+                f"{pid:<24}{len(values):>8}{self.errors.get(pid, 0):>6}"
+                f"{_percentile(values, 50):>9.2f}{_percentile(values, 95):>9.2f}"
+                f"{_percentile(values, 99):>9.2f}{max(values):>9.2f}"
+            )
+        return lines
+
+
+async def _start_stub_server() -> Tuple[web.AppRunner, str]:
+    """本地桩服务：所有请求都返回成功，供插件回复消息等调用。"""
+
+    async def _ok(_request: web.Request) -> web.Response:
+        return web.json_response({"code": 200, "message": "ok", "data": {}})
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", _ok)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _load_records(paths: List[Path], wxid_override: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """展开录制文件为 (wxid, ws_encoding, 记录)，按文件顺序。"""
+    out: List[Tuple[str, str, Dict[str, Any]]] = []
+    for path in paths:
+        wxid, encoding = wxid_override, "json"
+        for rec in read_records(path):
+            if rec.get("type") == "header":
+                wxid = wxid_override or str(rec.get("wxid") or "")
+                encoding = normalize_ws_encoding(rec.get("ws_encoding"))
+                continue
+            out.append((wxid, encoding, rec))
+    return out
+
+
+async def replay(args: argparse.Namespace) -> None:
+    records = _load_records([Path(p) for p in args.files], args.wxid.strip())
+    if not records:
+        print("录制文件中没有可回放的记录")
+        return
+
+    tmp_dir: Optional[tempfile.TemporaryDirectory] = None
+    if args.inbox_db:
+        message_inbox.DB_PATH = Path(args.inbox_db)
+    else:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="lwapi-replay-")
+        message_inbox.DB_PATH = Path(tmp_dir.name) / "messages.sqlite"
+
+    runner: Optional[web.AppRunner] = None
+    base_url = args.base_url
+    if not base_url:
+        runner, base_url = await _start_stub_server()
+
+    timings = _PluginTimings()
+    add_plugin_observer(timings)
+    clients: Dict[str, LwApiClient] = {}
+    inbox_before = message_inbox.inbox_write_stats()
+    total_msgs = 0
+    batches = 0
+    first_t: Optional[float] = None
+    started = time.perf_counter()
+    try:
+        for wxid, encoding, rec in records:
+            client = clients.get(wxid)
+            if client is None:
+                client = LwApiClient(base_url)
+                client.set_wxid(wxid)
+                client.msg._compact = args.compact
+                clients[wxid] = client
+            client.msg._ws_encoding = encoding
+
+            if args.speed is not None:
+                t = float(rec.get("t") or 0.0)
+                if first_t is None:
+                    first_t = t
+                delay = (t - first_t) / args.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            payload = record_payload(rec)
+            if rec.get("src") == "sync":
+                resp = client.msg._sync_model(payload)
+            else:
+                resp = client.msg._parse_sync_payload(payload)
+            if resp is None or not resp.addMsgs:
+                continue
+            batches += 1
+            total_msgs += len(resp.addMsgs)
+            await composite_message_handler(client, resp)
+
+        for wxid in clients:
+            await dispatcher_for(wxid).drain()
+        elapsed = time.perf_counter() - started
+    finally:
+        remove_plugin_observer(timings)
+        for client in clients.values():
+            await client.aclose()
+        if runner is not None:
+            await runner.cleanup()
+
+    inbox_after = message_inbox.inbox_write_stats()
+    rows = inbox_after["rows"] - inbox_before["rows"]
+    write_sec = inbox_after["seconds"] - inbox_before["seconds"]
+    print(f"回放 {len(records)} 条记录，{batches} 批 {total_msgs} 条消息，用时 {elapsed:.2f}s")
+    print(f"消息吞吐: {total_msgs / elapsed if elapsed > 0 else 0.0:.1f} 条/秒")
+    print(
+        f"入库: {rows} 行 / {inbox_after['batches'] - inbox_before['batches']} 批，"
+        f"写入耗时 {write_sec:.3f}s（{rows / write_sec if write_sec > 0 else 0.0:.0f} 行/秒）"
+    )
+    print("\n".join(timings.report()))
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.replay", description="回放录制的同步数据，压测插件链")
+    parser.add_argument("files", nargs="+", help="录制文件（.ndjson.gz），按顺序回放")
+    parser.add_argument("--speed", type=_parse_speed, default=None, help="1 原速 / N 倍速 / max 尽快（默认 max）")
+    parser.add_argument("--wxid", default="", help="覆盖录制文件中的机器人 wxid")
+    parser.add_argument("--base-url", default="", help="插件调用的 LwApi 基址（默认启动本地桩服务）")
+    parser.add_argument("--inbox-db", default="", help="入库 SQLite 路径（默认临时文件）")
+    parser.add_argument("--compact", action="store_true", help="使用紧凑消息结构（与 LWAPI_MSG_COMPACT 一致）")
+    parser.add_argument("--log-level", default="WARNING", help="回放期间的日志级别（默认 WARNING）")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level.upper())
+    asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
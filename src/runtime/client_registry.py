@@ -7,9 +7,13 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Dict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 from lwapi import LwApiClient
+from lwapi.bulk import BulkResult, RateLimiter, Targets, run_bulk
+from lwapi.exceptions import LwApiError
+from lwapi.outbox import SendPriority
 
 
 class ClientRegistry:
@@ -89,3 +93,47 @@ async def iter_online_clients() -> dict[str, LwApiClient]:
 def online_count() -> int:
     """同步读取在线数量（仅用于日志/监控，精确查询请用 list_online_wxids）。"""
     return len(_registry)
+
+
+async def send_many_online(
+    targets: Targets[Tuple[str, str]],
+    content: Union[str, Callable[[str, str], str]],
+    *,
+    concurrency: int = 32,
+    per_account_concurrency: int = 4,
+    per_account_rate: Optional[float] = None,
+    checkpoint: Optional[Union[str, Path]] = None,
+    priority: SendPriority = "bulk",
+) -> BulkResult:
+    """
+    跨账号群发文本：targets 为 (机器人 wxid, 接收者 wxid) 的可迭代对象或异步迭代器。
+
+    总并发 concurrency，每个账号另限 per_account_concurrency 并发与 per_account_rate 条/秒；
+    content 可为按 (机器人, 接收者) 生成文本的函数。机器人不在线的目标计入 retryable，
+    结果与断点中的键为 ``机器人 wxid/接收者 wxid``（见 lwapi.bulk.run_bulk）。
+    """
+    clients = await iter_online_clients()
+    slots: Dict[str, asyncio.Semaphore] = {}
+    limiters: Dict[str, RateLimiter] = {}
+
+    async def _send_one(target: Tuple[str, str]) -> Any:
+        bot, to_wxid = target
+        client = clients.get(bot)
+        if client is None:
+            raise LwApiError(f"机器人未在线: {bot!r}")
+        slot = slots.get(bot)
+        if slot is None:
+            slot = slots[bot] = asyncio.Semaphore(max(1, per_account_concurrency))
+            limiters[bot] = RateLimiter(per_account_rate)
+        async with slot:
+            await limiters[bot].acquire()
+            text = content(bot, to_wxid) if callable(content) else content
+            return await client.msg.send_text_message(to_wxid, text, priority=priority)
+
+    return await run_bulk(
+        targets,
+        _send_one,
+        key=lambda t: f"{t[0]}/{t[1]}",
+        concurrency=concurrency,
+        checkpoint=checkpoint,
+    )
@@ -19,18 +19,25 @@ from __future__ import annotations
 
 import asyncio
 import os
+import time
+from pathlib import Path
 from typing import Dict, Optional, Set
 
 from dotenv import load_dotenv
+from loguru import logger
 
 from src.app_paths import env_file, prepare_runtime
 
 prepare_runtime()
 load_dotenv(env_file())
 
-from lwapi import LwApiClient
+from lwapi import HttpPoolConfig, LwApiClient, OutboxConfig
+from lwapi.dispatch import OverflowPolicy, normalize_overflow_policy
 from lwapi.exceptions import LoginError
-from lwapi.sync_utils import SyncMode, normalize_sync_mode
+from lwapi.fanout import configure_cdn_cache
+from lwapi.media import configure_media_fetcher
+from lwapi.media_cache import configure_media_cache
+from lwapi.sync_utils import SyncMode, WsEncoding, normalize_sync_mode, normalize_ws_encoding
 
 from src.account_loader import load_accounts_safe, save_accounts
 from src.login_service import LoginService, normalize_login_mode
@@ -50,6 +57,11 @@ DEFAULT_MSG_SYNC_MODE: SyncMode = normalize_sync_mode(
     os.getenv("LWAPI_MSG_SYNC_MODE"),
     default="websocket",
 )
+# WebSocket 推送编码：protobuf 时握手协商二进制 AddMsg，省带宽与解析 CPU
+MSG_WS_ENCODING: WsEncoding = normalize_ws_encoding(
+    os.getenv("LWAPI_MSG_WS_ENCODING"),
+    default="json",
+)
 _WS_EXHAUSTED_STOP_MESSAGE = (
     "WebSocket 重连失败已达上限，账号已自动停止，请手动重新启动"
 )
@@ -82,6 +94,95 @@ def _env_int(name: str, default: int, minimum: int) -> int:
     return max(minimum, v)
 
 
+def _env_flag(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float, minimum: float) -> float:
+    try:
+        v = float(os.getenv(name, str(default)))
+    except ValueError:
+        v = default
+    return max(minimum, v)
+
+
+def _env_overflow_policy(name: str, default: OverflowPolicy) -> OverflowPolicy:
+    try:
+        return normalize_overflow_policy(os.getenv(name), default=default)
+    except ValueError as e:
+        logger.warning(f"{name} 配置无效（{e}），使用默认值 {default}")
+        return default
+
+
+# 所有账号共用一个 HTTP 连接池，避免每账号、每次重登都新建连接池与 TCP/TLS 握手
+SHARED_HTTP_POOL = _env_flag("LWAPI_HTTP_SHARED_POOL", True)
+HTTP_POOL = HttpPoolConfig(
+    max_connections=_env_int("LWAPI_HTTP_MAX_CONNECTIONS", 200, 1),
+    max_keepalive_connections=_env_int("LWAPI_HTTP_MAX_KEEPALIVE", 50, 0),
+    keepalive_expiry=float(_env_int("LWAPI_HTTP_KEEPALIVE_EXPIRY_SECONDS", 30, 1)),
+    http2=_env_flag("LWAPI_HTTP2"),
+)
+# 长轮询（/Msg/Sync）独立连接池：每个 HTTP 同步的账号常驻占用一条连接
+HTTP_SYNC_POOL = HttpPoolConfig(
+    max_connections=_env_int("LWAPI_HTTP_SYNC_MAX_CONNECTIONS", 500, 1),
+    max_keepalive_connections=_env_int("LWAPI_HTTP_SYNC_MAX_CONNECTIONS", 500, 1),
+    keepalive_expiry=float(_env_int("LWAPI_HTTP_KEEPALIVE_EXPIRY_SECONDS", 30, 1)),
+)
+HTTP_SYNC_TIMEOUT = float(_env_int("LWAPI_HTTP_SYNC_TIMEOUT_SECONDS", 180, 30))
+
+# WebSocket 收包与插件处理之间的分发队列（每账号一个）
+MSG_QUEUE_SIZE = _env_int("LWAPI_MSG_QUEUE_SIZE", 256, 1)
+MSG_QUEUE_OVERFLOW = _env_overflow_policy("LWAPI_MSG_QUEUE_OVERFLOW", "block")
+
+# 入站消息按 newMsgId 去重（0 关闭）；去重记录按 wxid 落盘，重启后仍可识别重复推送
+MSG_DEDUP_SIZE = _env_int("LWAPI_MSG_DEDUP_SIZE", 4096, 0)
+MSG_DEDUP_PERSIST = _env_flag("LWAPI_MSG_DEDUP_PERSIST", True)
+MSG_DEDUP_DIR = Path("config/dedup")
+
+# 同步断点（keyBuf / msgSeq / newMsgId）按 wxid 落盘，重启或重新登录后从断点续传
+MSG_CURSOR_PERSIST = _env_flag("LWAPI_MSG_CURSOR_PERSIST", True)
+MSG_CURSOR_DIR = Path("config/sync_cursor")
+
+# 录制原始同步数据（目录非空时开启），用于 python -m src.replay 回放压测插件
+MSG_RECORD_DIR = os.getenv("LWAPI_MSG_RECORD_DIR", "").strip()
+
+# 发送队列：按接收者 / 账号令牌桶限速（条/秒，0 不限），交互回复优先于群发，合并排队中的连续短文本
+SEND_QUEUE = (
+    OutboxConfig(
+        peer_rate=_env_float("LWAPI_SEND_PEER_RATE", 1.0, 0.0),
+        peer_burst=_env_int("LWAPI_SEND_PEER_BURST", 3, 1),
+        account_rate=_env_float("LWAPI_SEND_ACCOUNT_RATE", 5.0, 0.0),
+        account_burst=_env_int("LWAPI_SEND_ACCOUNT_BURST", 10, 1),
+        coalesce=_env_flag("LWAPI_SEND_COALESCE", False),
+    )
+    if _env_flag("LWAPI_SEND_QUEUE", True)
+    else None
+)
+
+# 按 URL 发送图片时的下载缓存（内容寻址 + ETag 复核）；置空则只在内存中合并同 URL 的并发下载
+URL_MEDIA_CACHE_DIR = os.getenv("LWAPI_URL_MEDIA_CACHE_DIR", "config/url_media_cache").strip()
+configure_media_fetcher(
+    URL_MEDIA_CACHE_DIR or None,
+    max_cache_bytes=_env_int("LWAPI_URL_MEDIA_CACHE_MB", 512, 1) * 1024 * 1024,
+)
+
+# 收到的图片 / 视频 / 语音下载缓存（按 wxid + msg_id + 类型，内容寻址去重，LRU + TTL）
+configure_media_cache(
+    Path(os.getenv("LWAPI_MEDIA_CACHE_DIR", "").strip() or "config/media_cache"),
+    max_bytes=_env_int("LWAPI_MEDIA_CACHE_MB", 1024, 1) * 1024 * 1024,
+    ttl=_env_int("LWAPI_MEDIA_CACHE_TTL_HOURS", 168, 1) * 3600,
+)
+
+# 媒体群发（send_image_many / send_video_many）的 CDN 描述缓存，按内容摘要复用已上传的媒体
+configure_cdn_cache(Path("config/cdn_descriptors.json"))
+
+# 可选：收消息热路径使用紧凑消息结构（默认关闭，插件仍收到 pydantic 模型）
+MSG_COMPACT = _env_flag("LWAPI_MSG_COMPACT", False)
+
+
 class BotService:
     """管理多个账号机器人协程的启动、停止与运行槽位查询。"""
 
@@ -151,7 +252,8 @@ class BotService:
         client = await registry_get_client(b)
         if client is None:
             raise ValueError("该机器人未在线：请先在账号列表启动对应机器人并完成登录")
-        return await client.msg.send_text_message(t, c)
+        # 运维台手动发送视为交互消息，排在插件群发之前
+        return await client.msg.send_text_message(t, c, priority="interactive")
 
     async def _run_single_bot(
         self, acc: dict, all_accounts: list, account_idx: int
@@ -205,7 +307,14 @@ class BotService:
 
             while True:
                 wxid = ""
-                async with LwApiClient(BASE_URL) as client:
+                async with LwApiClient(
+                    BASE_URL,
+                    pool=HTTP_POOL,
+                    shared_pool=SHARED_HTTP_POOL,
+                    sync_pool=HTTP_SYNC_POOL,
+                    sync_timeout=HTTP_SYNC_TIMEOUT,
+                    outbox=SEND_QUEUE,
+                ) as client:
                     try:
                         if login_mode == "local":
                             login_service = RelayLoginService(
@@ -266,12 +375,26 @@ class BotService:
                             on_ws_exhausted=on_msg_ws_exhausted
                             if sync_mode == "websocket"
                             else None,
+                            queue_size=MSG_QUEUE_SIZE,
+                            queue_overflow=MSG_QUEUE_OVERFLOW,
+                            dedup_size=MSG_DEDUP_SIZE,
+                            dedup_path=MSG_DEDUP_DIR / f"{wxid}.json"
+                            if MSG_DEDUP_PERSIST
+                            else None,
+                            cursor_path=MSG_CURSOR_DIR / f"{wxid}.json"
+                            if MSG_CURSOR_PERSIST
+                            else None,
+                            record_path=Path(MSG_RECORD_DIR)
+                            / f"{wxid}-{time.strftime('%Y%m%d-%H%M%S')}.ndjson.gz"
+                            if MSG_RECORD_DIR
+                            else None,
+                            ws_encoding=MSG_WS_ENCODING,
+                            compact=MSG_COMPACT,
                         )
-                        sync_label = (
-                            "WebSocket"
-                            if sync_mode == "websocket"
-                            else "HTTP 长轮询"
-                        )
+                        sync_label = {
+                            "websocket": "WebSocket",
+                            "hybrid": "WebSocket + HTTP 长轮询兜底",
+                        }.get(sync_mode, "HTTP 长轮询")
                         bot_logger.success(
                             f"【{remark}】机器人已上线，wxid={wxid}，消息同步={sync_label}"
                         )
@@ -14,6 +14,8 @@ from pathlib import Path
 
 from aiohttp import web, WSMsgType
 from lwapi.exceptions import ApiError, HttpError
+from lwapi.media import close_media_fetcher
+from lwapi.transport import close_shared_clients
 
 from src.app_paths import static_dir
 from src.account_loader import (
@@ -38,8 +40,10 @@ from src.plugins.panel import (
 )
 from src.plugins.registry import REGISTRY, list_plugin_specs
 from src.plugins.settings import load_enabled_ids, save_enabled_ids
+from src.plugins.stats import plugin_stats
 from src.login_service import normalize_login_mode
 from src.runtime.account_events import AccountEventHub
+from src.runtime.client_registry import iter_online_clients
 from src.services.bot_service import BotService, DEFAULT_MSG_SYNC_MODE
 from src.web.auth import (
     api_auth_login,
@@ -69,6 +73,7 @@ class AdminWebApp:
         app["bot_service"] = self.bot_service
         app["account_events"] = self.account_events
         app.cleanup_ctx.append(plugin_background_lifespan)
+        app.on_cleanup.append(self._close_http_pools)
         app.add_routes(
             [
                 web.static("/static", str(STATIC_DIR)),
@@ -89,6 +94,7 @@ class AdminWebApp:
                 web.post("/api/start-all", self.api_start_all),
                 web.get("/api/plugins", self.api_plugins_get),
                 web.put("/api/plugins", self.api_plugins_put),
+                web.get("/api/plugins/stats", self.api_plugins_stats),
                 web.get("/api/plugins/{plugin_id}/settings", self.api_plugin_settings_get),
                 web.put("/api/plugins/{plugin_id}/settings", self.api_plugin_settings_put),
                 web.post(
@@ -106,6 +112,7 @@ class AdminWebApp:
                 web.get("/plugin-ui/{plugin_id}", serve_plugin_panel_index),
                 web.get("/plugin-ui/{plugin_id}/", serve_plugin_panel_index),
                 web.get("/plugin-ui/{plugin_id}/{path:.+}", serve_plugin_panel),
+                web.get("/api/sync/stats", self.api_sync_stats),
                 web.get("/api/messages/summary", self.api_messages_summary),
                 web.get("/api/messages", self.api_messages_list),
                 web.post("/api/messages/send", self.api_messages_send),
@@ -114,6 +121,11 @@ class AdminWebApp:
         )
         return app
 
+    async def _close_http_pools(self, app: web.Application) -> None:
+        """进程退出时关闭各账号共用的 HTTP 连接池与媒体下载会话。"""
+        await close_shared_clients()
+        await close_media_fetcher()
+
     async def login_page(self, request: web.Request) -> web.Response:
         return web.FileResponse(STATIC_DIR / "login.html")
 
@@ -329,6 +341,10 @@ class AdminWebApp:
             }
         )
 
+    async def api_plugins_stats(self, request: web.Request) -> web.Response:
+        """各插件调用次数、消息数、handle 耗时分位数（毫秒）、异常与中断链次数，以及生命周期钩子统计。"""
+        return web.json_response(plugin_stats())
+
     def _plugin_id_from_request(self, request: web.Request) -> str | None:
         pid = (request.match_info.get("plugin_id") or "").strip()
         if not pid or pid not in REGISTRY:
@@ -469,6 +485,25 @@ class AdminWebApp:
         save_enabled_ids(ordered)
         return web.json_response({"ok": True, "enabled": ordered})
 
+    async def api_sync_stats(self, request: web.Request) -> web.Response:
+        """各在线账号的消息同步统计：当前通道、长轮询频率与批大小、分发队列、去重命中，以及发送队列。"""
+        clients = await iter_online_clients()
+        items = []
+        for wxid, client in sorted(clients.items()):
+            msg = client.msg
+            items.append(
+                {
+                    "wxid": wxid,
+                    "sync_mode": msg.sync_mode,
+                    "active_sync": msg.active_sync,
+                    "poll": msg.poll_stats(),
+                    "queue": msg.dispatch_stats(),
+                    "dedup": msg.dedup_stats(),
+                    "send": msg.outbox_stats(),
+                }
+            )
+        return web.json_response({"items": items})
+
     async def api_messages_summary(self, request: web.Request) -> web.Response:
         bot = (request.rel_url.query.get("bot_wxid") or "").strip() or None
         data = await query_summary(bot_wxid=bot)
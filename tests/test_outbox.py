@@ -0,0 +1,27 @@
+import asyncio
+
+from lwapi.config import OutboxConfig
+from lwapi.outbox import OutboundScheduler
+
+
+def test_saturated_inflight_does_not_stall() -> None:
+    """在途名额占满时，上一条发完后下一条仍会被取出发送。"""
+
+    async def main() -> None:
+        sent = []
+
+        async def post(path, payload, timeout):
+            await asyncio.sleep(0.01)
+            sent.append(payload)
+            return payload
+
+        outbox = OutboundScheduler(
+            post, OutboxConfig(peer_rate=0, account_rate=0, max_inflight=1)
+        )
+        r1 = outbox.submit("a", "/x", 1)
+        r2 = outbox.submit("b", "/x", 2)
+        assert await asyncio.wait_for(asyncio.gather(r1, r2), timeout=2) == [1, 2]
+        assert sent == [1, 2]
+        await outbox.aclose()
+
+    asyncio.run(main())